@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, List
+from typing import Any, List, Optional
 import uuid
+from datetime import datetime
 
 from ...core.config import settings
 from ...services.auth import auth_service
-from ...services.database import get_db, ActivationDB, ModemDB
+from ..pagination import paginate
+from ..export import export_response
+from ...services.database import get_db, get_read_db, ActivationDB, ModemDB
 from ...services.smshub_integration import SMSHubIntegration
 from ...services.monitoring import modem_metrics
+from ...services.routing import activation_router
 from ...services.websocket import manager as ws_manager
 from ...schemas.activation import (
     ActivationCreate,
@@ -21,25 +25,68 @@ router = APIRouter()
 
 @router.get("/", response_model=List[ActivationInDB])
 async def get_activations(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    activation_status: Optional[ActivationStatus] = Query(None, alias="status"),
+    modem_id: Optional[int] = None,
+    service: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
     current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
+) -> Any:
+    """Get activations, oldest first; the next page's cursor is in X-Next-Cursor."""
+    activation_db = ActivationDB(Activation)
+    return await paginate(
+        activation_db,
+        db,
+        response,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        filters={"status": activation_status, "modem_id": modem_id, "service": service},
+        created_from=created_from,
+        created_to=created_to
+    )
+
+@router.get("/export")
+async def export_activations(
+    format: str = "ndjson",
+    gzip: bool = False,
+    activation_status: Optional[ActivationStatus] = Query(None, alias="status"),
+    modem_id: Optional[int] = None,
+    service: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: User = Depends(auth_service.get_current_user)
 ) -> Any:
-    """Get all activations."""
+    """Stream every matching activation as NDJSON or CSV, oldest first."""
     activation_db = ActivationDB(Activation)
-    return await activation_db.get_multi(db, skip=skip, limit=limit)
+    query = activation_db.filtered(
+        {"status": activation_status, "modem_id": modem_id, "service": service},
+        created_from,
+        created_to
+    )
+    return export_response(
+        query.with_only_columns(*Activation.__table__.columns),
+        format,
+        gzip,
+        "activations"
+    )
 
 @router.post("/", response_model=ActivationInDB)
 async def create_activation(
     activation_in: ActivationCreate,
     current_user: User = Depends(auth_service.get_current_user),
+    read_db: AsyncSession = Depends(get_read_db),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Create new activation."""
-    # Check modem availability
+    # Check modem availability; the writer is only used once SMS Hub has answered
     modem_db = ModemDB(Modem)
-    modem = await modem_db.get(db, activation_in.modem_id)
+    modem = await modem_db.get(read_db, activation_in.modem_id)
     if not modem:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,6 +123,7 @@ async def create_activation(
     })
     
     activation = await activation_db.create(db, obj_in=activation_data)
+    activation_router.open(activation)
     
     # Update modem status
     await modem_db.update(
@@ -108,7 +156,7 @@ async def create_activation(
 async def get_activation(
     activation_id: str,
     current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """Get activation by ID with messages."""
     activation_db = ActivationDB(Activation)
@@ -126,11 +174,12 @@ async def update_activation(
     activation_id: str,
     activation_in: ActivationUpdate,
     current_user: User = Depends(auth_service.get_current_user),
+    read_db: AsyncSession = Depends(get_read_db),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Update activation status."""
     activation_db = ActivationDB(Activation)
-    activation = await activation_db.get_by_activation_id(db, activation_id)
+    activation = await activation_db.get_by_activation_id(read_db, activation_id)
     if not activation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -156,6 +205,7 @@ async def update_activation(
         db_obj=activation,
         obj_in={"status": activation_in.status}
     )
+    activation_router.update(activation)
     
     # Update modem status if activation is completed/cancelled
     if activation_in.status in [
@@ -213,5 +263,6 @@ async def delete_activation(
     
     # Delete activation
     await activation_db.delete(db, id=activation.id)
+    activation_router.close(activation.id)
     
     return {"message": "Activation deleted successfully"} 
\ No newline at end of file
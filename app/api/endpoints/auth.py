@@ -6,7 +6,7 @@ from datetime import timedelta
 
 from ...core.config import settings
 from ...services.auth import auth_service
-from ...services.database import get_db, UserDB
+from ...services.database import get_read_db, write_lane, UserDB
 from ...schemas.user import (
     UserCreate,
     UserInDB,
@@ -20,12 +20,11 @@ router = APIRouter()
 
 @router.post("/login", response_model=Token)
 async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncSession = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """Login user and return access token."""
     user = await auth_service.authenticate_user(
-        db, form_data.username, form_data.password
+        form_data.username, form_data.password
     )
     if not user:
         raise HTTPException(
@@ -35,7 +34,7 @@ async def login(
         )
     
     access_token = auth_service.create_access_token(
-        data={"sub": user.email}
+        data=auth_service.token_claims(user)
     )
     return {
         "access_token": access_token,
@@ -45,7 +44,7 @@ async def login(
 @router.post("/register", response_model=UserInDB)
 async def register(
     user_in: UserCreate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """Register a new user."""
     user_db = UserDB(User)
@@ -58,23 +57,23 @@ async def register(
             detail="Email already registered"
         )
     
-    # Create user
-    hashed_password = auth_service.get_password_hash(user_in.password)
+    # Create user; the writer is only taken for the insert, after hashing
+    hashed_password = await auth_service.get_password_hash(user_in.password)
     user_data = user_in.model_dump()
     user_data.pop("password")
     user_data["hashed_password"] = hashed_password
     
-    return await user_db.create(db, obj_in=user_data)
+    async with write_lane.session() as write_db:
+        return await user_db.create(write_db, obj_in=user_data)
 
 @router.post("/change-password")
 async def change_password(
     password_data: ChangePasswordRequest,
-    current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: User = Depends(auth_service.get_current_user)
 ) -> Any:
     """Change user password."""
     # Verify current password
-    if not auth_service.verify_password(
+    if not await auth_service.verify_password(
         password_data.current_password,
         current_user.hashed_password
     ):
@@ -85,14 +84,16 @@ async def change_password(
     
     # Update password
     user_db = UserDB(User)
-    new_hashed_password = auth_service.get_password_hash(
+    new_hashed_password = await auth_service.get_password_hash(
         password_data.new_password
     )
-    await user_db.update(
-        db,
-        db_obj=current_user,
-        obj_in={"hashed_password": new_hashed_password}
-    )
+    async with write_lane.session() as db:
+        await user_db.update(
+            db,
+            db_obj=current_user,
+            obj_in={"hashed_password": new_hashed_password}
+        )
+    auth_service.principals.invalidate(current_user.email)
     
     return {"message": "Password updated successfully"}
 
@@ -102,7 +103,7 @@ async def refresh_token(
 ) -> Any:
     """Refresh access token."""
     access_token = auth_service.create_access_token(
-        data={"sub": current_user.email}
+        data=auth_service.token_claims(current_user)
     )
     return {
         "access_token": access_token,
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, List
+from typing import Any, List, Optional
+import logging
 import asyncio
+from datetime import datetime
+from functools import partial
 
 from ...core.config import settings
 from ...services.auth import auth_service
-from ...services.database import get_db, ModemDB
+from ..pagination import paginate
+from ...services.database import get_db, get_read_db, read_lane, write_lane, ModemDB
 from ...services.modem_manager import ModemManager, ModemError
 from ...services.monitoring import modem_metrics
+from ...services.routing import activation_router
 from ...services.websocket import manager as ws_manager
 from ...schemas.modem import (
     ModemCreate,
@@ -17,19 +22,38 @@ from ...schemas.modem import (
     ModemStats
 )
 from ...models.models import User, Modem, ModemStatus
+from .sms import send_message_to_smshub
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.get("/", response_model=List[ModemInDB])
 async def get_modems(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    modem_status: Optional[ModemStatus] = Query(None, alias="status"),
+    country: Optional[str] = None,
+    operator: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
     current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
-    """Get all modems."""
+    """Get modems, oldest first; the next page's cursor is in X-Next-Cursor."""
     modem_db = ModemDB(Modem)
-    return await modem_db.get_multi(db, skip=skip, limit=limit)
+    return await paginate(
+        modem_db,
+        db,
+        response,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        filters={"status": modem_status, "country": country, "operator": operator},
+        created_from=created_from,
+        created_to=created_to
+    )
 
 @router.post("/", response_model=ModemInDB)
 async def create_modem(
@@ -65,7 +89,7 @@ async def create_modem(
 async def get_modem(
     modem_id: int,
     current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """Get modem by ID with stats."""
     modem_db = ModemDB(Modem)
@@ -152,7 +176,7 @@ async def delete_modem(
 async def connect_modem(
     modem_id: int,
     current_user: User = Depends(auth_service.get_current_active_superuser),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """Connect to modem."""
     modem_db = ModemDB(Modem)
@@ -178,11 +202,12 @@ async def connect_modem(
 async def disconnect_modem(
     modem_id: int,
     current_user: User = Depends(auth_service.get_current_active_superuser),
+    read_db: AsyncSession = Depends(get_read_db),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Disconnect from modem."""
     modem_db = ModemDB(Modem)
-    modem = await modem_db.get(db, modem_id)
+    modem = await modem_db.get(read_db, modem_id)
     if not modem:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -224,16 +249,18 @@ async def disconnect_modem(
 async def initialize_modem(modem_id: int, port: str):
     """Initialize modem and update its status."""
     modem_db = ModemDB(Modem)
-    async with AsyncSession(engine) as db:
+    async with read_lane.session() as db:
         modem = await modem_db.get(db, modem_id)
-        if not modem:
-            return
-        
-        try:
-            manager = ModemManager(port)
-            if await manager.connect():
-                # Update modem info
-                modem_info = manager.info
+    if not modem:
+        return
+    
+    # The writer is only taken for the status updates, not across modem I/O
+    try:
+        manager = ModemManager(port)
+        if await manager.connect():
+            # Update modem info
+            modem_info = manager.info
+            async with write_lane.session() as db:
                 await modem_db.update(
                     db,
                     db_obj=modem,
@@ -246,52 +273,73 @@ async def initialize_modem(modem_id: int, port: str):
                         "phone_number": modem_info["phone_number"]
                     }
                 )
-                
-                # Update metrics
-                modem_metrics.update_modem_status(
-                    modem.id,
-                    port,
-                    ModemStatus.ACTIVE.value
-                )
-                modem_metrics.update_signal_quality(
-                    modem.id,
-                    port,
-                    modem_info["signal_quality"]
-                )
-                
-                # Send WebSocket update
-                await ws_manager.send_modem_update(
-                    modem.id,
-                    modem_info
-                )
-                
-            else:
+            
+            # Update metrics
+            modem_metrics.update_modem_status(
+                modem.id,
+                port,
+                ModemStatus.ACTIVE.value
+            )
+            modem_metrics.update_signal_quality(
+                modem.id,
+                port,
+                modem_info["signal_quality"]
+            )
+            
+            # Send WebSocket update
+            await ws_manager.send_modem_update(
+                modem.id,
+                modem_info
+            )
+            
+            # Poll the modem for incoming SMS
+            asyncio.create_task(manager.wait_for_sms(
+                partial(receive_sms, modem.id, modem_info["phone_number"])
+            ))
+            
+        else:
+            async with write_lane.session() as db:
                 await modem_db.update(
                     db,
                     db_obj=modem,
                     obj_in={"status": ModemStatus.ERROR}
                 )
-                
-        except Exception as e:
-            logger.error(f"Failed to initialize modem {port}: {str(e)}")
+            
+    except Exception as e:
+        logger.error(f"Failed to initialize modem {port}: {str(e)}")
+        async with write_lane.session() as db:
             await modem_db.update(
                 db,
                 db_obj=modem,
                 obj_in={"status": ModemStatus.ERROR}
             )
 
+async def receive_sms(
+    modem_id: int,
+    phone_number: Optional[str],
+    sender: str,
+    text: str,
+    sent_at: Optional[str] = None
+):
+    """Store an SMS received by a modem and forward it to SMS Hub if it matched an activation."""
+    received = await activation_router.intake(modem_id, sender, text, phone_number, sent_at)
+    if received is None:
+        # Replay of a message already taken in
+        return
+    message, routed = received
+    if routed:
+        # Keep the polling loop going while SMS Hub is contacted
+        asyncio.create_task(send_message_to_smshub(
+            message.id,
+            message.sms_id,
+            message.phone_to,
+            message.phone_from,
+            message.text
+        ))
+
 async def get_modem_stats(modem: Modem, db: AsyncSession) -> ModemStats:
     """Get modem statistics."""
-    total_activations = len(modem.activations)
-    active_activations = sum(
-        1 for a in modem.activations
-        if a.status in [1, 2]  # WAITING or READY
-    )
-    total_sms = len(modem.sms_messages)
-    total_sms_received = sum(
-        1 for s in modem.sms_messages
-        if s.delivered
-    )
+    usage = await ModemDB(Modem).get_usage(db, modem.id)
     
     # Calculate uptime (if modem is active)
     uptime_minutes = 0
@@ -299,21 +347,14 @@ async def get_modem_stats(modem: Modem, db: AsyncSession) -> ModemStats:
         uptime = datetime.utcnow() - modem.updated_at
         uptime_minutes = uptime.total_seconds() / 60
     
-    # Calculate average signal quality
-    signal_qualities = [
-        s.signal_quality for s in modem.signal_qualities
-        if s.signal_quality is not None
-    ]
-    signal_quality_avg = (
-        sum(signal_qualities) / len(signal_qualities)
-        if signal_qualities else 0
-    )
+    # Signal quality history is not stored, so report the last reading
+    signal_quality_avg = modem.signal_quality or 0
     
     return ModemStats(
-        total_activations=total_activations,
-        active_activations=active_activations,
-        total_sms_sent=total_sms,
-        total_sms_received=total_sms_received,
+        total_activations=usage["activations"],
+        active_activations=usage["active_activations"],
+        total_sms_sent=usage["sms"],
+        total_sms_received=usage["sms_delivered"],
         uptime_minutes=uptime_minutes,
         signal_quality_avg=signal_quality_avg
     ) 
\ No newline at end of file
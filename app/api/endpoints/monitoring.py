@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Any, Dict, List
 from datetime import datetime, timedelta
 
+from backend.snapshot import SnapshotCache
 from ...core.config import settings
 from ...services.auth import auth_service
-from ...services.database import get_db, ModemDB, ActivationDB, SMSMessageDB
+from ...services.database import ModemDB, ActivationDB, SMSMessageDB, read_lane, write_lane
 from ...services.monitoring import system_metrics, health_check, modem_metrics
 from ...models.models import (
     User,
@@ -35,36 +36,39 @@ async def get_health_status(
     """Get system health status."""
     return await health_check.run_checks()
 
+@router.get("/pools")
+async def get_pool_stats(
+    current_user: User = Depends(auth_service.get_current_active_superuser)
+) -> Dict[str, Any]:
+    """Get connection pool usage and wait times of the read and write lanes."""
+    return {
+        "read": read_lane.get_stats(),
+        "write": write_lane.get_stats()
+    }
+
 @router.get("/stats/modems")
 async def get_modem_stats(
-    current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
-) -> Dict[str, Any]:
+    request: Request,
+    current_user: User = Depends(auth_service.get_current_user)
+) -> Any:
     """Get modem statistics."""
+    return await modems_snapshot.respond(request)
+
+async def _modems_stats(db: AsyncSession) -> Dict[str, Any]:
     modem_db = ModemDB(Modem)
-    modems = await modem_db.get_multi(db)
+    stats = await modem_db.get_stats(db)
     
-    total_modems = len(modems)
-    active_modems = sum(1 for m in modems if m.status == ModemStatus.ACTIVE)
-    busy_modems = sum(1 for m in modems if m.status == ModemStatus.BUSY)
-    error_modems = sum(1 for m in modems if m.status == ModemStatus.ERROR)
-    
-    # Calculate average signal quality
-    signal_qualities = [
-        m.signal_quality for m in modems
-        if m.signal_quality is not None
-    ]
-    avg_signal_quality = (
-        sum(signal_qualities) / len(signal_qualities)
-        if signal_qualities else 0
-    )
+    total_modems = stats["total"]
+    active_modems = stats["active"]
+    busy_modems = stats["busy"]
+    error_modems = stats["error"]
     
     return {
         "total": total_modems,
         "active": active_modems,
         "busy": busy_modems,
         "error": error_modems,
-        "average_signal_quality": avg_signal_quality,
+        "average_signal_quality": stats["average_signal_quality"],
         "status_distribution": {
             "active": active_modems / total_modems if total_modems > 0 else 0,
             "busy": busy_modems / total_modems if total_modems > 0 else 0,
@@ -73,36 +77,35 @@ async def get_modem_stats(
         }
     }
 
+modems_snapshot = SnapshotCache(
+    _modems_stats,
+    ttl=settings.STATS_CACHE_TTL,
+    max_stale=settings.STATS_CACHE_MAX_STALE,
+    session=read_lane.session
+)
+
 @router.get("/stats/activations")
 async def get_activation_stats(
-    current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
-) -> Dict[str, Any]:
+    request: Request,
+    current_user: User = Depends(auth_service.get_current_user)
+) -> Any:
     """Get activation statistics."""
+    return await activations_snapshot.respond(request)
+
+async def _activations_stats(db: AsyncSession) -> Dict[str, Any]:
     activation_db = ActivationDB(Activation)
-    activations = await activation_db.get_multi(db)
+    counts, avg_completion_time = await activation_db.get_stats(db)
     
-    total_activations = len(activations)
+    total_activations = sum(counts.values())
     status_counts = {
-        status.name.lower(): sum(1 for a in activations if a.status == status)
-        for status in ActivationStatus
+        status.name.lower(): count
+        for status, count in counts.items()
     }
     
     # Calculate success rate
     completed = status_counts.get("completed", 0)
     success_rate = (completed / total_activations * 100) if total_activations > 0 else 0
     
-    # Calculate average completion time for successful activations
-    completion_times = [
-        (a.updated_at - a.created_at).total_seconds()
-        for a in activations
-        if a.status == ActivationStatus.COMPLETED
-    ]
-    avg_completion_time = (
-        sum(completion_times) / len(completion_times)
-        if completion_times else 0
-    )
-    
     return {
         "total": total_activations,
         "status_distribution": {
@@ -114,42 +117,28 @@ async def get_activation_stats(
         "average_completion_time": avg_completion_time
     }
 
+activations_snapshot = SnapshotCache(
+    _activations_stats,
+    ttl=settings.STATS_CACHE_TTL,
+    max_stale=settings.STATS_CACHE_MAX_STALE,
+    session=read_lane.session
+)
+
 @router.get("/stats/sms")
 async def get_sms_stats(
-    current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
-) -> Dict[str, Any]:
+    request: Request,
+    current_user: User = Depends(auth_service.get_current_user)
+) -> Any:
     """Get SMS statistics."""
+    return await sms_snapshot.respond(request)
+
+async def _sms_stats(db: AsyncSession) -> Dict[str, Any]:
     sms_db = SMSMessageDB(SMSMessage)
-    messages = await sms_db.get_multi(db)
+    stats = await sms_db.get_stats(db)
     
-    total_messages = len(messages)
-    delivered_messages = sum(1 for m in messages if m.delivered)
-    failed_messages = sum(
-        1 for m in messages
-        if not m.delivered and m.delivery_attempts > 0
-    )
-    
-    # Calculate delivery times
-    delivery_times = [
-        (m.updated_at - m.created_at).total_seconds()
-        for m in messages
-        if m.delivered
-    ]
-    avg_delivery_time = (
-        sum(delivery_times) / len(delivery_times)
-        if delivery_times else 0
-    )
-    
-    # Calculate retry statistics
-    retry_counts = [
-        m.delivery_attempts for m in messages
-        if m.delivery_attempts > 0
-    ]
-    avg_retries = (
-        sum(retry_counts) / len(retry_counts)
-        if retry_counts else 0
-    )
+    total_messages = stats["total"]
+    delivered_messages = stats["delivered"]
+    failed_messages = stats["failed"]
     
     return {
         "total": total_messages,
@@ -157,8 +146,8 @@ async def get_sms_stats(
         "failed": failed_messages,
         "pending": total_messages - delivered_messages - failed_messages,
         "success_rate": (delivered_messages / total_messages * 100) if total_messages > 0 else 0,
-        "average_delivery_time": avg_delivery_time,
-        "average_retries": avg_retries,
+        "average_delivery_time": stats["average_delivery_time"],
+        "average_retries": stats["average_retries"],
         "delivery_distribution": {
             "delivered": delivered_messages / total_messages if total_messages > 0 else 0,
             "failed": failed_messages / total_messages if total_messages > 0 else 0,
@@ -166,90 +155,81 @@ async def get_sms_stats(
         }
     }
 
+sms_snapshot = SnapshotCache(
+    _sms_stats,
+    ttl=settings.STATS_CACHE_TTL,
+    max_stale=settings.STATS_CACHE_MAX_STALE,
+    session=read_lane.session
+)
+
 @router.get("/stats/hourly")
 async def get_hourly_stats(
-    current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
-) -> Dict[str, Any]:
+    request: Request,
+    current_user: User = Depends(auth_service.get_current_user)
+) -> Any:
     """Get hourly statistics for the last 24 hours."""
+    return await hourly_snapshot.respond(request)
+
+async def _hourly_stats(db: AsyncSession) -> Dict[str, Any]:
     now = datetime.utcnow()
     start_time = now - timedelta(hours=24)
     
-    # Get all records for the last 24 hours
     activation_db = ActivationDB(Activation)
     sms_db = SMSMessageDB(SMSMessage)
     
-    activations = await activation_db.get_multi(
-        db,
-        query=select(Activation).where(Activation.created_at >= start_time)
-    )
-    messages = await sms_db.get_multi(
-        db,
-        query=select(SMSMessage).where(SMSMessage.created_at >= start_time)
-    )
-    
-    # Initialize hourly buckets
-    hours = range(24)
-    stats = {hour: {
-        "activations": 0,
-        "sms_received": 0,
-        "sms_delivered": 0
-    } for hour in hours}
+    activations = await activation_db.count_by_hour(db, start_time)
+    messages = await sms_db.count_by_hour(db, start_time)
     
-    # Process activations
-    for activation in activations:
-        hour = activation.created_at.hour
-        stats[hour]["activations"] += 1
-    
-    # Process SMS messages
-    for message in messages:
-        hour = message.created_at.hour
-        stats[hour]["sms_received"] += 1
-        if message.delivered:
-            stats[hour]["sms_delivered"] += 1
+    stats = {
+        hour: {
+            "activations": activations.get(hour, 0),
+            "sms_received": messages.get(hour, (0, 0))[0],
+            "sms_delivered": messages.get(hour, (0, 0))[1]
+        }
+        for hour in range(24)
+    }
     
     return {
         "hourly_stats": stats,
         "current_hour": now.hour
     }
 
+hourly_snapshot = SnapshotCache(
+    _hourly_stats,
+    ttl=settings.STATS_CACHE_TTL,
+    max_stale=settings.STATS_CACHE_MAX_STALE,
+    session=read_lane.session
+)
+
 @router.get("/stats/errors")
 async def get_error_stats(
-    current_user: User = Depends(auth_service.get_current_active_superuser),
-    db: AsyncSession = Depends(get_db)
-) -> Dict[str, Any]:
+    request: Request,
+    current_user: User = Depends(auth_service.get_current_active_superuser)
+) -> Any:
     """Get error statistics."""
-    # Get modems in error state
+    return await errors_snapshot.respond(request)
+
+async def _errors_stats(db: AsyncSession) -> Dict[str, Any]:
     modem_db = ModemDB(Modem)
-    error_modems = await modem_db.get_multi(
-        db,
-        query=select(Modem).where(Modem.status == ModemStatus.ERROR)
-    )
-    
-    # Get failed SMS messages
     sms_db = SMSMessageDB(SMSMessage)
-    failed_messages = await sms_db.get_multi(
-        db,
-        query=select(SMSMessage).where(
-            SMSMessage.delivered == False,
-            SMSMessage.delivery_attempts > 0
-        )
-    )
     
-    # Analyze error patterns
-    error_patterns = {}
-    for message in failed_messages:
-        if message.last_error:
-            error_patterns[message.last_error] = (
-                error_patterns.get(message.last_error, 0) + 1
-            )
+    modem_stats = await modem_db.get_stats(db)
+    sms_stats = await sms_db.get_stats(db)
+    error_patterns = await sms_db.get_error_patterns(db)
     
     return {
-        "error_modems": len(error_modems),
-        "failed_messages": len(failed_messages),
+        "error_modems": modem_stats["error"],
+        "failed_messages": sms_stats["failed"],
         "error_patterns": error_patterns,
         "error_rate": {
-            "messages": len(failed_messages) / len(messages) if messages else 0,
-            "modems": len(error_modems) / len(modems) if modems else 0
+            "messages": sms_stats["failed"] / sms_stats["total"] if sms_stats["total"] else 0,
+            "modems": modem_stats["error"] / modem_stats["total"] if modem_stats["total"] else 0
         }
-    } 
\ No newline at end of file
+    }
+
+errors_snapshot = SnapshotCache(
+    _errors_stats,
+    ttl=settings.STATS_CACHE_TTL,
+    max_stale=settings.STATS_CACHE_MAX_STALE,
+    session=read_lane.session
+)
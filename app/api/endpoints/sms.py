@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, List
+from typing import Any, List, Optional
+import logging
 import uuid
 from datetime import datetime
 
 from ...core.config import settings
 from ...services.auth import auth_service
-from ...services.database import get_db, SMSMessageDB, ActivationDB
+from ..pagination import paginate
+from ..export import export_response
+from ...services.database import get_db, get_read_db, read_lane, write_lane, SMSMessageDB, ActivationDB
 from ...services.smshub_integration import SMSHubIntegration
 from ...services.monitoring import modem_metrics
 from ...services.websocket import manager as ws_manager
@@ -19,17 +22,66 @@ from ...schemas.sms import (
 from ...models.models import User, SMSMessage, Activation
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.get("/", response_model=List[SMSMessageInDB])
 async def get_messages(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    delivered: Optional[bool] = None,
+    modem_id: Optional[int] = None,
+    activation_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
     current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
-    """Get all SMS messages."""
+    """Get SMS messages, oldest first; the next page's cursor is in X-Next-Cursor."""
     sms_db = SMSMessageDB(SMSMessage)
-    return await sms_db.get_multi(db, skip=skip, limit=limit)
+    return await paginate(
+        sms_db,
+        db,
+        response,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        filters={"delivered": delivered, "modem_id": modem_id, "activation_id": activation_id},
+        created_from=created_from,
+        created_to=created_to
+    )
+
+@router.get("/export")
+async def export_messages(
+    format: str = "ndjson",
+    gzip: bool = False,
+    delivered: Optional[bool] = None,
+    modem_id: Optional[int] = None,
+    activation_id: Optional[int] = None,
+    service: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    current_user: User = Depends(auth_service.get_current_user)
+) -> Any:
+    """Stream every matching SMS message as NDJSON or CSV, oldest first."""
+    sms_db = SMSMessageDB(SMSMessage)
+    query = sms_db.filtered(
+        {"delivered": delivered, "modem_id": modem_id, "activation_id": activation_id},
+        created_from,
+        created_to
+    )
+    if service is not None:
+        # Messages carry their service through their activation
+        query = query.join(Activation, Activation.id == SMSMessage.activation_id).where(
+            Activation.service == service
+        )
+    return export_response(
+        query.with_only_columns(*SMSMessage.__table__.columns),
+        format,
+        gzip,
+        "sms_messages"
+    )
 
 @router.post("/", response_model=SMSMessageInDB)
 async def create_message(
@@ -71,17 +123,50 @@ async def create_message(
 async def get_undelivered_messages(
     limit: int = 100,
     current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """Get undelivered SMS messages."""
     sms_db = SMSMessageDB(SMSMessage)
     return await sms_db.get_undelivered(db, limit=limit)
 
+@router.get("/search", response_model=List[SMSMessageInDB])
+async def search_messages(
+    q: str,
+    modem_id: Optional[int] = None,
+    sender: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    newest_first: bool = False,
+    skip: int = 0,
+    limit: int = Query(50, le=200),
+    current_user: User = Depends(auth_service.get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+) -> Any:
+    """Search SMS text and senders; supports prefix terms (123*) and "quoted phrases"."""
+    sms_db = SMSMessageDB(SMSMessage)
+    try:
+        return await sms_db.search(
+            db,
+            q,
+            modem_id=modem_id,
+            sender=sender,
+            created_from=created_from,
+            created_to=created_to,
+            newest_first=newest_first,
+            skip=skip,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
 @router.get("/{sms_id}", response_model=SMSMessageInDB)
 async def get_message(
     sms_id: str,
     current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """Get SMS message by ID."""
     sms_db = SMSMessageDB(SMSMessage)
@@ -158,7 +243,7 @@ async def delete_message(
 async def get_activation_sms_stats(
     activation_id: int,
     current_user: User = Depends(auth_service.get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """Get SMS statistics for an activation."""
     activation_db = ActivationDB(Activation)
@@ -207,61 +292,65 @@ async def send_message_to_smshub(
     text: str
 ):
     """Send SMS message to SMS Hub."""
-    async with AsyncSession(engine) as db:
-        sms_db = SMSMessageDB(SMSMessage)
+    sms_db = SMSMessageDB(SMSMessage)
+    async with read_lane.session() as db:
         message = await sms_db.get(db, message_id)
-        if not message:
-            return
-        
-        try:
-            async with SMSHubIntegration(settings.SMSHUB_API_KEY) as smshub:
-                response = await smshub.push_sms(
-                    sms_id=sms_id,
-                    phone=phone,
-                    phone_from=phone_from,
-                    text=text
+    if not message:
+        return
+    
+    # The writer is only taken for the status update, not across the SMS Hub call
+    try:
+        async with SMSHubIntegration(settings.SMSHUB_API_KEY) as smshub:
+            response = await smshub.push_sms(
+                sms_id=sms_id,
+                phone=phone,
+                phone_from=phone_from,
+                text=text
+            )
+            
+        if response.status == "SUCCESS":
+            async with write_lane.session() as db:
+                message = await sms_db.update(
+                    db,
+                    db_obj=message,
+                    obj_in={
+                        "delivered": True,
+                        "delivery_attempts": message.delivery_attempts + 1
+                    }
                 )
-                
-                if response.status == "SUCCESS":
-                    await sms_db.update(
-                        db,
-                        db_obj=message,
-                        obj_in={
-                            "delivered": True,
-                            "delivery_attempts": message.delivery_attempts + 1
-                        }
-                    )
-                    
-                    # Update metrics
-                    modem_metrics.record_sms("delivered")
-                    delivery_time = (datetime.utcnow() - message.created_at).total_seconds()
-                    modem_metrics.record_sms_delivery_time(delivery_time)
-                    
-                else:
-                    await sms_db.update(
-                        db,
-                        db_obj=message,
-                        obj_in={
-                            "delivery_attempts": message.delivery_attempts + 1,
-                            "last_error": response.error
-                        }
-                    )
-                    
-                    # Update metrics
-                    modem_metrics.record_sms("failed")
-                
-                # Send WebSocket update
-                await ws_manager.send_sms_update(
-                    sms_id,
-                    {
-                        "delivered": message.delivered,
-                        "delivery_attempts": message.delivery_attempts,
-                        "last_error": message.last_error
+            
+            # Update metrics
+            modem_metrics.record_sms("delivered")
+            delivery_time = (datetime.utcnow() - message.created_at).total_seconds()
+            modem_metrics.record_sms_delivery_time(delivery_time)
+            
+        else:
+            async with write_lane.session() as db:
+                message = await sms_db.update(
+                    db,
+                    db_obj=message,
+                    obj_in={
+                        "delivery_attempts": message.delivery_attempts + 1,
+                        "last_error": response.error
                     }
                 )
-                
-        except Exception as e:
-            logger.error(f"Failed to send SMS {sms_id} to SMS Hub: {str(e)}")
+            
+            # Update metrics
+            modem_metrics.record_sms("failed")
+        
+        # Send WebSocket update
+        await ws_manager.send_sms_update(
+            sms_id,
+            {
+                "delivered": message.delivered,
+                "delivery_attempts": message.delivery_attempts,
+                "last_error": message.last_error
+            }
+        )
+            
+    except Exception as e:
+        logger.error(f"Failed to send SMS {sms_id} to SMS Hub: {str(e)}")
+        async with write_lane.session() as db:
             await sms_db.update(
                 db,
                 db_obj=message,
@@ -269,4 +358,4 @@ async def send_message_to_smshub(
                     "delivery_attempts": message.delivery_attempts + 1,
                     "last_error": str(e)
                 }
-            ) 
\ No newline at end of file
+            )
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Any, List
+from typing import Any, List, Optional
 
 from ...core.config import settings
 from ...services.auth import auth_service
-from ...services.database import get_db, UserDB, AuditLogDB
+from ..pagination import paginate
+from ...services.database import get_db, get_read_db, UserDB, AuditLogDB
 from ...schemas.user import (
     UserCreate,
     UserUpdate,
@@ -27,6 +28,7 @@ async def get_current_user_info(
 async def update_current_user(
     user_in: UserUpdate,
     current_user: User = Depends(auth_service.get_current_user),
+    read_db: AsyncSession = Depends(get_read_db),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Update current user information."""
@@ -34,7 +36,7 @@ async def update_current_user(
     
     # Check email uniqueness if changing email
     if user_in.email and user_in.email != current_user.email:
-        existing_user = await user_db.get_by_email(db, user_in.email)
+        existing_user = await user_db.get_by_email(read_db, user_in.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -44,12 +46,13 @@ async def update_current_user(
     # Update user
     user_data = user_in.model_dump(exclude_unset=True)
     if user_in.password:
-        user_data["hashed_password"] = auth_service.get_password_hash(
+        user_data["hashed_password"] = await auth_service.get_password_hash(
             user_in.password
         )
         user_data.pop("password", None)
     
     user = await user_db.update(db, db_obj=current_user, obj_in=user_data)
+    auth_service.principals.invalidate(current_user.email, user.email)
     
     # Create audit log
     audit_db = AuditLogDB(AuditLog)
@@ -68,26 +71,38 @@ async def update_current_user(
 
 @router.get("/", response_model=List[UserInDB])
 async def get_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
     current_user: User = Depends(auth_service.get_current_active_superuser),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
-    """Get all users (admin only)."""
+    """Get users, oldest first (admin only); the next page's cursor is in X-Next-Cursor."""
     user_db = UserDB(User)
-    return await user_db.get_multi(db, skip=skip, limit=limit)
+    return await paginate(
+        user_db,
+        db,
+        response,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        filters={"is_active": is_active}
+    )
 
 @router.post("/", response_model=UserInDB)
 async def create_user(
     user_in: UserCreate,
     current_user: User = Depends(auth_service.get_current_active_superuser),
+    read_db: AsyncSession = Depends(get_read_db),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Create new user (admin only)."""
     user_db = UserDB(User)
     
     # Check if user exists
-    existing_user = await user_db.get_by_email(db, user_in.email)
+    existing_user = await user_db.get_by_email(read_db, user_in.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -96,7 +111,7 @@ async def create_user(
     
     # Create user
     user_data = user_in.model_dump()
-    user_data["hashed_password"] = auth_service.get_password_hash(
+    user_data["hashed_password"] = await auth_service.get_password_hash(
         user_data.pop("password")
     )
     
@@ -120,7 +135,7 @@ async def create_user(
 async def get_user(
     user_id: int,
     current_user: User = Depends(auth_service.get_current_active_superuser),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Any:
     """Get user by ID with audit logs (admin only)."""
     user_db = UserDB(User)
@@ -137,11 +152,12 @@ async def update_user(
     user_id: int,
     user_in: UserUpdate,
     current_user: User = Depends(auth_service.get_current_active_superuser),
+    read_db: AsyncSession = Depends(get_read_db),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Update user (admin only)."""
     user_db = UserDB(User)
-    user = await user_db.get(db, user_id)
+    user = await user_db.get(read_db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -150,7 +166,7 @@ async def update_user(
     
     # Check email uniqueness if changing email
     if user_in.email and user_in.email != user.email:
-        existing_user = await user_db.get_by_email(db, user_in.email)
+        existing_user = await user_db.get_by_email(read_db, user_in.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -160,12 +176,14 @@ async def update_user(
     # Update user
     user_data = user_in.model_dump(exclude_unset=True)
     if user_in.password:
-        user_data["hashed_password"] = auth_service.get_password_hash(
+        user_data["hashed_password"] = await auth_service.get_password_hash(
             user_in.password
         )
         user_data.pop("password", None)
     
+    email = user.email
     user = await user_db.update(db, db_obj=user, obj_in=user_data)
+    auth_service.principals.invalidate(email, user.email)
     
     # Create audit log
     audit_db = AuditLogDB(AuditLog)
@@ -217,5 +235,6 @@ async def delete_user(
     
     # Delete user
     await user_db.delete(db, id=user_id)
+    auth_service.principals.invalidate(user.email)
     
     return {"message": "User deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1,98 @@
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql.expression import Select
+from typing import Any, AsyncIterator, List, Sequence
+from datetime import datetime
+import csv
+import enum
+import io
+import json
+import zlib
+
+from ..services.database import read_lane
+
+# Rows fetched from the server-side cursor per round trip
+EXPORT_BATCH_ROWS = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+def _ndjson(columns: List[str], rows: Sequence) -> str:
+    return "".join(
+        json.dumps({name: _plain(value) for name, value in zip(columns, row)}, default=str) + "\n"
+        for row in rows
+    )
+
+def _csv(columns: List[str], rows: Sequence, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            json.dumps(value) if isinstance(value, (dict, list)) else _plain(value)
+            for value in row
+        ])
+    return buffer.getvalue()
+
+async def _export_chunks(query: Select, format: str, compress: bool) -> AsyncIterator[bytes]:
+    columns = [column.name for column in query.selected_columns]
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # 31: gzip container
+
+    # The export holds its own read-only session for as long as the response streams
+    async with read_lane.session() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        first = True
+        async for rows in result.partitions():
+            if format == "csv":
+                chunk = _csv(columns, rows, header=first).encode()
+            else:
+                chunk = _ndjson(columns, rows).encode()
+            first = False
+
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+        if format == "csv" and first:
+            chunk = _csv(columns, [], header=True).encode()
+            yield compressor.compress(chunk) if compressor is not None else chunk
+
+    if compressor is not None:
+        yield compressor.flush()
+
+def export_response(query: Select, format: str, compress: bool, filename: str) -> StreamingResponse:
+    """
+    Stream every row of query as NDJSON or CSV with chunked transfer.
+
+    query should select plain columns (e.g. filtered().with_only_columns())
+    so rows come back as tuples. They are read through a server-side cursor
+    EXPORT_BATCH_ROWS at a time, so memory stays flat whatever the row count.
+    With compress the body is gzip-encoded here; otherwise GZipMiddleware
+    still compresses it for clients that accept gzip.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format: {format}"
+        )
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        _export_chunks(query, format, compress),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers
+    )
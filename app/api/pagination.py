@@ -0,0 +1,43 @@
+from fastapi import HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+from ..services.database import DatabaseService
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+async def paginate(
+    db_service: DatabaseService,
+    db: AsyncSession,
+    response: Response,
+    *,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> List[Any]:
+    """
+    List records oldest first. Without skip, pages are keyset-paginated and
+    the next page's cursor is returned in the X-Next-Cursor header; skip
+    keeps the old offset paging for existing clients.
+    """
+    query = db_service.filtered(filters, created_from, created_to)
+
+    if skip:
+        return await db_service.get_multi(db, skip=skip, limit=limit, query=query)
+
+    try:
+        items, next_cursor = await db_service.get_page(db, cursor=cursor, limit=limit, query=query)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 from prometheus_client import make_asgi_app
+import asyncio
 import logging
 import logging.config
 import yaml
@@ -15,7 +16,9 @@ from .services.websocket import manager
 from .services.monitoring import health_check, system_metrics
 from .services.auth import auth_service
 from .models import models
-from .services.database import engine
+from .services.database import engine, read_engine, read_lane, wal_checkpointer
+from .services.search import create_sms_search_index
+from .services.routing import activation_router
 
 # Configure logging
 logging_config = {
@@ -85,6 +88,14 @@ async def startup_event():
         # Create database tables
         async with engine.begin() as conn:
             await conn.run_sync(models.Base.metadata.create_all)
+            await conn.run_sync(create_sms_search_index)
+
+        wal_checkpointer.start()
+
+        # Index open activations so incoming SMS are routed without a database read
+        async with read_lane.session() as db:
+            await activation_router.load(db)
+        asyncio.create_task(activation_router.keywords.run_periodically(settings.SERVICE_KEYWORDS_RELOAD_INTERVAL))
             
         # Load modem configuration
         if settings.MODEM_CONFIG_PATH.exists():
@@ -108,7 +119,9 @@ async def shutdown_event():
     """Cleanup on application shutdown."""
     try:
         # Close database connections
+        wal_checkpointer.stop()
         await engine.dispose()
+        await read_engine.dispose()
         logger.info("Application shutdown complete")
         
     except Exception as e:
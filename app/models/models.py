@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Text, Enum, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Text, Enum, JSON, Index, Float, text as sql_text
 from sqlalchemy.orm import relationship
 import enum
 from .base import Base
@@ -31,6 +31,10 @@ class Modem(Base):
     country = Column(String)
     config = Column(JSON)
     
+    __table_args__ = (
+        Index("ix_modems_status_country_operator", "status", "country", "operator"),
+    )
+    
     activations = relationship("Activation", back_populates="modem")
     sms_messages = relationship("SMSMessage", back_populates="modem")
 
@@ -48,6 +52,11 @@ class Activation(Base):
     price = Column(Float)
     currency = Column(Integer)
     
+    __table_args__ = (
+        Index("ix_activations_modem_id_status", "modem_id", "status"),
+        Index("ix_activations_created_at", "created_at"),
+    )
+    
     modem = relationship("Modem", back_populates="activations")
     sms_messages = relationship("SMSMessage", back_populates="activation")
 
@@ -65,6 +74,16 @@ class SMSMessage(Base):
     delivery_attempts = Column(Integer, default=0)
     last_error = Column(Text)
     
+    __table_args__ = (
+        Index("ix_sms_messages_delivered_created_at", "delivered", "created_at"),
+        # Partial index for the undelivered SMS queue
+        Index(
+            "ix_sms_messages_undelivered_created_at", "created_at",
+            sqlite_where=sql_text("delivered = 0"),
+            postgresql_where=sql_text("NOT delivered")
+        ),
+    )
+    
     modem = relationship("Modem", back_populates="sms_messages")
     activation = relationship("Activation", back_populates="sms_messages")
 
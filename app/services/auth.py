@@ -1,13 +1,16 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import hashlib
 import jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.ext.asyncio import AsyncSession
 from ..core.config import settings
 from ..models.models import User
-from ..services.database import UserDB, get_db
+from ..services.database import UserDB, read_lane
+from ..services.hashing import PasswordHasher
+from ..services.principals import PrincipalCache
+from ..services.monitoring import password_hash_wait, password_hash_queued, password_hash_rejected
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
@@ -15,27 +18,44 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login
 class AuthService:
     def __init__(self):
         self.pwd_context = pwd_context
+        self.hasher = PasswordHasher(
+            settings.PASSWORD_HASH_WORKERS,
+            settings.PASSWORD_HASH_MAX_QUEUE,
+            on_reject=lambda operation: password_hash_rejected.labels(operation=operation).inc(),
+            on_queue=password_hash_queued.set,
+            on_wait=lambda operation, wait: password_hash_wait.labels(operation=operation).observe(wait)
+        )
         self.user_db = UserDB(User)
+        self.principals = PrincipalCache(settings.AUTH_CACHE_TTL, settings.AUTH_CACHE_SIZE)
+        
+    @staticmethod
+    def token_version(user: User) -> str:
+        """Get the token version of a user, which changes with their password."""
+        return hashlib.blake2b(user.hashed_password.encode(), digest_size=8).hexdigest()
+        
+    def token_claims(self, user: User) -> Dict[str, Any]:
+        """Get the claims of an access token for a user."""
+        return {"sub": user.email, "ver": self.token_version(user)}
         
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash."""
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await self.hasher.run("verify", self.pwd_context.verify, plain_password, hashed_password)
         
-    def get_password_hash(self, password: str) -> str:
+    async def get_password_hash(self, password: str) -> str:
         """Generate password hash."""
-        return self.pwd_context.hash(password)
+        return await self.hasher.run("hash", self.pwd_context.hash, password)
         
     async def authenticate_user(
         self,
-        db: AsyncSession,
         email: str,
         password: str
     ) -> Optional[User]:
-        """Authenticate a user by email and password."""
-        user = await self.user_db.get_by_email(db, email)
+        """Authenticate a user by email and password, verifying after the read session is closed."""
+        async with read_lane.session() as db:
+            user = await self.user_db.get_by_email(db, email)
         if not user:
             return None
-        if not self.verify_password(password, user.hashed_password):
+        if not await self.verify_password(password, user.hashed_password):
             return None
         return user
         
@@ -64,10 +84,9 @@ class AuthService:
         
     async def get_current_user(
         self,
-        db: AsyncSession = Depends(get_db),
         token: str = Depends(oauth2_scheme)
     ) -> User:
-        """Get current authenticated user from token."""
+        """Get current authenticated user from token, from the database only on a cache miss."""
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -83,13 +102,22 @@ class AuthService:
             email: str = payload.get("sub")
             if email is None:
                 raise credentials_exception
+            # Tokens issued before versioning carry no "ver"
+            version: Optional[str] = payload.get("ver")
                 
         except jwt.PyJWTError:
             raise credentials_exception
             
-        user = await self.user_db.get_by_email(db, email)
+        user = self.principals.get(email, version)
         if user is None:
-            raise credentials_exception
+            async with read_lane.session() as db:
+                user = await self.user_db.get_by_email(db, email)
+            if user is None:
+                raise credentials_exception
+            if version is not None and version != self.token_version(user):
+                # Issued before the password last changed
+                raise credentials_exception
+            self.principals.put(email, version, user)
             
         if not user.is_active:
             raise HTTPException(
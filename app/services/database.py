@@ -1,10 +1,35 @@
-from typing import Optional, List, Type, TypeVar, Generic
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import select, update, delete
+from typing import Optional, List, Type, TypeVar, Generic, Dict, Any, Tuple
+from datetime import datetime
+import base64
+import json
+import logging
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import create_engine, select, insert, update, delete, tuple_, func, case, inspect
 from sqlalchemy.sql.expression import Select
+from backend import lanes
+from backend.lanes import PoolLane
+from backend.sqlite import apply_sqlite_profile, WALCheckpointer
 from ..core.config import settings
 from ..models.base import Base
+from ..models.models import Activation, SMSMessage, ModemStatus, ActivationStatus
+from .monitoring import db_pool_wait
+from .search import sms_fts, sms_fts_match, fts_query, SEARCH_RANK_WINDOW
+
+logger = logging.getLogger(__name__)
+
+def encode_cursor(obj) -> str:
+    """Build an opaque cursor pointing just after obj in (created_at, id) order."""
+    raw = json.dumps([obj.created_at.isoformat(), obj.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from encode_cursor(); raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 # Generic type for models
 ModelType = TypeVar("ModelType", bound=Base)
@@ -30,19 +55,78 @@ class DatabaseService(Generic[ModelType]):
     ) -> List[ModelType]:
         """Get multiple records with optional filtering."""
         if query is None:
-            query = select(self.model)
+            query = select(self.model).order_by(self.model.created_at, self.model.id)
             
         query = query.offset(skip).limit(limit)
         result = await db.execute(query)
         return result.scalars().all()
+
+    def filtered(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None
+    ) -> Select:
+        """Build a query matching column values and a created_at range, in (created_at, id) order."""
+        query = select(self.model)
+        for field, value in (filters or {}).items():
+            if value is not None:
+                query = query.where(getattr(self.model, field) == value)
+        if created_from is not None:
+            query = query.where(self.model.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(self.model.created_at < created_to)
+        return query.order_by(self.model.created_at, self.model.id)
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        query: Optional[Select] = None
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Get the page of records after cursor, plus the cursor of the next
+        page or None on the last page. query must be ordered by
+        (created_at, id), as filtered() builds it.
+        """
+        if query is None:
+            query = self.filtered()
+        if cursor:
+            created_at, id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(self.model.created_at, self.model.id) > tuple_(created_at, id)
+            )
+
+        # One extra row tells whether there is a next page
+        result = await db.execute(query.limit(limit + 1))
+        items = list(result.scalars().all())
+        if len(items) <= limit:
+            return items, None
+        items = items[:limit]
+        return items, encode_cursor(items[-1])
         
     async def create(self, db: AsyncSession, *, obj_in: dict) -> ModelType:
-        """Create a new record."""
-        db_obj = self.model(**obj_in)
-        db.add(db_obj)
+        """Create a new record, reading its generated columns back with RETURNING."""
+        result = await db.execute(
+            insert(self.model).values(**obj_in).returning(self.model)
+        )
+        db_obj = result.scalar_one()
         await db.commit()
-        await db.refresh(db_obj)
         return db_obj
+
+    async def create_many(self, db: AsyncSession, *, objs_in: List[dict]) -> List[ModelType]:
+        """Create records in one INSERT ... RETURNING, in the order given."""
+        if not objs_in:
+            return []
+        result = await db.execute(
+            insert(self.model).returning(self.model, sort_by_parameter_order=True),
+            objs_in
+        )
+        db_objs = list(result.scalars().all())
+        await db.commit()
+        return db_objs
         
     async def update(
         self,
@@ -52,13 +136,47 @@ class DatabaseService(Generic[ModelType]):
         obj_in: dict
     ) -> ModelType:
         """Update an existing record."""
-        for field, value in obj_in.items():
-            if hasattr(db_obj, field):
-                setattr(db_obj, field, value)
-                
+        return await self.update_by_id(db, id=db_obj.id, obj_in=obj_in) or db_obj
+
+    def _column_values(self, obj_in: dict) -> dict:
+        columns = inspect(self.model).column_attrs.keys()
+        return {field: value for field, value in obj_in.items() if field in columns}
+
+    async def update_by_id(self, db: AsyncSession, *, id: int, obj_in: dict) -> Optional[ModelType]:
+        """Update a record by ID in one UPDATE ... RETURNING; None if it does not exist."""
+        values = self._column_values(obj_in)
+        if not values:
+            # Nothing to set, e.g. an empty PATCH body
+            return await self.get(db, id)
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id == id)
+            .values(**values)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        db_obj = result.scalar_one_or_none()
         await db.commit()
-        await db.refresh(db_obj)
         return db_obj
+
+    async def update_many(self, db: AsyncSession, *, ids: List[int], obj_in: dict) -> List[ModelType]:
+        """Apply the same values to many records in one statement, returning the updated rows."""
+        if not ids:
+            return []
+        values = self._column_values(obj_in)
+        if not values:
+            result = await db.execute(select(self.model).where(self.model.id.in_(ids)))
+            return list(result.scalars().all())
+        result = await db.execute(
+            update(self.model)
+            .where(self.model.id.in_(ids))
+            .values(**values)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        db_objs = list(result.scalars().all())
+        await db.commit()
+        return db_objs
         
     async def delete(self, db: AsyncSession, *, id: int) -> bool:
         """Delete a record by ID."""
@@ -68,30 +186,60 @@ class DatabaseService(Generic[ModelType]):
         await db.commit()
         return result.rowcount > 0
 
-# Database engine and session factory
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.LOG_LEVEL == "DEBUG",
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10
-)
+def create_lane(name: str, read_only: bool) -> PoolLane:
+    """Create the engine for a lane from settings, read-only or the writer."""
+    if read_only:
+        pool_size, max_overflow = settings.DB_READ_POOL_SIZE, settings.DB_READ_MAX_OVERFLOW
+    else:
+        pool_size, max_overflow = settings.DB_WRITE_POOL_SIZE, settings.DB_WRITE_MAX_OVERFLOW
+    return lanes.create_lane(
+        name,
+        settings.DATABASE_URL,
+        read_only=read_only,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        sqlite_profile=settings.SQLITE_PROFILE,
+        echo=settings.LOG_LEVEL == "DEBUG",
+        on_wait=db_pool_wait.labels(lane=name).observe
+    )
 
-async_session = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False
+# Database engines and session factories
+write_lane = create_lane("write", read_only=False)
+read_lane = create_lane("read", read_only=True)
+
+engine = write_lane.engine
+read_engine = read_lane.engine
+async_session = write_lane.sessionmaker
+
+# Checkpoints run on a thread, so they get a sync engine for the same database file
+checkpoint_engine = engine.sync_engine
+if engine.dialect.name == "sqlite":
+    checkpoint_engine = create_engine(engine.url.set(drivername="sqlite"))
+    apply_sqlite_profile(checkpoint_engine, settings.SQLITE_PROFILE, manual_checkpoints=True)
+
+wal_checkpointer = WALCheckpointer(
+    checkpoint_engine,
+    interval=settings.SQLITE_CHECKPOINT_INTERVAL,
+    truncate_size=settings.SQLITE_WAL_TRUNCATE_SIZE,
+    max_size=settings.SQLITE_WAL_MAX_SIZE
 )
 
 async def get_db() -> AsyncSession:
-    """Dependency for getting database sessions."""
-    async with async_session() as session:
-        try:
-            yield session
-        finally:
-            await session.close()
+    """Dependency for getting database sessions on the write lane."""
+    async with write_lane.session() as session:
+        yield session
+
+async def get_read_db() -> AsyncSession:
+    """Dependency for read-only sessions, for listings and reports."""
+    async with read_lane.session() as session:
+        yield session
+
+def seconds_between(start, end):
+    """SQL expression for the number of seconds from start to end."""
+    if engine.dialect.name == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    return func.extract("epoch", end - start)
 
 # Specific database services
 class ModemDB(DatabaseService["Modem"]):
@@ -109,6 +257,50 @@ class ModemDB(DatabaseService["Modem"]):
         )
         return result.scalars().all()
 
+    async def get_stats(self, db: AsyncSession) -> Dict[str, Any]:
+        """Get modem counts per status and the average signal quality."""
+        status = self.model.status
+        row = (await db.execute(
+            select(
+                func.count(),
+                func.sum(case((status == ModemStatus.ACTIVE, 1), else_=0)),
+                func.sum(case((status == ModemStatus.BUSY, 1), else_=0)),
+                func.sum(case((status == ModemStatus.ERROR, 1), else_=0)),
+                func.avg(self.model.signal_quality)
+            )
+        )).one()
+        total, active, busy, error, avg_signal_quality = row
+        return {
+            "total": total,
+            "active": active or 0,
+            "busy": busy or 0,
+            "error": error or 0,
+            "average_signal_quality": avg_signal_quality or 0
+        }
+
+    async def get_usage(self, db: AsyncSession, modem_id: int) -> Dict[str, int]:
+        """Get activation and SMS counts of a modem in one round trip."""
+        row = (await db.execute(
+            select(
+                select(func.count())
+                .where(Activation.modem_id == modem_id)
+                .scalar_subquery(),
+                select(func.count())
+                .where(
+                    Activation.modem_id == modem_id,
+                    Activation.status.in_([ActivationStatus.WAITING, ActivationStatus.READY])
+                )
+                .scalar_subquery(),
+                select(func.count())
+                .where(SMSMessage.modem_id == modem_id)
+                .scalar_subquery(),
+                select(func.count())
+                .where(SMSMessage.modem_id == modem_id, SMSMessage.delivered == True)
+                .scalar_subquery()
+            )
+        )).one()
+        return dict(zip(("activations", "active_activations", "sms", "sms_delivered"), row))
+
 class ActivationDB(DatabaseService["Activation"]):
     async def get_by_activation_id(
         self,
@@ -130,11 +322,47 @@ class ActivationDB(DatabaseService["Activation"]):
         result = await db.execute(
             select(self.model).where(
                 self.model.modem_id == modem_id,
-                self.model.status.in_([1, 2])  # WAITING or READY
+                self.model.status.in_([ActivationStatus.WAITING, ActivationStatus.READY])
             )
         )
         return result.scalars().all()
 
+    async def get_open(self, db: AsyncSession) -> List["Activation"]:
+        """Get all active activations, oldest first."""
+        result = await db.execute(
+            select(self.model).where(
+                self.model.status.in_([ActivationStatus.WAITING, ActivationStatus.READY])
+            ).order_by(self.model.id)
+        )
+        return result.scalars().all()
+
+    async def get_stats(self, db: AsyncSession) -> Tuple[Dict[ActivationStatus, int], float]:
+        """Get activation counts per status and the average completion time in seconds."""
+        result = await db.execute(
+            select(
+                self.model.status,
+                func.count(),
+                func.avg(seconds_between(self.model.created_at, self.model.updated_at))
+            ).group_by(self.model.status)
+        )
+        counts = {status: 0 for status in ActivationStatus}
+        avg_completion_time = 0
+        for status, count, avg_seconds in result.all():
+            counts[status] = count
+            if status == ActivationStatus.COMPLETED:
+                avg_completion_time = avg_seconds or 0
+        return counts, avg_completion_time
+
+    async def count_by_hour(self, db: AsyncSession, since: datetime) -> Dict[int, int]:
+        """Count activations created since a time, per hour of day."""
+        hour = func.extract("hour", self.model.created_at)
+        result = await db.execute(
+            select(hour, func.count())
+            .where(self.model.created_at >= since)
+            .group_by(hour)
+        )
+        return {int(h): count for h, count in result.all()}
+
 class SMSMessageDB(DatabaseService["SMSMessage"]):
     async def get_undelivered(
         self,
@@ -160,6 +388,136 @@ class SMSMessageDB(DatabaseService["SMSMessage"]):
             select(self.model).where(self.model.sms_id == sms_id)
         )
         return result.scalar_one_or_none()
+        
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        *,
+        modem_id: Optional[int] = None,
+        sender: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        newest_first: bool = False,
+        skip: int = 0,
+        limit: int = 50
+    ) -> List["SMSMessage"]:
+        """
+        Full-text search over message text and sender, best matches first
+        or newest first. query takes prefix terms (123*) and "quoted
+        phrases"; raises ValueError if it is empty.
+        """
+        def with_filters(statement: Select) -> Select:
+            if modem_id is not None:
+                statement = statement.where(self.model.modem_id == modem_id)
+            if sender is not None:
+                statement = statement.where(self.model.phone_from == sender)
+            if created_from is not None:
+                statement = statement.where(self.model.created_at >= created_from)
+            if created_to is not None:
+                statement = statement.where(self.model.created_at < created_to)
+            return statement
+
+        if engine.dialect.name != "sqlite":
+            # No FTS5 outside SQLite; fall back to substring matching
+            if not query.strip():
+                raise ValueError("Empty search query")
+            statement = with_filters(
+                select(self.model).where(self.model.text.ilike(f"%{query.strip()}%"))
+            ).order_by(self.model.id.desc())
+            result = await db.execute(statement.offset(skip).limit(limit))
+            return result.scalars().all()
+
+        match = sms_fts_match(fts_query(query))
+        statement = with_filters(
+            select(self.model).join(sms_fts, sms_fts.c.rowid == self.model.id).where(match)
+        )
+
+        if newest_first:
+            # The index returns rowids in order, so this needs no sort
+            statement = statement.order_by(sms_fts.c.rowid.desc())
+        else:
+            # Scoring every match of a common term is slow, so only the newest
+            # SEARCH_RANK_WINDOW matches are ranked; the index walks them by rowid
+            window = with_filters(
+                select(sms_fts.c.rowid).join(self.model, self.model.id == sms_fts.c.rowid).where(match)
+            ).order_by(sms_fts.c.rowid.desc()).limit(SEARCH_RANK_WINDOW).subquery()
+            oldest = select(func.min(window.c.rowid)).scalar_subquery()
+            statement = statement.where(sms_fts.c.rowid >= oldest).order_by(sms_fts.c.rank, self.model.id)
+
+        result = await db.execute(statement.offset(skip).limit(limit))
+        return result.scalars().all()
+
+    async def mark_delivered(
+        self,
+        db: AsyncSession,
+        ids: List[int]
+    ) -> List["SMSMessage"]:
+        """Mark a batch of SMS messages delivered in one statement."""
+        return await self.update_many(
+            db,
+            ids=ids,
+            obj_in={
+                "delivered": True,
+                "delivery_attempts": self.model.delivery_attempts + 1,
+                "last_error": None
+            }
+        )
+
+    async def get_stats(self, db: AsyncSession) -> Dict[str, Any]:
+        """Get delivery counts, average delivery time and average retries."""
+        delivered = self.model.delivered == True
+        failed = (self.model.delivered == False) & (self.model.delivery_attempts > 0)
+        row = (await db.execute(
+            select(
+                func.count(),
+                func.sum(case((delivered, 1), else_=0)),
+                func.sum(case((failed, 1), else_=0)),
+                func.avg(case(
+                    (delivered, seconds_between(self.model.created_at, self.model.updated_at)),
+                    else_=None
+                )),
+                func.avg(case(
+                    (self.model.delivery_attempts > 0, self.model.delivery_attempts),
+                    else_=None
+                ))
+            )
+        )).one()
+        total, delivered_count, failed_count, avg_delivery_time, avg_retries = row
+        return {
+            "total": total,
+            "delivered": delivered_count or 0,
+            "failed": failed_count or 0,
+            "average_delivery_time": avg_delivery_time or 0,
+            "average_retries": avg_retries or 0
+        }
+
+    async def count_by_hour(self, db: AsyncSession, since: datetime) -> Dict[int, Tuple[int, int]]:
+        """Count messages received and delivered since a time, per hour of day."""
+        hour = func.extract("hour", self.model.created_at)
+        result = await db.execute(
+            select(
+                hour,
+                func.count(),
+                func.sum(case((self.model.delivered == True, 1), else_=0))
+            )
+            .where(self.model.created_at >= since)
+            .group_by(hour)
+        )
+        return {int(h): (received, delivered or 0) for h, received, delivered in result.all()}
+
+    async def get_error_patterns(self, db: AsyncSession) -> Dict[str, int]:
+        """Count undelivered messages per last delivery error."""
+        result = await db.execute(
+            select(self.model.last_error, func.count())
+            .where(
+                self.model.delivered == False,
+                self.model.delivery_attempts > 0,
+                self.model.last_error.isnot(None)
+            )
+            .group_by(self.model.last_error)
+        )
+        return dict(result.all())
 
 class UserDB(DatabaseService["User"]):
     async def get_by_email(
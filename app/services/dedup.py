@@ -0,0 +1,44 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class DuplicateFilter:
+    """
+    Content hashes of recently received SMS, so a message the modem hands
+    over again (a failed AT+CMGD, a modem reset, a re-sent part) is
+    dropped instead of stored and forwarded twice. Keys expire after
+    window seconds and at most max_entries are kept, oldest dropped first;
+    16-byte digests keep a large window cheap.
+    """
+
+    def __init__(self, window: float, max_entries: int):
+        self.window = window
+        self.max_entries = max_entries
+        self._seen: "OrderedDict[bytes, float]" = OrderedDict()
+
+    @staticmethod
+    def key(modem_id: Optional[int], sender: str, sent_at: Optional[str], text: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (str(modem_id), sender, sent_at or "", text):
+            digest.update(part.encode("utf-8", "surrogatepass"))
+            digest.update(b"\0")
+        return digest.digest()
+
+    def seen(self, key: bytes) -> bool:
+        """Remember key, returning whether it was already seen within the window."""
+        now = time.monotonic()
+        while self._seen:
+            oldest, expires = next(iter(self._seen.items()))
+            if expires > now and len(self._seen) < self.max_entries:
+                break
+            del self._seen[oldest]
+
+        if key in self._seen:
+            return True
+        self._seen[key] = now + self.window
+        return False
+
+    def forget(self, key: bytes):
+        """Drop key, so the message is accepted again if it is replayed."""
+        self._seen.pop(key, None)
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+import asyncio
+import time
+from fastapi import HTTPException, status
+
+T = TypeVar("T")
+
+class PasswordHasher:
+    """
+    Runs bcrypt on its own threads, so a login burst does not stall the
+    event loop. At most workers run at once. Callers beyond that wait on
+    the event loop, where a request that is cancelled while queued costs
+    nothing. Once max_queue callers are waiting, further ones get a 503
+    instead of queueing without bound. Rejections, the number waiting and
+    how long each call waited are passed to on_reject, on_queue and
+    on_wait, for metrics.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int,
+        on_reject: Optional[Callable[[str], None]] = None,
+        on_queue: Optional[Callable[[int], None]] = None,
+        on_wait: Optional[Callable[[str, float], None]] = None
+    ):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.max_queue = max_queue
+        self.queued = 0
+        self.on_reject = on_reject
+        self.on_queue = on_queue
+        self.on_wait = on_wait
+        self._slots = asyncio.Semaphore(workers)
+
+    def _set_queued(self, queued: int):
+        self.queued = queued
+        if self.on_queue is not None:
+            self.on_queue(queued)
+
+    async def run(self, operation: str, func: Callable[..., T], *args) -> T:
+        """Run func(*args) on a hashing thread."""
+        if self.queued >= self.max_queue and self._slots.locked():
+            if self.on_reject is not None:
+                self.on_reject(operation)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests, try again shortly",
+                headers={"Retry-After": "1"}
+            )
+
+        self._set_queued(self.queued + 1)
+        started = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self._set_queued(self.queued - 1)
+
+        try:
+            if self.on_wait is not None:
+                self.on_wait(operation, time.perf_counter() - started)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self._slots.release()
@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Union
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Sender IDs and keywords per SMS Hub service code. SERVICE_KEYWORDS_PATH
+# adds services or replaces these entries, in the same shape:
+#   vk:
+#     senders: [VK]
+#     keywords: [vk, vkontakte]
+DEFAULT_SERVICE_KEYWORDS: Dict[str, Dict[str, List[str]]] = {
+    "vk": {"senders": ["VK", "VKontakte"], "keywords": ["vk", "vk.com", "vkontakte", "вконтакте"]},
+    "ok": {"senders": ["OK.ru", "Odnoklassniki"], "keywords": ["ok.ru", "odnoklassniki", "одноклассники"]},
+    "tg": {"senders": ["Telegram"], "keywords": ["telegram", "телеграм"]},
+    "wa": {"senders": ["WhatsApp"], "keywords": ["whatsapp", "ватсап"]},
+    "av": {"senders": ["Avito"], "keywords": ["avito", "авито"]},
+    "go": {"senders": ["Google"], "keywords": ["google", "g-"]},
+    "fb": {"senders": ["Facebook", "FBOOK"], "keywords": ["facebook"]},
+    "ig": {"senders": ["Instagram"], "keywords": ["instagram"]},
+    "ya": {"senders": ["Yandex"], "keywords": ["yandex", "яндекс"]},
+    "ma": {"senders": ["Mail.ru"], "keywords": ["mail.ru"]},
+}
+
+def _fold(value: str) -> str:
+    return value.strip().casefold()
+
+def _is_word(char: str) -> bool:
+    return re.match(r"\w", char) is not None
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Regex source matching any of words as a whole word, nested as a prefix
+    trie so the engine rejects a position after one character test instead
+    of trying every keyword in turn. Longer words are preferred over their
+    prefixes. A word may not continue a word before it or be continued by
+    one after it, checked only on the sides where it starts or ends with a
+    word character, so "vk" skips "vkusvill" but "g-" matches "G-123456".
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict, last: str) -> str:
+        branches = [re.escape(char) + build(child, char) for char, child in sorted(node.items()) if char]
+        end = r"(?!\w)" if _is_word(last) else ""
+        if not branches:
+            return end
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = f"(?:{body}|{end})" if end else f"(?:{body})?"
+        return body
+
+    # One lookbehind in front of every word that starts with a word character
+    starts = {True: [], False: []}
+    for char, child in sorted(trie.items()):
+        starts[_is_word(char)].append(re.escape(char) + build(child, char))
+    alternatives = starts[False]
+    if starts[True]:
+        alternatives.insert(0, r"(?<!\w)(?:" + "|".join(starts[True]) + ")")
+    return "|".join(alternatives)
+
+class ServiceMatcher:
+    """
+    Compiled sender and keyword table for telling which services an SMS
+    is from. Sender IDs are one dict lookup; all keywords of all services
+    are one regex shaped as a prefix trie, so a message is scanned once
+    however many services there are. At each position the longest keyword
+    wins.
+    """
+
+    def __init__(self, table: Dict[str, Dict[str, Iterable[str]]]):
+        senders: Dict[str, Set[str]] = {}
+        keywords: Dict[str, Set[str]] = {}
+        for service, entry in table.items():
+            for sender in entry.get("senders") or ():
+                senders.setdefault(_fold(sender), set()).add(service)
+            for keyword in entry.get("keywords") or ():
+                if _fold(keyword):
+                    keywords.setdefault(_fold(keyword), set()).add(service)
+
+        self.services: FrozenSet[str] = frozenset(table)
+        self._senders = {sender: frozenset(services) for sender, services in senders.items()}
+        self._keywords = {keyword: frozenset(services) for keyword, services in keywords.items()}
+        self._pattern = None
+        if keywords:
+            self._pattern = re.compile(_trie_pattern(keywords))
+
+    def classify(self, sender: Optional[str], text: Optional[str]) -> Set[str]:
+        """Get the services an SMS matches by its sender ID or text."""
+        services = set(self._senders.get(_fold(sender or ""), ()))
+        if text and self._pattern is not None:
+            for match in self._pattern.finditer(text.casefold()):
+                services.update(self._keywords[match.group()])
+        return services
+
+class ServiceKeywords:
+    """
+    The service matcher, rebuilt when its YAML file changes. Readers take
+    self.matcher and never see a half-built table: a reload compiles a new
+    matcher and swaps it in, and a broken file keeps the previous one.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path else None
+        self.matcher = ServiceMatcher(DEFAULT_SERVICE_KEYWORDS)
+        self._mtime: Optional[float] = None
+        self.reload()
+
+    def reload(self) -> bool:
+        """Rebuild the matcher if the file changed since the last load, returning whether it did."""
+        if self.path is None:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+
+        table = dict(DEFAULT_SERVICE_KEYWORDS)
+        if mtime is not None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    table.update(yaml.safe_load(f) or {})
+                matcher = ServiceMatcher(table)
+            except (OSError, yaml.YAMLError, AttributeError, TypeError) as e:
+                logger.error(f"Keeping previous service keywords, cannot load {self.path}: {e}")
+                # Retry once the file changes again rather than on every check
+                self._mtime = mtime
+                return False
+        else:
+            matcher = ServiceMatcher(table)
+
+        self.matcher = matcher
+        self._mtime = mtime
+        logger.info(f"Loaded keywords for {len(matcher.services)} services")
+        return True
+
+    def classify(self, sender: Optional[str], text: Optional[str]) -> Set[str]:
+        """Get the services an SMS matches by its sender ID or text."""
+        return self.matcher.classify(sender, text)
+
+    async def run_periodically(self, interval: int):
+        """Check the file for changes every interval seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"Service keyword reload failed: {e}")
+
+def benchmark(messages: int = 100000, extra_services: int = 500) -> dict:
+    """
+    Messages classified per second by the compiled matcher against
+    looping one regex per service, with extra_services synthetic
+    services added to the default table.
+    """
+    import random
+    import time
+
+    table = dict(DEFAULT_SERVICE_KEYWORDS)
+    for i in range(extra_services):
+        table[f"s{i}"] = {"senders": [f"Shop{i}"], "keywords": [f"shop{i}", f"brand{i}", f"магазин{i}"]}
+
+    rnd = random.Random(1)
+    names = list(table)
+    texts = []
+    for _ in range(messages):
+        service = table[rnd.choice(names)]
+        texts.append((
+            rnd.choice(service["senders"] + ["+79280000000"]),
+            f"Your {rnd.choice(service['keywords'])} code is {rnd.randrange(10 ** 6):06d}. Do not share it with anyone."
+        ))
+
+    matcher = ServiceMatcher(table)
+    per_service = {
+        service: (
+            {_fold(sender) for sender in entry["senders"]},
+            re.compile(r"(?<!\w)(?:" + "|".join(re.escape(_fold(k)) for k in entry["keywords"]) + r")(?!\w)")
+        )
+        for service, entry in table.items()
+    }
+
+    def loop(sender: str, text: str) -> Set[str]:
+        folded = text.casefold()
+        return {
+            service for service, (senders, pattern) in per_service.items()
+            if _fold(sender) in senders or pattern.search(folded)
+        }
+
+    results = {}
+    for name, classify in (("per-service loop", loop), ("compiled", matcher.classify)):
+        started = time.perf_counter()
+        for sender, text in texts:
+            classify(sender, text)
+        results[name] = messages / (time.perf_counter() - started)
+    return results
+
+if __name__ == "__main__":
+    import sys
+
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for name, rate in benchmark(messages).items():
+        print(f"{name:>16} {rate:12.0f} messages/sec")
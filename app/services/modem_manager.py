@@ -156,22 +156,25 @@ class ModemManager:
     async def wait_for_sms(self, callback) -> None:
         """
         Wait for incoming SMS messages and process them using the callback.
-        The callback should be an async function that takes (sender, text) as parameters.
+        The callback should be an async function that takes (sender, text, sent_at)
+        as parameters, sent_at being the modem's timestamp string or None.
+        A message is deleted from the modem only after the callback succeeded,
+        so the callback must tolerate seeing a message again.
         """
         try:
             while True:
                 response = await self.send_command('AT+CMGL="ALL"')
                 
                 # Parse SMS messages
-                messages = re.finditer(r'\+CMGL: (\d+),".*?","([^"]+)",[^,]*,[^,]*\r\n(.*?)(?=\+CMGL|\Z)', 
+                messages = re.finditer(r'\+CMGL: (\d+),"[^"]*","([^"]+)",[^,]*,(?:"([^"]*)")?[^\r\n]*\r\n(.*?)(?=\+CMGL|\Z)', 
                                      response, re.DOTALL)
                 
                 for match in messages:
-                    index, sender, text = match.groups()
+                    index, sender, sent_at, text = match.groups()
+                    # Call callback with message
+                    await callback(sender, text, sent_at)
                     # Delete processed message
                     await self.send_command(f'AT+CMGD={index}')
-                    # Call callback with message
-                    await callback(sender, text)
                 
                 # Wait before checking again
                 await asyncio.sleep(1)
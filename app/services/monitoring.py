@@ -39,6 +39,37 @@ sms_delivery_time = Histogram(
     buckets=[0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0]
 )
 
+sms_duplicates = Counter(
+    "sms_duplicates_suppressed_total",
+    "Incoming SMS dropped as replays of a recently received message",
+    ["modem_id"]
+)
+
+password_hash_wait = Histogram(
+    "password_hash_wait_seconds",
+    "Time a password hash or check waited for a hashing thread",
+    ["operation"],
+    buckets=[0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+)
+
+password_hash_queued = Gauge(
+    "password_hash_queued",
+    "Password hashes and checks waiting for a hashing thread"
+)
+
+password_hash_rejected = Counter(
+    "password_hash_rejected_total",
+    "Password hashes and checks refused because the queue was full",
+    ["operation"]
+)
+
+db_pool_wait = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a database connection",
+    ["lane"],
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0]
+)
+
 class SystemMetrics:
     def __init__(self):
         self.start_time = datetime.utcnow()
@@ -183,6 +214,11 @@ class ModemMetrics:
         """Record SMS status."""
         sms_total.labels(status=status).inc()
         
+    @staticmethod
+    def record_duplicate_sms(modem_id: int):
+        """Record a suppressed duplicate SMS."""
+        sms_duplicates.labels(modem_id=str(modem_id)).inc()
+        
     @staticmethod
     def record_sms_delivery_time(seconds: float):
         """Record SMS delivery time."""
@@ -191,4 +227,4 @@ class ModemMetrics:
 # Global instances
 system_metrics = SystemMetrics()
 health_check = HealthCheck()
-modem_metrics = ModemMetrics() 
\ No newline at end of file
+modem_metrics = ModemMetrics()
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import time
+from sqlalchemy.orm import make_transient_to_detached
+from ..models.models import User
+
+class PrincipalCache:
+    """
+    Users resolved from tokens, so authenticated requests skip the user
+    lookup. Entries are keyed by (token subject, token version), expire
+    after ttl seconds and at most max_size are kept, least recently used
+    dropped first. Endpoints that change a user call invalidate; other
+    workers see the change once their entry expires.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, subject: str, version: Optional[str]) -> Optional[User]:
+        """Get a detached copy of the cached user, or None."""
+        key = (subject, version)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, fields = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+
+        # A fresh object per request, so no two sessions ever share one
+        user = User(**fields)
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, subject: str, version: Optional[str], user: User):
+        """Cache the column values of a user loaded for a token."""
+        fields = {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        self._entries[(subject, version)] = (time.monotonic() + self.ttl, fields)
+        self._entries.move_to_end((subject, version))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *subjects: str):
+        """Drop every cached token version of these users."""
+        for key in [key for key in self._entries if key[0] in subjects]:
+            del self._entries[key]
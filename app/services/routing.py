@@ -0,0 +1,182 @@
+import logging
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..models.models import Activation, SMSMessage, ActivationStatus
+from .database import ActivationDB, SMSMessageDB, write_lane
+from .dedup import DuplicateFilter
+from .keywords import ServiceKeywords
+from .monitoring import modem_metrics
+
+logger = logging.getLogger(__name__)
+
+# Activations in these statuses are still waiting for their SMS
+OPEN_STATUSES = (ActivationStatus.WAITING, ActivationStatus.READY)
+
+class OpenActivation(NamedTuple):
+    id: int
+    activation_id: str
+    modem_id: Optional[int]
+    phone_number: str
+    service: str
+
+class UnmatchedSMS(NamedTuple):
+    modem_id: Optional[int]
+    phone_to: Optional[str]
+    sender: str
+    received_at: datetime
+
+def _digits(phone_number: Optional[str]) -> str:
+    return "".join(ch for ch in str(phone_number or "") if ch.isdigit())
+
+class ActivationRouter:
+    """
+    In-memory index from modem and phone number to open activations, so
+    an incoming SMS is matched to its activation without a database read.
+
+    The index is loaded once at startup and kept current by the endpoints
+    that create, finish and delete activations. Each modem or number maps
+    to its open activations oldest first. When a SIM serves several
+    services at once, the SMS goes to the newest activation whose service
+    the keyword table recognises in it, otherwise to the newest one.
+    """
+
+    def __init__(
+        self,
+        unmatched_activation_id: Optional[int] = None,
+        unmatched_history: int = 1000,
+        keywords: Optional[ServiceKeywords] = None,
+        duplicates: Optional[DuplicateFilter] = None
+    ):
+        self.unmatched_activation_id = unmatched_activation_id
+        self.keywords = keywords or ServiceKeywords()
+        self.duplicates = duplicates or DuplicateFilter(window=3600, max_entries=100000)
+        self.duplicate_count = 0
+        self.unmatched: Deque[UnmatchedSMS] = deque(maxlen=unmatched_history)
+        self.routed_count = 0
+        self.unmatched_count = 0
+        self._by_id: Dict[int, OpenActivation] = {}
+        self._by_modem: Dict[int, Dict[int, OpenActivation]] = {}
+        self._by_phone: Dict[str, Dict[int, OpenActivation]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def open(self, activation: Activation):
+        """Index an activation that is waiting for its SMS."""
+        self.close(activation.id)
+        entry = OpenActivation(
+            activation.id,
+            activation.activation_id,
+            activation.modem_id,
+            _digits(activation.phone_number),
+            activation.service
+        )
+        self._by_id[entry.id] = entry
+        if entry.modem_id is not None:
+            self._by_modem.setdefault(entry.modem_id, {})[entry.id] = entry
+        if entry.phone_number:
+            self._by_phone.setdefault(entry.phone_number, {})[entry.id] = entry
+
+    def close(self, id: int):
+        """Drop an activation that finished or was deleted."""
+        entry = self._by_id.pop(id, None)
+        if entry is None:
+            return
+        for index, key in ((self._by_modem, entry.modem_id), (self._by_phone, entry.phone_number)):
+            entries = index.get(key)
+            if entries is not None:
+                entries.pop(id, None)
+                if not entries:
+                    del index[key]
+
+    def update(self, activation: Activation):
+        """Re-index an activation after its status changed."""
+        if activation.status in OPEN_STATUSES:
+            self.open(activation)
+        else:
+            self.close(activation.id)
+
+    def route(
+        self,
+        modem_id: Optional[int],
+        phone_to: Optional[str] = None,
+        sender: Optional[str] = None,
+        text: Optional[str] = None
+    ) -> Optional[OpenActivation]:
+        """Get the open activation an SMS received on a modem or number belongs to."""
+        entries = self._by_modem.get(modem_id) or self._by_phone.get(_digits(phone_to))
+        if not entries:
+            return None
+        if len(entries) > 1 and (sender or text):
+            services = self.keywords.classify(sender, text)
+            for entry in reversed(entries.values()):
+                if entry.service in services:
+                    return entry
+        return next(reversed(entries.values()))
+
+    async def load(self, db: AsyncSession):
+        """Index every open activation."""
+        self._by_id.clear()
+        self._by_modem.clear()
+        self._by_phone.clear()
+        for activation in await ActivationDB(Activation).get_open(db):
+            self.open(activation)
+        logger.info(f"Indexed {len(self)} open activations for SMS routing")
+
+    async def intake(
+        self,
+        modem_id: Optional[int],
+        sender: str,
+        text: str,
+        phone_to: Optional[str] = None,
+        sent_at: Optional[str] = None
+    ) -> Optional[Tuple[SMSMessage, bool]]:
+        """
+        Store an SMS received by a modem under the activation waiting for it.
+        Returns the message and whether it matched an activation; unmatched
+        messages go to unmatched_activation_id (None keeps them unlinked).
+        Returns None for a replay of a message already taken in, identified
+        by modem, sender, the modem's sent_at timestamp and text.
+        """
+        key = self.duplicates.key(modem_id, sender, sent_at, text)
+        if self.duplicates.seen(key):
+            self.duplicate_count += 1
+            modem_metrics.record_duplicate_sms(modem_id)
+            logger.info(f"Dropped duplicate SMS from {sender} on modem {modem_id}")
+            return None
+
+        target = self.route(modem_id, phone_to, sender, text)
+        if target is not None:
+            self.routed_count += 1
+        else:
+            self.unmatched_count += 1
+            self.unmatched.append(UnmatchedSMS(modem_id, phone_to, sender, datetime.utcnow()))
+            logger.warning(f"No open activation for SMS from {sender} on modem {modem_id}")
+
+        try:
+            async with write_lane.session() as db:
+                message = await SMSMessageDB(SMSMessage).create(db, obj_in={
+                    "sms_id": str(uuid.uuid4()),
+                    "modem_id": modem_id,
+                    "activation_id": target.id if target else self.unmatched_activation_id,
+                    "phone_from": sender,
+                    "phone_to": target.phone_number if target else _digits(phone_to),
+                    "text": text
+                })
+        except Exception:
+            # Not stored, so a replay must not be dropped
+            self.duplicates.forget(key)
+            raise
+        return message, target is not None
+
+# Global instance
+activation_router = ActivationRouter(
+    unmatched_activation_id=settings.SMS_UNMATCHED_ACTIVATION_ID,
+    unmatched_history=settings.SMS_UNMATCHED_HISTORY,
+    keywords=ServiceKeywords(settings.SERVICE_KEYWORDS_PATH),
+    duplicates=DuplicateFilter(settings.SMS_DEDUP_WINDOW, settings.SMS_DEDUP_MAX_ENTRIES)
+)
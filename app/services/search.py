@@ -0,0 +1,89 @@
+import logging
+import re
+from sqlalchemy import literal_column, table, column
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# External-content FTS5 index over sms_messages: the text lives only in
+# sms_messages, the index maps tokens to sms_messages.id. Prefix indexes
+# keep short OTP-code prefixes ("12*") from expanding over the whole vocabulary.
+SMS_FTS_TABLE = "sms_messages_fts"
+
+SMS_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SMS_FTS_TABLE} USING fts5(
+        text,
+        phone_from,
+        content='sms_messages',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SMS_FTS_TABLE}_ai AFTER INSERT ON sms_messages BEGIN
+        INSERT INTO {SMS_FTS_TABLE}(rowid, text, phone_from) VALUES (new.id, new.text, new.phone_from);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SMS_FTS_TABLE}_ad AFTER DELETE ON sms_messages BEGIN
+        INSERT INTO {SMS_FTS_TABLE}({SMS_FTS_TABLE}, rowid, text, phone_from)
+        VALUES ('delete', old.id, old.text, old.phone_from);
+    END
+    """,
+    # Delivery status updates do not touch the index
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SMS_FTS_TABLE}_au AFTER UPDATE OF text, phone_from ON sms_messages BEGIN
+        INSERT INTO {SMS_FTS_TABLE}({SMS_FTS_TABLE}, rowid, text, phone_from)
+        VALUES ('delete', old.id, old.text, old.phone_from);
+        INSERT INTO {SMS_FTS_TABLE}(rowid, text, phone_from) VALUES (new.id, new.text, new.phone_from);
+    END
+    """,
+]
+
+# Lightweight handle for queries; the table itself is created by create_sms_search_index
+sms_fts = table(SMS_FTS_TABLE, column("rowid"), column("rank"))
+sms_fts_match = literal_column(SMS_FTS_TABLE).op("MATCH")
+
+# How many of the newest matches are ranked by relevance; older ones are found with newest_first
+SEARCH_RANK_WINDOW = 10000
+
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+def create_sms_search_index(connection: Connection):
+    """Create the FTS5 index and its triggers on SQLite, indexing existing messages the first time."""
+    if connection.dialect.name != "sqlite":
+        return
+
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SMS_FTS_TABLE,)
+    ).first()
+    for statement in SMS_FTS_DDL:
+        connection.exec_driver_sql(statement)
+
+    if not exists:
+        connection.exec_driver_sql(f"INSERT INTO {SMS_FTS_TABLE}({SMS_FTS_TABLE}) VALUES ('rebuild')")
+        logger.info("Built SMS full-text index")
+
+def fts_query(query: str) -> str:
+    """
+    Turn a search box string into an FTS5 query. "quoted words" are
+    phrases, a trailing * makes a prefix term, and all parts must match.
+    Every term is quoted, so FTS5 operators and punctuation in the input
+    are searched for rather than interpreted. Raises ValueError if
+    nothing searchable is left.
+    """
+    parts = []
+    for phrase, term in _QUERY_PART.findall(query):
+        if phrase.strip():
+            parts.append(f'"{phrase.strip()}"')
+        elif term:
+            prefix = term.endswith("*")
+            term = term.rstrip("*").replace('"', "")
+            if term:
+                parts.append(f'"{term}"' + ("*" if prefix else ""))
+
+    if not parts:
+        raise ValueError("Empty search query")
+    return " ".join(parts)
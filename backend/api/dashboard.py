@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case
 from datetime import datetime, timedelta
+from typing import Iterator
 import json
 
-from ..database import get_db
-from ..models import Modem, Activation, Message
-from ..schemas.dashboard import DashboardResponse, ModemStats, ActivationStats, MessageStats, RevenueStats
+from ..database import SessionLocal, run_in_session, reporting_executor
+from ..models import Modem, Message, ActivationRollup
+from ..schemas.dashboard import DashboardResponse, ModemStats, ActivationStats, MessageStats, RevenueStats, UtilisationResponse
 from ..schemas.smshub import Currency, ActivationStatus
+from ..services.coordinator import coordinator
+from ..services.archive import segment_archive, ARCHIVED_MODELS
+from ..services.rollups import hour_bucket
+from ..snapshot import SnapshotCache
+from ..config import settings
 
 router = APIRouter(prefix="/api/dashboard")
 
@@ -16,8 +23,13 @@ def get_date_range(days: int = 30):
     start_date = end_date - timedelta(days=days)
     return start_date, end_date
 
-@router.get("", response_model=DashboardResponse)
-async def get_dashboard(db: Session = Depends(get_db)):
+def _seconds_between_sql(start, end, dialect: str):
+    if dialect == "sqlite":
+        # SQLite stores DateTime as text, which extract() cannot subtract
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    return func.extract('epoch', end - start)
+
+def _build_dashboard(db: Session) -> DashboardResponse:
     # Get date range for daily stats
     start_date, end_date = get_date_range()
 
@@ -43,41 +55,72 @@ async def get_dashboard(db: Session = Depends(get_db)):
         ).group_by(Modem.operator).all()
     )
 
-    # Activation Statistics
-    activation_stats = db.query(
-        func.count().label('total'),
-        func.sum(case((Activation.is_completed == False, 1), else_=0)).label('pending'),
-        func.sum(case((Activation.is_completed == True, 1), else_=0)).label('completed')
-    ).first()
-
-    success_count = db.query(func.count()).filter(
-        Activation.status == ActivationStatus.SUCCESS
-    ).scalar()
-
-    activation_by_service = dict(
-        db.query(
-            Activation.service,
-            func.count()
-        ).group_by(Activation.service).all()
-    )
-
-    activation_by_status = dict(
-        db.query(
-            Activation.status,
-            func.count()
-        ).group_by(Activation.status).all()
-    )
+    # Activation and revenue statistics come from the hourly rollups
+    totals = db.query(
+        ActivationRollup.service,
+        ActivationRollup.currency,
+        ActivationRollup.status,
+        func.sum(ActivationRollup.count),
+        func.sum(ActivationRollup.amount)
+    ).group_by(
+        ActivationRollup.service,
+        ActivationRollup.currency,
+        ActivationRollup.status
+    ).all()
+
+    activation_total = 0
+    activation_pending = 0
+    success_count = 0
+    activation_by_service = {}
+    activation_by_status = {}
+    revenue_by_currency = {Currency.RUB: 0, Currency.USD: 0}
+    revenue_by_service = {}
 
-    daily_activations = dict(
-        db.query(
-            func.date(Activation.created_at),
-            func.count()
-        ).filter(
-            Activation.created_at.between(start_date, end_date)
-        ).group_by(
-            func.date(Activation.created_at)
-        ).all()
-    )
+    for service, currency, status, count, amount in totals:
+        if not count:
+            continue  # Every activation in the group has moved to another status
+        activation_total += count
+        if status == 0:
+            activation_pending += count
+        activation_by_service[service] = activation_by_service.get(service, 0) + count
+        activation_by_status[str(status)] = activation_by_status.get(str(status), 0) + count
+
+        if status == ActivationStatus.SUCCESS:
+            success_count += count
+            if currency in revenue_by_currency:
+                revenue_by_currency[currency] += amount
+                by_currency = revenue_by_service.setdefault(service, {'RUB': 0, 'USD': 0})
+                by_currency[Currency(currency).name] += amount
+
+    for service in activation_by_service:
+        revenue_by_service.setdefault(service, {'RUB': 0, 'USD': 0})
+
+    day = func.date(ActivationRollup.bucket)
+    daily = db.query(
+        day,
+        ActivationRollup.currency,
+        ActivationRollup.status,
+        func.sum(ActivationRollup.count),
+        func.sum(ActivationRollup.amount)
+    ).filter(
+        ActivationRollup.bucket >= hour_bucket(start_date),
+        ActivationRollup.bucket <= end_date
+    ).group_by(
+        day,
+        ActivationRollup.currency,
+        ActivationRollup.status
+    ).all()
+
+    daily_activations = {}
+    daily_revenue = {}
+    for date_str, currency, status, count, amount in daily:
+        if not count:
+            continue
+        date_str = str(date_str)
+        daily_activations[date_str] = daily_activations.get(date_str, 0) + count
+        by_currency = daily_revenue.setdefault(date_str, {'RUB': 0, 'USD': 0})
+        if status == ActivationStatus.SUCCESS and currency in revenue_by_currency:
+            by_currency[Currency(currency).name] += amount
 
     # Message Statistics
     message_stats = db.query(
@@ -100,78 +143,53 @@ async def get_dashboard(db: Session = Depends(get_db)):
     # Calculate average delivery time for delivered messages
     avg_delivery_time = db.query(
         func.avg(
-            func.extract('epoch', Message.delivered_at - Message.created_at)
+            _seconds_between_sql(Message.created_at, Message.delivered_at, db.get_bind().dialect.name)
         )
     ).filter(
         Message.is_delivered == True
     ).scalar() or 0
 
-    # Revenue Statistics
-    revenue_by_currency = {
-        Currency.RUB: db.query(func.sum(Activation.amount)).filter(
-            Activation.currency == Currency.RUB,
-            Activation.status == ActivationStatus.SUCCESS
-        ).scalar() or 0,
-        Currency.USD: db.query(func.sum(Activation.amount)).filter(
-            Activation.currency == Currency.USD,
-            Activation.status == ActivationStatus.SUCCESS
-        ).scalar() or 0
-    }
-
-    daily_revenue = {}
-    for date_str, activations in daily_activations.items():
-        daily_revenue[str(date_str)] = {
-            'RUB': db.query(func.sum(Activation.amount)).filter(
-                func.date(Activation.created_at) == date_str,
-                Activation.currency == Currency.RUB,
-                Activation.status == ActivationStatus.SUCCESS
-            ).scalar() or 0,
-            'USD': db.query(func.sum(Activation.amount)).filter(
-                func.date(Activation.created_at) == date_str,
-                Activation.currency == Currency.USD,
-                Activation.status == ActivationStatus.SUCCESS
-            ).scalar() or 0
-        }
-
-    revenue_by_service = {}
-    for service in activation_by_service.keys():
-        revenue_by_service[service] = {
-            'RUB': db.query(func.sum(Activation.amount)).filter(
-                Activation.service == service,
-                Activation.currency == Currency.RUB,
-                Activation.status == ActivationStatus.SUCCESS
-            ).scalar() or 0,
-            'USD': db.query(func.sum(Activation.amount)).filter(
-                Activation.service == service,
-                Activation.currency == Currency.USD,
-                Activation.status == ActivationStatus.SUCCESS
-            ).scalar() or 0
-        }
+    # Archived messages were all delivered and are kept as per-day totals
+    message_total = message_stats.total
+    message_delivered = message_stats.delivered or 0
+    archived_count = 0
+    archived_seconds = 0.0
+    daily_messages = {str(k): v for k, v in daily_messages.items()}
+    first_day, last_day = str(start_date.date()), str(end_date.date())
+    for date_str, (count, delivery_seconds) in segment_archive.archived_messages(db).items():
+        archived_count += count
+        archived_seconds += delivery_seconds
+        if first_day <= date_str <= last_day:
+            daily_messages[date_str] = daily_messages.get(date_str, 0) + count
+    if archived_count:
+        avg_delivery_time = (avg_delivery_time * message_delivered + archived_seconds) / (message_delivered + archived_count)
+        message_total += archived_count
+        message_delivered += archived_count
 
     return DashboardResponse(
         modems=ModemStats(
             total=modem_stats.total,
-            active=modem_stats.active,
-            busy=modem_stats.busy,
-            offline=modem_stats.offline,
+            active=modem_stats.active or 0,
+            busy=modem_stats.busy or 0,
+            offline=modem_stats.offline or 0,
             by_country=modem_by_country,
             by_operator=modem_by_operator
         ),
         activations=ActivationStats(
-            total=activation_stats.total,
-            pending=activation_stats.pending,
-            completed=activation_stats.completed,
-            success_rate=success_count / activation_stats.total if activation_stats.total > 0 else 0,
+            total=activation_total,
+            pending=activation_pending,
+            completed=activation_total - activation_pending,
+            success_rate=success_count / activation_total if activation_total > 0 else 0,
             by_service=activation_by_service,
             by_status=activation_by_status,
-            daily_activations={str(k): v for k, v in daily_activations.items()}
+            daily_activations=daily_activations
         ),
         messages=MessageStats(
-            total=message_stats.total,
-            delivered=message_stats.delivered,
-            pending=message_stats.pending,
-            delivery_rate=message_stats.delivered / message_stats.total if message_stats.total > 0 else 0,
-            daily_messages={str(k): v for k, v in daily_messages.items()},
+            total=message_total,
+            delivered=message_delivered,
+            pending=message_stats.pending or 0,
+            delivery_rate=message_delivered / message_total if message_total > 0 else 0,
+            daily_messages=daily_messages,
             avg_delivery_time=avg_delivery_time
         ),
         revenue=RevenueStats(
@@ -181,4 +199,50 @@ async def get_dashboard(db: Session = Depends(get_db)):
             by_service=revenue_by_service
         ),
         last_updated=datetime.utcnow()
-    ) 
\ No newline at end of file
+    )
+
+async def _load_dashboard() -> DashboardResponse:
+    # Dashboard queries run on their own threads so they never block the event loop
+    # or hold up protocol queries
+    return await run_in_session(_build_dashboard, executor=reporting_executor)
+
+dashboard_snapshot = SnapshotCache(
+    _load_dashboard,
+    ttl=settings.DASHBOARD_CACHE_TTL,
+    max_stale=settings.DASHBOARD_CACHE_MAX_STALE
+)
+
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(request: Request):
+    return await dashboard_snapshot.respond(request)
+
+@router.get("/utilisation", response_model=UtilisationResponse)
+async def get_utilisation():
+    """Per-SIM allocation counts to check how load spreads across modems"""
+    return UtilisationResponse(**await coordinator.allocator.utilisation())
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _export(table: str, start: datetime, end: datetime, batch_rows: int = 1000) -> Iterator[str]:
+    """NDJSON lines of the table's rows in [start, end), live and archived, in batches."""
+    db = SessionLocal()
+    try:
+        lines = []
+        for record in segment_archive.rows_between(db, table, start, end):
+            lines.append(json.dumps(record, default=_json_value, separators=(",", ":")) + "\n")
+            if len(lines) >= batch_rows:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+    finally:
+        db.close()
+
+@router.get("/export/{table}")
+async def export_rows(table: str, start: datetime, end: datetime):
+    """Stream activations or messages created in [start, end) as NDJSON, including archived ones"""
+    if table not in ARCHIVED_MODELS:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {table}")
+    # The generator runs on Starlette's thread pool, away from the protocol workers
+    return StreamingResponse(_export(table, start, end), media_type="application/x-ndjson")
@@ -1,13 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException
 import httpx
 import json
 from datetime import datetime
+from typing import Set
 import asyncio
+import logging
 
-from ..database import get_db
-from ..models import Modem, Activation, Message
+from ..database import run_in_session
+from ..models import Message
 from ..schemas.smshub import (
     GetServicesRequest, GetServicesResponse,
     GetNumberRequest, GetNumberResponse,
@@ -16,40 +16,29 @@ from ..schemas.smshub import (
     Status, ActivationStatus
 )
 from ..config import settings
+from ..services.coordinator import coordinator, AllocatorError
+from ..services.finished import finished_activations
+from ..services.writer import write_buffer
+from .. import protocol_queries
 
 router = APIRouter(prefix="/api/smshub")
 
-async def verify_api_key(key: str, db: Session):
+logger = logging.getLogger(__name__)
+
+# Running push_sms_with_retry tasks, kept referenced until they finish
+_push_tasks: Set[asyncio.Task] = set()
+
+async def verify_api_key(key: str):
     if key != settings.SMSHUB_API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
 @router.post("/services", response_model=GetServicesResponse)
-async def get_services(
-    request: GetServicesRequest,
-    db: Session = Depends(get_db)
-):
-    await verify_api_key(request.key, db)
-
-    # Get available modems grouped by country and operator
-    result = {}
-    modems = db.query(Modem).filter(
-        Modem.status == 'active',
-        Modem.is_online == True
-    ).all()
-
-    for modem in modems:
-        if modem.country not in result:
-            result[modem.country] = {}
-        
-        if modem.operator not in result[modem.country]:
-            result[modem.country][modem.operator] = {
-                "vk": 0, "ok": 0, "wa": 0  # Add more services as needed
-            }
-        
-        # Increment available count for all services
-        # In a real implementation, you might want to check which services each modem supports
-        for service in result[modem.country][modem.operator]:
-            result[modem.country][modem.operator][service] += 1
+async def get_services(request: GetServicesRequest):
+    await verify_api_key(request.key)
+
+    # Get available modems grouped by country and operator,
+    # counting only numbers that have not used up the service
+    result = await coordinator.allocator.service_counts(settings.SERVICES)
 
     # Format response
     country_list = [
@@ -66,88 +55,124 @@ async def get_services(
     )
 
 @router.post("/number", response_model=GetNumberResponse)
-async def get_number(
-    request: GetNumberRequest,
-    db: Session = Depends(get_db)
-):
-    await verify_api_key(request.key, db)
-
-    # Find available modem
-    query = db.query(Modem).filter(
-        Modem.status == 'active',
-        Modem.is_online == True,
-        Modem.country == request.country,
-        Modem.operator == request.operator
-    )
-
-    # Apply phone number exceptions
-    if request.exceptionPhoneSet:
-        for prefix in request.exceptionPhoneSet:
-            query = query.filter(~Modem.phone_number.startswith(prefix))
+async def get_number(request: GetNumberRequest):
+    await verify_api_key(request.key)
 
-    modem = query.first()
-
-    if not modem:
-        return GetNumberResponse(status=Status.NO_NUMBERS)
-
-    # Create activation
-    activation = Activation(
-        modem_id=modem.id,
-        service=request.service,
-        phone_number=modem.phone_number,
-        amount=request.sum,
-        currency=request.currency
-    )
-    
-    # Mark modem as busy
-    modem.status = 'busy'
-    
-    db.add(activation)
-    db.commit()
+    # Reserve the best available modem according to the selection strategy
+    allocator = coordinator.allocator
+    while True:
+        try:
+            reservation = await allocator.acquire(
+                request.country,
+                request.operator,
+                request.service,
+                request.exceptionPhoneSet
+            )
+        except AllocatorError as e:
+            # Not retried: the owner may already have reserved a SIM for it
+            logger.error(f"Reserving a number failed: {e}")
+            return GetNumberResponse(status=Status.ERROR, error="Allocator unavailable")
+
+        if not reservation:
+            return GetNumberResponse(status=Status.NO_NUMBERS)
+
+        modem_id, phone_number = reservation
+        try:
+            activation_id = await run_in_session(
+                protocol_queries.create_activation,
+                modem_id,
+                phone_number,
+                request.service,
+                request.country,
+                request.operator,
+                request.sum,
+                request.currency
+            )
+        except Exception:
+            await allocator.release(modem_id)
+            raise
+
+        if activation_id is not None:
+            break
+
+        # Modem changed since the pool was loaded
+        await allocator.discard(modem_id)
 
     return GetNumberResponse(
         status=Status.SUCCESS,
-        number=int(modem.phone_number),
-        activationId=activation.id
+        number=int(phone_number),
+        activationId=activation_id
     )
 
 @router.post("/finish", response_model=FinishActivationResponse)
-async def finish_activation(
-    request: FinishActivationRequest,
-    db: Session = Depends(get_db)
-):
-    await verify_api_key(request.key, db)
-
-    # Find activation
-    activation = db.query(Activation).filter(
-        Activation.id == request.activationId
-    ).first()
-
-    if not activation:
+async def finish_activation(request: FinishActivationRequest):
+    await verify_api_key(request.key)
+
+    # Retried finish with the status we already recorded
+    if finished_activations.get(request.activationId) == request.status:
+        return FinishActivationResponse(status=Status.SUCCESS)
+
+    result = await run_in_session(protocol_queries.finish_activation, request.activationId, request.status)
+
+    if not result:
         return FinishActivationResponse(
             status=Status.ERROR,
             error="Activation not found"
         )
 
-    # If already completed, return success (idempotency)
-    if activation.is_completed:
-        return FinishActivationResponse(status=Status.SUCCESS)
+    modem_id, phone_number, service, final_status, changed = result
+    finished_activations.add(request.activationId, final_status)
 
-    # Update activation status
-    activation.status = request.status
-    activation.is_completed = True
-    activation.completed_at = datetime.utcnow()
+    if changed:
+        await coordinator.allocator.record(modem_id, phone_number, service, request.status)
+    elif final_status != request.status:
+        logger.warning(
+            f"Activation {request.activationId} already finished with status {final_status}, "
+            f"ignoring status {int(request.status)}"
+        )
 
-    # Free up the modem if activation is complete
-    if activation.modem:
-        activation.modem.status = 'active'
+    return FinishActivationResponse(status=Status.SUCCESS)
 
-    db.commit()
+def start_push(sms_id: int):
+    """Push a stored SMS to SMS Hub in the background, retrying until it is delivered."""
+    task = asyncio.create_task(push_sms_with_retry(sms_id))
+    _push_tasks.add(task)
+    task.add_done_callback(_push_tasks.discard)
+
+async def resume_pushes() -> int:
+    """Restart delivery of every message left undelivered, returning how many there were."""
+    sms_ids = await run_in_session(protocol_queries.undelivered_sms)
+    for sms_id in sms_ids:
+        start_push(sms_id)
+    if sms_ids:
+        logger.info(f"Resumed delivery of {len(sms_ids)} undelivered messages")
+    return len(sms_ids)
+
+async def stop_pushes():
+    """Cancel pushes still retrying; resume_pushes picks them up on the next start."""
+    for task in list(_push_tasks):
+        task.cancel()
+    await asyncio.gather(*_push_tasks, return_exceptions=True)
+
+async def _record_delivery_attempt(sms_id: int, delivered: bool):
+    now = datetime.utcnow()
+    values = {
+        Message.delivery_attempts: Message.delivery_attempts + 1,
+        Message.last_attempt: now
+    }
+    if delivered:
+        values[Message.is_delivered] = True
+        values[Message.delivered_at] = now
 
-    return FinishActivationResponse(status=Status.SUCCESS)
+    # Failed attempts are group-committed; wait for the delivered flag to be stored
+    await write_buffer.update(Message, sms_id, values, wait=delivered)
 
-async def push_sms_with_retry(sms: Message, db: Session):
+async def push_sms_with_retry(sms_id: int):
     """Push SMS to SMSHUB server with retry logic"""
+    sms = await run_in_session(protocol_queries.load_sms, sms_id)
+    if not sms or sms.is_delivered:
+        return
+
     headers = {
         'Content-Type': 'application/json',
         'User-Agent': settings.USER_AGENT,
@@ -163,7 +188,10 @@ async def push_sms_with_retry(sms: Message, db: Session):
         'text': sms.text
     }
 
-    while not sms.is_delivered:
+    attempts = 0
+    while True:
+        delivered = False
+        attempts += 1
         try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
@@ -173,20 +201,21 @@ async def push_sms_with_retry(sms: Message, db: Session):
                 )
                 
                 data = response.json()
-                
-                if data.get('status') == 'SUCCESS':
-                    sms.is_delivered = True
-                    sms.delivered_at = datetime.utcnow()
-                    db.commit()
-                    return
+                delivered = data.get('status') == 'SUCCESS'
+                if not delivered:
+                    logger.warning(f"SMS Hub rejected SMS {sms_id}: {data.get('error') or data.get('status')}")
                 
         except Exception as e:
-            pass  # Log error but continue retrying
+            logger.warning(f"Pushing SMS {sms_id} to SMS Hub failed: {e}")
         
         finally:
-            sms.delivery_attempts += 1
-            sms.last_attempt = datetime.utcnow()
-            db.commit()
-        
-        # Wait 10 seconds before retrying
-        await asyncio.sleep(10) 
\ No newline at end of file
+            await _record_delivery_attempt(sms_id, delivered)
+
+        if delivered:
+            return
+
+        if settings.SMS_MAX_RETRIES and attempts > settings.SMS_MAX_RETRIES:
+            logger.error(f"Giving up on SMS {sms_id} after {attempts} attempts")
+            return
+
+        await asyncio.sleep(settings.SMS_RETRY_INTERVAL)
@@ -0,0 +1,224 @@
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+import asyncio
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+)
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None for identity."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk so streamed data is not held back."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by path, encoding and the exact uncompressed body."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, bytes], bytes]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str, bytes]) -> Optional[bytes]:
+        compressed = self._entries.get(key)
+        if compressed is not None:
+            self._entries.move_to_end(key)
+        return compressed
+
+    def put(self, key: Tuple[str, str, bytes], compressed: bytes):
+        self._entries[key] = compressed
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class CompressionMiddleware:
+    """
+    ASGI response compression with brotli/gzip negotiation.
+
+    Bodies under minimum_size are sent as is. Complete bodies of
+    offload_size or more are compressed on a worker thread. Streaming
+    responses are compressed chunk by chunk. Compressed bodies for
+    cached_paths are reused while their content stays the same.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 500,
+        offload_size: int = 65536,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cached_paths: Iterable[str] = (),
+        cache_size: int = 64
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cached_paths = frozenset(cached_paths)
+        self.cache = CompressedBodyCache(cache_size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, scope["path"], send)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def compress_body(self, encoding: str, path: str, body: bytes) -> bytes:
+        key = (path, encoding, body)
+        if path in self.cached_paths:
+            compressed = self.cache.get(key)
+            if compressed is not None:
+                return compressed
+
+        if len(body) >= self.offload_size:
+            compressed = await asyncio.get_running_loop().run_in_executor(
+                None, self.compress, encoding, body
+            )
+        else:
+            compressed = self.compress(encoding, body)
+
+        if path in self.cached_paths:
+            self.cache.put(key, compressed)
+        return compressed
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, path: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.path = path
+        self._send = send
+        self.start_message = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    def _compressible(self) -> bool:
+        content_type = ""
+        for name, value in self.start_message["headers"]:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _start_headers(self, content_length: Optional[int]):
+        headers = [
+            (name, value) for name, value in self.start_message["headers"]
+            if name not in (b"content-length", b"vary")
+        ]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        headers.append((b"vary", b"Accept-Encoding"))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return {**self.start_message, "headers": headers}
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            # First body message decides how the response is sent
+            if not self._compressible() or (not more_body and len(body) < self.middleware.minimum_size):
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            if not more_body:
+                compressed = await self.middleware.compress_body(self.encoding, self.path, body)
+                await self._send(self._start_headers(len(compressed)))
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+
+            self.compressor = StreamCompressor(
+                self.encoding,
+                self.middleware.gzip_level,
+                self.middleware.brotli_quality
+            )
+            await self._send(self._start_headers(None))
+
+        if len(body) >= self.middleware.offload_size:
+            chunk = await asyncio.get_running_loop().run_in_executor(
+                None, self.compressor.compress, body
+            )
+        else:
+            chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,20 +1,65 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, List
 import os
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./smshub.db"
+    DB_PROTOCOL_THREADS: int = 4  # Worker threads for SMS Hub protocol queries
+    DB_REPORTING_THREADS: int = 2  # Worker threads for dashboard queries
+    SQLITE_PROFILE: str = "balanced"  # safe, balanced or fast
+    SQLITE_CHECKPOINT_INTERVAL: int = 5  # seconds between background WAL checkpoints
+    SQLITE_WAL_TRUNCATE_SIZE: int = 67108864  # bytes, WAL is truncated once it grows past this
+    SQLITE_WAL_MAX_SIZE: int = 268435456  # bytes, past this WAL is truncated even if readers must wait
+    WRITE_BATCH_ROWS: int = 500  # Rows per group commit
+    WRITE_BATCH_DELAY_MS: int = 5  # A batch is committed at most this long after its first write
+    WRITE_QUEUE_SIZE: int = 10000  # Queued writes before callers wait for room
     
     # SMSHUB Settings
     SMSHUB_API_KEY: str
     USER_AGENT: str = "SMSHUB-Agent/1.0"
+    SERVICES: List[str] = ["vk", "ok", "wa"]  # Services offered in GET_SERVICES
+    MAX_SERVICE_USES: int = 4  # Times a number may be offered per service after cancellations
+
+    # Modem Selection
+    MODEM_SELECTION_STRATEGY: str = "least_recently_used"  # lowest_id, least_recently_used, fewest_activations
+    MODEM_SELECTION_WINDOW: int = 3600  # seconds, used by fewest_activations
+    MODEM_POOL_REFRESH_INTERVAL: int = 30  # seconds
+
+    # Allocation state: "local" per process, or "shared" across uvicorn workers
+    ALLOCATOR_MODE: str = "local"
+    ALLOCATOR_SOCKET: str = "/tmp/smshub-allocator.sock"
+
+    # Recently finished activations answered without a database read
+    FINISHED_CACHE_SIZE: int = 100000
     
+    # Dashboard snapshots
+    DASHBOARD_CACHE_TTL: int = 10  # seconds a snapshot is served without recomputing
+    DASHBOARD_CACHE_MAX_STALE: int = 60  # seconds a stale snapshot is served while it is recomputed
+
+    # Archival of finished activations and delivered messages
+    ARCHIVE_DIR: str = "archive"
+    ARCHIVE_RETENTION_DAYS: int = 90  # Rows older than this move to compressed segment files
+    ARCHIVE_INTERVAL: int = 3600  # seconds between archival runs, 0 disables them
+    ARCHIVE_BATCH_ROWS: int = 5000  # Rows moved per transaction
+
+    # Snapshots of allocation state, replayed with the activation event journal at startup
+    STATE_DIR: str = "state"
+    STATE_SNAPSHOT_INTERVAL: int = 300  # seconds between snapshots
+
     # Server Settings
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     DEBUG: bool = False
     
+    # Response Compression
+    COMPRESSION_MIN_SIZE: int = 500  # bytes, smaller bodies are sent uncompressed
+    COMPRESSION_OFFLOAD_SIZE: int = 65536  # bytes, larger bodies are compressed off the event loop
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4  # Used when the optional brotli package is installed
+    COMPRESSION_CACHED_PATHS: List[str] = ["/api/smshub/services", "/api/dashboard"]
+    COMPRESSION_CACHE_SIZE: int = 64
+
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "smshub.log"
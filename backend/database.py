@@ -1,19 +1,51 @@
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 from .config import settings
+from .models.base import Base
+from .sqlite import apply_sqlite_profile, WALCheckpointer
 
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 )
 
+apply_sqlite_profile(engine, settings.SQLITE_PROFILE, manual_checkpoints=True)
+wal_checkpointer = WALCheckpointer(
+    engine,
+    interval=settings.SQLITE_CHECKPOINT_INTERVAL,
+    truncate_size=settings.SQLITE_WAL_TRUNCATE_SIZE,
+    max_size=settings.SQLITE_WAL_MAX_SIZE
+)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+# Separate bounded thread pools keep blocking queries off the event loop,
+# and keep slow dashboard queries from occupying the protocol workers
+protocol_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_PROTOCOL_THREADS,
+    thread_name_prefix="db-protocol"
+)
+reporting_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_REPORTING_THREADS,
+    thread_name_prefix="db-reporting"
+)
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def run_in_session(func, *args, executor: ThreadPoolExecutor = protocol_executor):
+    """Run func(db, *args) with its own session on a database worker thread"""
+    def call():
+        db = SessionLocal()
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    return await asyncio.get_running_loop().run_in_executor(executor, call)
@@ -0,0 +1,134 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+import time
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from .sqlite import apply_sqlite_profile
+
+class LanePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that reports every checkout's wait to its lane. create_lane
+    makes a subclass per lane with lane set, which survives pool recreation.
+    """
+
+    lane: Optional["PoolLane"] = None
+
+    def _do_get(self):
+        lane = self.lane
+        lane.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        finally:
+            lane.waiting -= 1
+        lane.record_wait(time.perf_counter() - started)
+        return connection
+
+class PoolLane:
+    """
+    An engine with its own connection pool and session factory.
+
+    Reads and writes use separate lanes so a burst of reporting queries
+    can never take the connections protocol writes need. Sessions check a
+    connection out on their first statement and give it back when the
+    transaction ends, so a session kept open across other awaits (password
+    hashing, modem I/O, calls to SMS Hub) holds no connection meanwhile.
+    How long each checkout waited is recorded per lane and passed to
+    on_wait, for metrics.
+    """
+
+    def __init__(self, name: str, engine: AsyncEngine, on_wait: Optional[Callable[[float], None]] = None):
+        self.name = name
+        self.engine = engine
+        self.on_wait = on_wait
+        self.sessionmaker = sessionmaker(
+            engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False
+        )
+        self.acquisitions = 0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, wait: float):
+        self.acquisitions += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        if self.on_wait is not None:
+            self.on_wait(wait)
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        """Open a session on this lane; it takes a connection only once it runs a statement."""
+        async with self.sessionmaker() as session:
+            yield session
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool occupancy and connection wait times."""
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "waiting": self.waiting,
+            "acquisitions": self.acquisitions,
+            "avg_wait": self.total_wait / self.acquisitions if self.acquisitions else 0,
+            "max_wait": self.max_wait
+        }
+
+def create_lane(
+    name: str,
+    url: str,
+    read_only: bool,
+    pool_size: int,
+    max_overflow: int,
+    pool_timeout: float,
+    sqlite_profile: str = "balanced",
+    echo: bool = False,
+    on_wait: Optional[Callable[[float], None]] = None
+) -> PoolLane:
+    """
+    Create the engine for a lane, read-only or the writer. On SQLite the
+    writer lane always gets a single connection, since SQLite takes one
+    writer at a time and more connections would only wait on its lock.
+    """
+    sqlite = url.startswith("sqlite")
+    if sqlite and not read_only:
+        pool_size, max_overflow = 1, 0
+
+    pool_class = type(f"{name.title()}LanePool", (LanePool,), {})
+    lane_engine = create_async_engine(
+        url,
+        echo=echo,
+        pool_pre_ping=True,
+        poolclass=pool_class,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout
+    )
+
+    if lane_engine.dialect.name == "sqlite":
+        # Checkpoints are left to a WALCheckpointer
+        apply_sqlite_profile(
+            lane_engine.sync_engine,
+            sqlite_profile,
+            manual_checkpoints=True,
+            read_only=read_only
+        )
+
+    elif lane_engine.dialect.name == "postgresql" and read_only:
+        @event.listens_for(lane_engine.sync_engine, "connect")
+        def set_read_only(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+            cursor.close()
+
+    lane = PoolLane(name, lane_engine, on_wait)
+    pool_class.lane = lane
+    return lane
@@ -1,13 +1,23 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse
+from typing import Set
 import logging
 import sys
-import gzip
+import asyncio
 
 from .api import smshub, dashboard
-from .database import engine, Base
+from .api.smshub import resume_pushes, stop_pushes
+from .database import engine, Base, SessionLocal, run_in_session, wal_checkpointer
+from .services.usage import usage_table
+from .services.allocator import modem_pool
+from .services.coordinator import coordinator
+from .services.finished import finished_activations
+from .services.writer import write_buffer
+from .services.archive import segment_archive
+from .services.journal import state_journal
 from .config import settings
+from .compression import CompressionMiddleware
 
 # Configure logging
 logging.basicConfig(
@@ -39,31 +49,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.middleware("http")
-async def gzip_middleware(request: Request, call_next):
-    """Add gzip compression to responses"""
-    response = await call_next(request)
-    
-    if "gzip" in request.headers.get("Accept-Encoding", ""):
-        content = await response.body()
-        compressed_content = gzip.compress(content)
-        
-        return Response(
-            content=compressed_content,
-            headers={
-                **response.headers,
-                "Content-Encoding": "gzip",
-                "Content-Length": str(len(compressed_content))
-            },
-            status_code=response.status_code
-        )
-    
-    return response
+# Compress responses (gzip, or brotli when installed)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    offload_size=settings.COMPRESSION_OFFLOAD_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+    cached_paths=settings.COMPRESSION_CACHED_PATHS,
+    cache_size=settings.COMPRESSION_CACHE_SIZE
+)
 
 # Include routers
 app.include_router(smshub)
 app.include_router(dashboard)
 
+# Periodic jobs, kept referenced so they are not collected mid-run and cancelled on shutdown
+background_tasks: Set[asyncio.Task] = set()
+
+def start_background(coroutine):
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def load_allocation_state():
+    """Load in-memory allocation state and keep the modem pool in sync."""
+    db = SessionLocal()
+    try:
+        state_journal.restore(usage_table, db)
+        modem_pool.load(db)
+    finally:
+        db.close()
+
+    start_background(
+        modem_pool.refresh_periodically(settings.MODEM_POOL_REFRESH_INTERVAL)
+    )
+
+    start_background(state_journal.run_periodically(settings.STATE_SNAPSHOT_INTERVAL))
+
+    # Only the process owning allocation state archives, so workers never race
+    if settings.ARCHIVE_INTERVAL:
+        start_background(segment_archive.run_periodically(settings.ARCHIVE_INTERVAL))
+
+@app.on_event("startup")
+async def startup_event():
+    """Load allocation state, or attach to the worker that owns it."""
+    await coordinator.start(load_allocation_state)
+    await run_in_session(finished_activations.warm)
+    write_buffer.start()
+    wal_checkpointer.start()
+    # One process pushes messages left undelivered by the last run
+    if coordinator.is_owner:
+        await resume_pushes()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop the periodic jobs before the writer and engine they use go away
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await coordinator.stop()
+    await stop_pushes()
+    await write_buffer.stop()
+    wal_checkpointer.stop()
+
 # Error handling
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
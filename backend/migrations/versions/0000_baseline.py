@@ -0,0 +1,75 @@
+"""Baseline tables
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-18
+
+The modems, activations and messages tables as they were before the
+first migration, so "alembic upgrade head" works on an empty database.
+Databases created by Base.metadata.create_all() on startup already have
+them, so each table is only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0000'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'modems' not in tables:
+        op.create_table(
+            'modems',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(100), nullable=False),
+            sa.Column('phone_number', sa.String(20), nullable=False, unique=True),
+            sa.Column('operator', sa.String(50), nullable=False),
+            sa.Column('country', sa.String(50), nullable=False),
+            sa.Column('status', sa.String(20)),
+            sa.Column('port', sa.String(100), nullable=False),
+            sa.Column('is_online', sa.Boolean()),
+            sa.Column('last_seen', sa.DateTime()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime())
+        )
+
+    if 'activations' not in tables:
+        op.create_table(
+            'activations',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('modem_id', sa.Integer(), sa.ForeignKey('modems.id'), nullable=False),
+            sa.Column('service', sa.String(50), nullable=False),
+            sa.Column('status', sa.Integer()),
+            sa.Column('phone_number', sa.String(20), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('currency', sa.Integer(), nullable=False),
+            sa.Column('is_completed', sa.Boolean()),
+            sa.Column('completed_at', sa.DateTime()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime())
+        )
+
+    if 'messages' not in tables:
+        op.create_table(
+            'messages',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('modem_id', sa.Integer(), sa.ForeignKey('modems.id'), nullable=False),
+            sa.Column('activation_id', sa.Integer(), sa.ForeignKey('activations.id'), nullable=True),
+            sa.Column('phone_from', sa.String(100), nullable=False),
+            sa.Column('phone_to', sa.String(20), nullable=False),
+            sa.Column('text', sa.String(1000), nullable=False),
+            sa.Column('is_delivered', sa.Boolean()),
+            sa.Column('delivery_attempts', sa.Integer()),
+            sa.Column('last_attempt', sa.DateTime()),
+            sa.Column('delivered_at', sa.DateTime()),
+            sa.Column('created_at', sa.DateTime()),
+            sa.Column('updated_at', sa.DateTime())
+        )
+
+def downgrade():
+    op.drop_table('messages')
+    op.drop_table('activations')
+    op.drop_table('modems')
@@ -0,0 +1,56 @@
+"""Indexes for the hot query paths
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18
+
+Base.metadata.create_all() on startup also creates these indexes on new
+databases, so every index is created with IF NOT EXISTS.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = '0000'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index(
+        'ix_modems_status_online_country_operator', 'modems',
+        ['status', 'is_online', 'country', 'operator'], if_not_exists=True
+    )
+
+    op.create_index('ix_activations_modem_id_status', 'activations', ['modem_id', 'status'], if_not_exists=True)
+    op.create_index('ix_activations_created_at', 'activations', ['created_at'], if_not_exists=True)
+    op.create_index(
+        'ix_activations_pending_modem_id', 'activations', ['modem_id'],
+        sqlite_where=sa.text('is_completed = 0'),
+        postgresql_where=sa.text('NOT is_completed'),
+        if_not_exists=True
+    )
+    op.create_index(
+        'ix_activations_completed_at', 'activations', ['completed_at'],
+        sqlite_where=sa.text('is_completed = 1'),
+        postgresql_where=sa.text('is_completed'),
+        if_not_exists=True
+    )
+
+    op.create_index('ix_messages_is_delivered', 'messages', ['is_delivered'], if_not_exists=True)
+    op.create_index('ix_messages_created_at', 'messages', ['created_at'], if_not_exists=True)
+    op.create_index(
+        'ix_messages_undelivered_created_at', 'messages', ['created_at'],
+        sqlite_where=sa.text('is_delivered = 0'),
+        postgresql_where=sa.text('NOT is_delivered'),
+        if_not_exists=True
+    )
+
+def downgrade():
+    op.drop_index('ix_messages_undelivered_created_at', table_name='messages')
+    op.drop_index('ix_messages_created_at', table_name='messages')
+    op.drop_index('ix_messages_is_delivered', table_name='messages')
+    op.drop_index('ix_activations_completed_at', table_name='activations')
+    op.drop_index('ix_activations_pending_modem_id', table_name='activations')
+    op.drop_index('ix_activations_created_at', table_name='activations')
+    op.drop_index('ix_activations_modem_id_status', table_name='activations')
+    op.drop_index('ix_modems_status_online_country_operator', table_name='modems')
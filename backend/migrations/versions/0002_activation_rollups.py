@@ -0,0 +1,58 @@
+"""Hourly activation rollups for the dashboard
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+The table may already exist, created empty by Base.metadata.create_all()
+on startup, so it is only created when missing and then backfilled from
+the activations table. The backfill is written out here rather than
+calling the application's, so it only reads columns that exist at this
+revision.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('activation_rollups'):
+        op.create_table(
+            'activation_rollups',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('bucket', sa.DateTime(), nullable=False),
+            sa.Column('service', sa.String(50), nullable=False),
+            sa.Column('country', sa.String(50), nullable=False),
+            sa.Column('operator', sa.String(50), nullable=False),
+            sa.Column('currency', sa.Integer(), nullable=False),
+            sa.Column('status', sa.Integer(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.UniqueConstraint(
+                'bucket', 'service', 'country', 'operator', 'currency', 'status',
+                name='uq_activation_rollups_key'
+            )
+        )
+
+    if bind.dialect.name == 'sqlite':
+        bucket = "strftime('%Y-%m-%d %H:00:00.000000', activations.created_at)"
+    else:
+        bucket = "date_trunc('hour', activations.created_at)"
+    op.execute("DELETE FROM activation_rollups")
+    op.execute(
+        "INSERT INTO activation_rollups "
+        "(bucket, service, country, operator, currency, status, count, amount) "
+        f"SELECT {bucket}, activations.service, modems.country, modems.operator, "
+        "activations.currency, coalesce(activations.status, 0), count(*), "
+        "coalesce(sum(activations.amount), 0) "
+        "FROM activations JOIN modems ON modems.id = activations.modem_id "
+        f"GROUP BY {bucket}, activations.service, modems.country, modems.operator, "
+        "activations.currency, coalesce(activations.status, 0)"
+    )
+
+def downgrade():
+    op.drop_table('activation_rollups')
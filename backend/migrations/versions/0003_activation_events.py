@@ -0,0 +1,35 @@
+"""Append-only activation event journal
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+The table may already exist, created empty by Base.metadata.create_all()
+on startup. It starts empty either way: the first startup without a state
+snapshot rebuilds from the activations table and snapshots from there.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('activation_events'):
+        op.create_table(
+            'activation_events',
+            sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column('kind', sa.String(20), nullable=False),
+            sa.Column('activation_id', sa.Integer(), nullable=False),
+            sa.Column('modem_id', sa.Integer(), nullable=False),
+            sa.Column('phone_number', sa.String(20), nullable=False),
+            sa.Column('service', sa.String(50), nullable=False),
+            sa.Column('status', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime()),
+            sqlite_autoincrement=True
+        )
+
+def downgrade():
+    op.drop_table('activation_events')
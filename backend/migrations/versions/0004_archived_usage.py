@@ -0,0 +1,31 @@
+"""Max-reuse counters of archived activations
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+The table may already exist, created empty by Base.metadata.create_all()
+on startup, so it is only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('archived_usage'):
+        op.create_table(
+            'archived_usage',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('phone_number', sa.String(20), nullable=False),
+            sa.Column('service', sa.String(50), nullable=False),
+            sa.Column('cancelled', sa.Integer(), nullable=False),
+            sa.Column('blocked', sa.Integer(), nullable=False),
+            sa.UniqueConstraint('phone_number', 'service', name='uq_archived_usage_key')
+        )
+
+def downgrade():
+    op.drop_table('archived_usage')
@@ -0,0 +1,38 @@
+"""Country and operator of each activation
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Finishing an activation updates the rollups it was counted under at
+creation, so the country and operator are kept on the activation rather
+than read from its modem, which may have moved or been deleted since.
+Existing activations take them from their modem where it still exists.
+The columns may already exist on tables created by
+Base.metadata.create_all(), so each is only added when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('activations')}
+    for name in ('country', 'operator'):
+        if name not in columns:
+            op.add_column('activations', sa.Column(name, sa.String(50), nullable=True))
+
+    op.execute(
+        "UPDATE activations SET "
+        "country = (SELECT modems.country FROM modems WHERE modems.id = activations.modem_id), "
+        "operator = (SELECT modems.operator FROM modems WHERE modems.id = activations.modem_id) "
+        "WHERE country IS NULL"
+    )
+
+def downgrade():
+    with op.batch_alter_table('activations') as batch:
+        batch.drop_column('operator')
+        batch.drop_column('country')
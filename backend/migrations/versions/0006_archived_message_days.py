@@ -0,0 +1,30 @@
+"""Per-day totals of archived messages
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+The table may already exist, created empty by Base.metadata.create_all()
+on startup, so it is only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('archived_message_days'):
+        op.create_table(
+            'archived_message_days',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('delivery_seconds', sa.Float(), nullable=False),
+            sa.UniqueConstraint('day', name='uq_archived_message_days_day')
+        )
+
+def downgrade():
+    op.drop_table('archived_message_days')
@@ -4,4 +4,7 @@ SMSHUB Agent Models Package
 
 from .modem import Modem
 from .activation import Activation
-from .message import Message 
\ No newline at end of file
+from .message import Message
+from .rollup import ActivationRollup 
+from .event import ActivationEvent
+from .usage import ArchivedUsage, ArchivedMessageDay
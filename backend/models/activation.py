@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from .base import Base
 from datetime import datetime
@@ -11,6 +11,9 @@ class Activation(Base):
     service = Column(String(50), nullable=False)  # vk, ok, wa, etc.
     status = Column(Integer, default=0)  # See Appendix 4 in documentation
     phone_number = Column(String(20), nullable=False)
+    # Where the modem was when the activation was created, for its rollups
+    country = Column(String(50))
+    operator = Column(String(50))
     amount = Column(Float, nullable=False)
     currency = Column(Integer, nullable=False)  # 643 for RUB, 840 for USD
     is_completed = Column(Boolean, default=False)
@@ -18,6 +21,22 @@ class Activation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_activations_modem_id_status', 'modem_id', 'status'),
+        Index('ix_activations_created_at', 'created_at'),
+        # Partial indexes only cover the rows the hot paths look for
+        Index(
+            'ix_activations_pending_modem_id', 'modem_id',
+            sqlite_where=text('is_completed = 0'),
+            postgresql_where=text('NOT is_completed')
+        ),
+        Index(
+            'ix_activations_completed_at', 'completed_at',
+            sqlite_where=text('is_completed = 1'),
+            postgresql_where=text('is_completed')
+        ),
+    )
+
     # Relationships
     modem = relationship("Modem", back_populates="activations")
     messages = relationship("Message", back_populates="activation")
@@ -29,6 +48,8 @@ class Activation(Base):
             'service': self.service,
             'status': self.status,
             'phone_number': self.phone_number,
+            'country': self.country,
+            'operator': self.operator,
             'amount': self.amount,
             'currency': self.currency,
             'is_completed': self.is_completed,
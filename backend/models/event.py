@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from .base import Base
+from datetime import datetime
+
+class ActivationEvent(Base):
+    """Append-only journal of activation lifecycle events; id is the journal sequence number."""
+    __tablename__ = 'activation_events'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(20), nullable=False)  # created (modem reserved) or finished (modem freed)
+    activation_id = Column(Integer, nullable=False)
+    modem_id = Column(Integer, nullable=False)
+    phone_number = Column(String(20), nullable=False)
+    service = Column(String(50), nullable=False)
+    status = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Sequence numbers must never be reused, even after the journal is compacted
+    __table_args__ = {'sqlite_autoincrement': True}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index, text as sql_text
 from sqlalchemy.orm import relationship
 from .base import Base
 from datetime import datetime
@@ -19,6 +19,17 @@ class Message(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_messages_is_delivered', 'is_delivered'),
+        Index('ix_messages_created_at', 'created_at'),
+        # Delivery retry queue: undelivered messages, oldest first
+        Index(
+            'ix_messages_undelivered_created_at', 'created_at',
+            sqlite_where=sql_text('is_delivered = 0'),
+            postgresql_where=sql_text('NOT is_delivered')
+        ),
+    )
+
     # Relationships
     modem = relationship("Modem", back_populates="messages")
     activation = relationship("Activation", back_populates="messages")
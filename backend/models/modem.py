@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import Base
 from datetime import datetime
@@ -18,6 +18,11 @@ class Modem(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # GET_NUMBER / GET_SERVICES modem lookups
+        Index('ix_modems_status_online_country_operator', 'status', 'is_online', 'country', 'operator'),
+    )
+
     # Relationships
     activations = relationship("Activation", back_populates="modem")
     messages = relationship("Message", back_populates="modem")
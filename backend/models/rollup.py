@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from .base import Base
+
+class ActivationRollup(Base):
+    """Activation counters per creation hour, service, country, operator, currency and current status."""
+    __tablename__ = 'activation_rollups'
+
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime, nullable=False)  # Start of the hour the activations were created in
+    service = Column(String(50), nullable=False)
+    country = Column(String(50), nullable=False)
+    operator = Column(String(50), nullable=False)
+    currency = Column(Integer, nullable=False)
+    status = Column(Integer, nullable=False)  # 0 while the activations are pending
+    count = Column(Integer, nullable=False, default=0)
+    amount = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            'bucket', 'service', 'country', 'operator', 'currency', 'status',
+            name='uq_activation_rollups_key'
+        ),
+    )
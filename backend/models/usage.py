@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Date, Float, UniqueConstraint
+from .base import Base
+
+class ArchivedUsage(Base):
+    """Max-reuse counters of activations moved to the archive, per phone number and service."""
+    __tablename__ = 'archived_usage'
+
+    id = Column(Integer, primary_key=True)
+    phone_number = Column(String(20), nullable=False)
+    service = Column(String(50), nullable=False)
+    cancelled = Column(Integer, nullable=False, default=0)  # Activations finished with CANCEL
+    blocked = Column(Integer, nullable=False, default=0)  # Activations finished with a blocking status
+
+    __table_args__ = (
+        UniqueConstraint('phone_number', 'service', name='uq_archived_usage_key'),
+    )
+
+class ArchivedMessageDay(Base):
+    """Totals of messages moved to the archive, per day they were received; all of them were delivered."""
+    __tablename__ = 'archived_message_days'
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    delivery_seconds = Column(Float, nullable=False, default=0)  # Sum of delivered_at - created_at
+
+    __table_args__ = (
+        UniqueConstraint('day', name='uq_archived_message_days_day'),
+    )
@@ -0,0 +1,286 @@
+from datetime import datetime
+from sqlalchemy import select, insert, update, bindparam
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+import logging
+import time
+
+from .models import Modem, Activation, Message
+from .schemas.smshub import ActivationStatus
+from .services import rollups
+from .services.journal import append_event, CREATED, FINISHED
+
+logger = logging.getLogger(__name__)
+
+# Core statements for the SMS Hub protocol handlers. They are built once so
+# every request hits SQLAlchemy's compiled statement cache, and they return
+# plain rows with only the columns a handler needs instead of ORM objects.
+modems = Modem.__table__
+activations = Activation.__table__
+messages = Message.__table__
+
+RESERVE_MODEM = update(modems).where(
+    modems.c.id == bindparam('modem_id'),
+    modems.c.status == 'active',
+    modems.c.is_online == True
+).values(status='busy')
+
+INSERT_ACTIVATION = insert(activations).returning(activations.c.id)
+
+SELECT_ACTIVATION = select(
+    activations.c.modem_id,
+    activations.c.phone_number,
+    activations.c.service,
+    activations.c.status,
+    activations.c.is_completed,
+    activations.c.amount,
+    activations.c.currency,
+    activations.c.created_at,
+    activations.c.country,
+    activations.c.operator
+).where(activations.c.id == bindparam('activation_id'))
+
+COMPLETE_ACTIVATION = update(activations).where(
+    activations.c.id == bindparam('activation_id'),
+    activations.c.is_completed == False
+).values(
+    status=bindparam('new_status'),
+    is_completed=True,
+    completed_at=bindparam('now')
+)
+
+FREE_MODEM = update(modems).where(
+    modems.c.id == bindparam('modem_id')
+).values(status='active')
+
+SELECT_UNDELIVERED_SMS = select(messages.c.id).where(
+    messages.c.is_delivered == False
+).order_by(messages.c.created_at)
+
+SELECT_SMS = select(
+    messages.c.id,
+    messages.c.phone_from,
+    messages.c.phone_to,
+    messages.c.text,
+    messages.c.is_delivered
+).where(messages.c.id == bindparam('sms_id'))
+
+def create_activation(
+    db: Session,
+    modem_id: int,
+    phone_number: str,
+    service: str,
+    country: str,
+    operator: str,
+    amount: float,
+    currency: int
+) -> Optional[int]:
+    """Mark a modem busy and create its activation, or return None if it is no longer free"""
+    conn = db.connection()
+    if not conn.execute(RESERVE_MODEM, {'modem_id': modem_id}).rowcount:
+        db.rollback()
+        return None
+
+    created_at = datetime.utcnow()
+    activation_id = conn.execute(INSERT_ACTIVATION, {
+        'modem_id': modem_id,
+        'service': service,
+        'phone_number': phone_number,
+        'country': country,
+        'operator': operator,
+        'amount': amount,
+        'currency': currency,
+        'status': 0,
+        'created_at': created_at
+    }).scalar_one()
+
+    rollups.record_activation(db, created_at, service, country, operator, currency, amount)
+    append_event(db, CREATED, activation_id, modem_id, phone_number, service, 0)
+    db.commit()
+    return activation_id
+
+def finish_activation(
+    db: Session,
+    activation_id: int,
+    status: int
+) -> Optional[Tuple[int, str, str, int, bool]]:
+    """
+    Complete an activation and free its modem.
+    Returns None if the activation does not exist, otherwise
+    (modem_id, phone_number, service, final_status, changed).
+    """
+    conn = db.connection()
+    activation = conn.execute(SELECT_ACTIVATION, {'activation_id': activation_id}).first()
+    if activation is None:
+        return None
+
+    result = (activation.modem_id, activation.phone_number, activation.service)
+
+    # If already completed, nothing to change (idempotency)
+    if activation.is_completed:
+        db.rollback()
+        return result + (activation.status, False)
+
+    completed = conn.execute(COMPLETE_ACTIVATION, {
+        'activation_id': activation_id,
+        'new_status': status,
+        'now': datetime.utcnow()
+    }).rowcount
+    if not completed:
+        # Finished by a concurrent request between the read and the update
+        db.rollback()
+        return finish_activation(db, activation_id, status)
+
+    # Free up the modem if activation is complete
+    conn.execute(FREE_MODEM, {'modem_id': activation.modem_id})
+
+    # Rollups are keyed by where the modem was at creation, not where it is now
+    if activation.country is not None:
+        rollups.record_activation(
+            db,
+            activation.created_at,
+            activation.service,
+            activation.country,
+            activation.operator,
+            activation.currency,
+            activation.amount,
+            old_status=activation.status or 0,
+            new_status=status
+        )
+    else:
+        logger.warning(f"Activation {activation_id} has no country or operator, its rollups are left as they were")
+
+    append_event(db, FINISHED, activation_id, activation.modem_id, activation.phone_number, activation.service, status)
+    db.commit()
+    return result + (status, True)
+
+def load_sms(db: Session, sms_id: int) -> Optional[Row]:
+    """Get (id, phone_from, phone_to, text, is_delivered) of a message."""
+    return db.connection().execute(SELECT_SMS, {'sms_id': sms_id}).first()
+
+def undelivered_sms(db: Session) -> List[int]:
+    """Get the ids of messages not yet delivered to SMS Hub, oldest first."""
+    return list(db.connection().execute(SELECT_UNDELIVERED_SMS).scalars())
+
+def benchmark(path: str, requests: int = 2000) -> dict:
+    """
+    Compare requests/sec of the database work behind GET_NUMBER,
+    FINISH_ACTIVATION and PUSH_SMS: the ORM implementation these
+    functions replaced against the Core statements above.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from .models.base import Base
+    from .sqlite import apply_sqlite_profile
+    from .config import settings
+
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    apply_sqlite_profile(engine, settings.SQLITE_PROFILE)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = session_factory()
+    modem = Modem(
+        name='bench', phone_number='79280000000', operator='mts', country='russia',
+        port='COM1', is_online=True, status='active'
+    )
+    db.add(modem)
+    db.commit()
+    modem_id = modem.id
+    sms_id = db.execute(
+        insert(messages).returning(messages.c.id),
+        {'modem_id': modem_id, 'phone_from': 'VK', 'phone_to': '79280000000', 'text': 'Your code is 000000'}
+    ).scalar_one()
+    db.commit()
+    db.close()
+
+    def orm_create(db: Session) -> Optional[int]:
+        reserved = db.query(Modem).filter(
+            Modem.id == modem_id,
+            Modem.status == 'active',
+            Modem.is_online == True
+        ).update({Modem.status: 'busy'}, synchronize_session=False)
+        if not reserved:
+            db.rollback()
+            return None
+        activation = Activation(
+            modem_id=modem_id, service='vk', phone_number='79280000000', amount=2.5,
+            country='russia', operator='mts', currency=643, status=0, created_at=datetime.utcnow()
+        )
+        db.add(activation)
+        db.flush()
+        rollups.record_activation(db, activation.created_at, 'vk', 'russia', 'mts', 643, 2.5)
+        append_event(db, CREATED, activation.id, modem_id, '79280000000', 'vk', 0)
+        db.commit()
+        return activation.id
+
+    def orm_finish(db: Session, activation_id: int):
+        activation = db.query(Activation).filter(Activation.id == activation_id).first()
+        old_status = activation.status or 0
+        activation.status = ActivationStatus.SUCCESS
+        activation.is_completed = True
+        activation.completed_at = datetime.utcnow()
+        activation.modem.status = 'active'
+        rollups.record_activation(
+            db, activation.created_at, activation.service, activation.country,
+            activation.operator, activation.currency, activation.amount,
+            old_status=old_status, new_status=ActivationStatus.SUCCESS
+        )
+        append_event(
+            db, FINISHED, activation.id, activation.modem_id, activation.phone_number,
+            activation.service, ActivationStatus.SUCCESS
+        )
+        db.commit()
+
+    def orm_load_sms(db: Session):
+        return db.query(Message).filter(Message.id == sms_id).first().to_dict()
+
+    def run(create, finish, load) -> Tuple[float, float, float]:
+        rates = []
+        for step in ('create', 'finish', 'load'):
+            elapsed = 0.0
+            for _ in range(requests):
+                if step == 'finish':
+                    # Each finish needs a fresh activation, created outside the timing
+                    db = session_factory()
+                    activation_id = create(db)
+                    db.close()
+                db = session_factory()
+                started = time.perf_counter()
+                if step == 'create':
+                    create(db)
+                elif step == 'finish':
+                    finish(db, activation_id)
+                else:
+                    load(db)
+                elapsed += time.perf_counter() - started
+                if step == 'create':
+                    db.execute(FREE_MODEM, {'modem_id': modem_id})
+                    db.commit()
+                db.close()
+            rates.append(requests / elapsed)
+        return tuple(rates)
+
+    core_args = (modem_id, '79280000000', 'vk', 'russia', 'mts', 2.5, 643)
+    results = {
+        'orm': run(orm_create, orm_finish, orm_load_sms),
+        'core': run(
+            lambda db: create_activation(db, *core_args),
+            lambda db, activation_id: finish_activation(db, activation_id, ActivationStatus.SUCCESS),
+            lambda db: load_sms(db, sms_id)
+        )
+    }
+    engine.dispose()
+    return results
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    results = benchmark(os.path.join(tempfile.mkdtemp(), "bench.db"), requests)
+    print(f"{'':>6} {'GET_NUMBER':>12} {'FINISH':>12} {'PUSH_SMS':>12}  requests/sec")
+    for name, rates in results.items():
+        print(f"{name:>6} " + " ".join(f"{rate:12.0f}" for rate in rates))
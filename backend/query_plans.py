@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from sqlalchemy.engine import Connection
+from typing import Dict, List, Tuple
+import re
+
+from .models import Modem, Activation, Message
+from .schemas.smshub import ActivationStatus
+
+_now = datetime(2026, 1, 1)
+
+# Queries on the protocol and reporting hot paths; none of them may scan a whole table
+HOT_QUERIES = {
+    'available_modems': select(Modem.id).where(
+        Modem.status == 'active',
+        Modem.is_online == True,
+        Modem.country == 'russia',
+        Modem.operator == 'mts'
+    ),
+    'modem_activations_by_status': select(Activation.id).where(
+        Activation.modem_id == 1,
+        Activation.status == ActivationStatus.SUCCESS
+    ),
+    'pending_activations_of_modem': select(Activation.id).where(
+        Activation.modem_id == 1,
+        Activation.is_completed == False
+    ),
+    'recently_finished_activations': select(Activation.id, Activation.status).where(
+        Activation.is_completed == True
+    ).order_by(Activation.completed_at.desc()).limit(100),
+    'activations_in_range': select(func.count()).select_from(Activation).where(
+        Activation.created_at.between(_now - timedelta(days=30), _now)
+    ),
+    'undelivered_messages': select(Message.id).where(
+        Message.is_delivered == False
+    ).order_by(Message.created_at).limit(100),
+    'delivered_messages': select(func.count()).select_from(Message).where(
+        Message.is_delivered == True
+    ),
+    'messages_in_range': select(func.count()).select_from(Message).where(
+        Message.created_at.between(_now - timedelta(days=30), _now)
+    ),
+}
+
+# "SCAN messages" (or "SCAN TABLE messages" before SQLite 3.36) without an index
+_FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+
+def explain(connection: Connection, statement) -> List[str]:
+    """Get the EXPLAIN QUERY PLAN details of a statement on SQLite."""
+    sql = statement.compile(
+        dialect=connection.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    return [row[-1] for row in rows]
+
+def full_scans(connection: Connection, queries: Dict[str, object] = HOT_QUERIES) -> List[Tuple[str, str]]:
+    """Get (query name, plan step) for every hot query step that scans a whole table."""
+    scans = []
+    for name, statement in queries.items():
+        for detail in explain(connection, statement):
+            if _FULL_SCAN.match(detail.strip()):
+                scans.append((name, detail))
+    return scans
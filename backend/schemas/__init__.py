@@ -15,5 +15,7 @@ from .dashboard import (
     ModemStats,
     ActivationStats,
     MessageStats,
-    RevenueStats
+    RevenueStats,
+    ModemUtilisation,
+    UtilisationResponse
 ) 
\ No newline at end of file
@@ -33,6 +33,21 @@ class RevenueStats(BaseModel):
     daily_revenue: Dict[str, Dict[str, float]]  # Date string to currency:amount
     by_service: Dict[str, Dict[str, float]]  # Service to currency:amount
 
+class ModemUtilisation(BaseModel):
+    modem_id: int
+    phone_number: str
+    country: str
+    operator: str
+    available: bool
+    allocations: int
+    recent_allocations: int  # Allocations inside the selection window
+    busy_seconds: float
+    utilisation: float  # Share of uptime spent busy
+
+class UtilisationResponse(BaseModel):
+    strategy: str
+    modems: List[ModemUtilisation]
+
 class DashboardResponse(BaseModel):
     modems: ModemStats
     activations: ActivationStats
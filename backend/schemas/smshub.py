@@ -44,13 +44,11 @@ class BaseResponse(BaseModel):
     status: Status
     error: Optional[str] = None
 
-class ServiceQuantity(Dict[str, int]):
-    """Maps service name to quantity (e.g., {"vk": 10, "ok": 15})"""
-    pass
+# Maps service name to quantity (e.g., {"vk": 10, "ok": 15})
+ServiceQuantity = Dict[str, int]
 
-class OperatorMap(Dict[str, Dict[str, int]]):
-    """Maps operator to service quantities (e.g., {"beeline": {"vk": 10}})"""
-    pass
+# Maps operator to service quantities (e.g., {"beeline": {"vk": 10}})
+OperatorMap = Dict[str, ServiceQuantity]
 
 class CountryServices(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
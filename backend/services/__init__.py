@@ -0,0 +1,12 @@
+"""
+SMSHUB Agent Services Package
+"""
+
+from .usage import ServiceUsageTable, usage_table
+from .allocator import ModemPool, SelectionStrategy, get_strategy, modem_pool
+from .coordinator import Coordinator, LocalAllocator, RemoteAllocator, AllocatorError, coordinator
+from .finished import FinishedActivationCache, finished_activations
+from .writer import WriteBehindBuffer, write_buffer
+from ..snapshot import Snapshot, SnapshotCache
+from .archive import SegmentArchive, segment_archive
+from .journal import StateJournal, state_journal
@@ -0,0 +1,269 @@
+from bisect import insort, bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Iterable
+from sqlalchemy.orm import Session
+import asyncio
+import heapq
+import logging
+import time
+
+from ..models import Modem
+from ..database import run_in_session
+from ..config import settings
+from .usage import usage_table
+
+logger = logging.getLogger(__name__)
+
+class PoolEntry:
+    """In-memory allocation state of a single SIM."""
+
+    def __init__(self, modem_id: int, phone_number: str, country: str, operator: str):
+        self.modem_id = modem_id
+        self.phone_number = phone_number
+        self.country = country
+        self.operator = operator
+        self.available = False
+        self.key: tuple = ()
+        self.last_allocated = 0.0
+        self.allocations = 0
+        self.recent: deque = deque()  # Allocation times inside the strategy window
+        self.busy_since: Optional[float] = None
+        self.busy_seconds = 0.0
+        self.changed_at = 0.0  # Last local reservation change
+
+    @property
+    def group(self) -> Tuple[str, str]:
+        return (self.country, self.operator)
+
+class SelectionStrategy:
+    """Orders the available SIMs of a country/operator group; lowest key wins."""
+    name = "lowest_id"
+    window = 0.0
+
+    def key(self, entry: PoolEntry) -> tuple:
+        return ()
+
+class LeastRecentlyUsed(SelectionStrategy):
+    name = "least_recently_used"
+
+    def key(self, entry: PoolEntry) -> tuple:
+        return (entry.last_allocated,)
+
+class FewestActivations(SelectionStrategy):
+    name = "fewest_activations"
+
+    def __init__(self, window: float):
+        self.window = window
+
+    def key(self, entry: PoolEntry) -> tuple:
+        return (len(entry.recent), entry.last_allocated)
+
+def get_strategy(name: str, window: float = 3600) -> SelectionStrategy:
+    """Get a selection strategy by its configured name."""
+    if name == LeastRecentlyUsed.name:
+        return LeastRecentlyUsed()
+    if name == FewestActivations.name:
+        return FewestActivations(window)
+    if name == SelectionStrategy.name:
+        return SelectionStrategy()
+    raise ValueError(f"Unknown modem selection strategy: {name}")
+
+class ModemPool:
+    """
+    Available SIMs per country/operator, kept sorted by the selection
+    strategy so GET_NUMBER never has to order the modems table.
+    """
+
+    def __init__(self, strategy: SelectionStrategy):
+        self.strategy = strategy
+        self.started_at = time.monotonic()
+        self._entries: Dict[int, PoolEntry] = {}
+        self._groups: Dict[Tuple[str, str], List[tuple]] = {}
+        self._expiry: List[Tuple[float, int]] = []
+
+    def _insert(self, entry: PoolEntry):
+        entry.key = self.strategy.key(entry)
+        insort(self._groups.setdefault(entry.group, []), (entry.key, entry.modem_id))
+        entry.available = True
+
+    def _remove(self, entry: PoolEntry):
+        if not entry.available:
+            return
+        group = self._groups[entry.group]
+        index = bisect_left(group, (entry.key, entry.modem_id))
+        del group[index]
+        entry.available = False
+
+    def _prune(self, entry: PoolEntry, now: float):
+        horizon = now - self.strategy.window
+        while entry.recent and entry.recent[0] <= horizon:
+            entry.recent.popleft()
+
+    def _expire(self, now: float):
+        """Re-key SIMs whose allocations have slid out of the strategy window."""
+        while self._expiry and self._expiry[0][0] <= now:
+            _, modem_id = heapq.heappop(self._expiry)
+            entry = self._entries.get(modem_id)
+            if entry is None:
+                continue
+            if entry.available:
+                self._remove(entry)
+                self._prune(entry, now)
+                self._insert(entry)
+            else:
+                self._prune(entry, now)
+
+    def fetch(self, db: Session) -> List[tuple]:
+        """Read modem rows for a later apply()."""
+        return db.query(
+            Modem.id,
+            Modem.phone_number,
+            Modem.country,
+            Modem.operator,
+            Modem.status,
+            Modem.is_online
+        ).all()
+
+    def apply(self, modems: List[tuple], taken_at: float = 0.0):
+        """
+        Synchronise pool membership with rows read at taken_at. SIMs
+        reserved or released locally after that are left alone, since
+        the rows may predate the commit.
+        """
+        seen = set()
+        for modem_id, phone_number, country, operator, status, is_online in modems:
+            seen.add(modem_id)
+            entry = self._entries.get(modem_id)
+            if entry is not None and entry.changed_at > taken_at:
+                continue
+            if entry is not None and (entry.phone_number, entry.group) != (phone_number, (country, operator)):
+                self._remove(entry)
+                entry.phone_number, entry.country, entry.operator = phone_number, country, operator
+            elif entry is None:
+                entry = PoolEntry(modem_id, phone_number, country, operator)
+                self._entries[modem_id] = entry
+
+            if status == 'active' and is_online:
+                if entry.busy_since is not None:
+                    self._finish_busy(entry)
+                if not entry.available:
+                    self._insert(entry)
+            else:
+                self._remove(entry)
+                if status == 'busy' and entry.busy_since is None:
+                    entry.busy_since = time.monotonic()
+
+        for modem_id in list(self._entries):
+            if modem_id not in seen and self._entries[modem_id].changed_at <= taken_at:
+                self._remove(self._entries.pop(modem_id))
+
+    def load(self, db: Session):
+        """Synchronise pool membership with the modems table."""
+        taken_at = time.monotonic()
+        self.apply(self.fetch(db), taken_at)
+
+    def acquire(
+        self,
+        country: str,
+        operator: str,
+        service: str,
+        exclude_prefixes: Optional[Iterable[str]] = None
+    ) -> Optional[PoolEntry]:
+        """Reserve the best available SIM for a service, or None."""
+        now = time.monotonic()
+        self._expire(now)
+
+        prefixes = tuple(exclude_prefixes or ())
+        for _, modem_id in self._groups.get((country, operator), ()):
+            entry = self._entries[modem_id]
+            if prefixes and entry.phone_number.startswith(prefixes):
+                continue
+            if usage_table.is_exhausted(entry.phone_number, service):
+                continue
+
+            self._remove(entry)
+            entry.last_allocated = now
+            entry.allocations += 1
+            entry.busy_since = now
+            entry.changed_at = now
+            if self.strategy.window:
+                entry.recent.append(now)
+                heapq.heappush(self._expiry, (now + self.strategy.window, modem_id))
+            return entry
+
+        return None
+
+    def _finish_busy(self, entry: PoolEntry):
+        entry.busy_seconds += time.monotonic() - entry.busy_since
+        entry.busy_since = None
+
+    def release(self, modem_id: int):
+        """Return a SIM to the pool after its activation finished."""
+        entry = self._entries.get(modem_id)
+        if entry is None:
+            return
+        now = time.monotonic()
+        entry.changed_at = now
+        if entry.busy_since is not None:
+            self._finish_busy(entry)
+        if not entry.available:
+            self._prune(entry, now)
+            self._insert(entry)
+
+    def discard(self, modem_id: int):
+        """Drop a SIM that turned out not to be available until the next load."""
+        entry = self._entries.get(modem_id)
+        if entry is None:
+            return
+        self._remove(entry)
+        entry.busy_since = None
+        entry.changed_at = time.monotonic()
+
+    def available_phones(self) -> Dict[str, Dict[str, List[str]]]:
+        """Get available phone numbers grouped by country and operator."""
+        result = {}
+        for (country, operator), group in self._groups.items():
+            if group:
+                result.setdefault(country, {})[operator] = [
+                    self._entries[modem_id].phone_number for _, modem_id in group
+                ]
+        return result
+
+    def utilisation(self) -> List[dict]:
+        """Get per-SIM allocation counts and busy time share."""
+        now = time.monotonic()
+        uptime = max(now - self.started_at, 1e-9)
+        self._expire(now)
+
+        stats = []
+        for entry in self._entries.values():
+            busy_seconds = entry.busy_seconds
+            if entry.busy_since is not None:
+                busy_seconds += now - entry.busy_since
+            stats.append({
+                'modem_id': entry.modem_id,
+                'phone_number': entry.phone_number,
+                'country': entry.country,
+                'operator': entry.operator,
+                'available': entry.available,
+                'allocations': entry.allocations,
+                'recent_allocations': len(entry.recent),
+                'busy_seconds': busy_seconds,
+                'utilisation': min(busy_seconds / uptime, 1.0)
+            })
+        return stats
+
+    async def refresh_periodically(self, interval: float):
+        """Reload pool membership so modems changed outside the agent are picked up."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                taken_at = time.monotonic()
+                modems = await run_in_session(self.fetch)
+                self.apply(modems, taken_at)
+            except Exception as e:
+                logger.error(f"Failed to refresh modem pool: {e}")
+
+modem_pool = ModemPool(
+    get_strategy(settings.MODEM_SELECTION_STRATEGY, settings.MODEM_SELECTION_WINDOW)
+)
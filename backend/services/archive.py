@@ -0,0 +1,371 @@
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, select, insert, update, delete, exists
+from sqlalchemy.orm import Session
+from typing import Dict, Iterator, List, Optional, Tuple
+import asyncio
+import gzip
+import heapq
+import json
+import logging
+import os
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, gzip is always available
+    zstandard = None
+
+from ..models import Activation, Message, ArchivedUsage, ArchivedMessageDay
+from ..schemas.smshub import ActivationStatus
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_MODELS = {
+    'messages': Message,
+    'activations': Activation,
+}
+
+def _month(moment: datetime) -> str:
+    return moment.strftime("%Y-%m")
+
+def _months(start: datetime, end: datetime) -> List[str]:
+    """Get every YYYY-MM partition between two moments, inclusive."""
+    months = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+def _dump(table, row) -> dict:
+    record = {}
+    for column in table.columns:
+        value = getattr(row, column.name)
+        record[column.name] = value.isoformat() if isinstance(value, datetime) else value
+    return record
+
+def _load(table, record: dict) -> dict:
+    for column in table.columns:
+        value = record.get(column.name)
+        if value is not None and isinstance(column.type, DateTime):
+            record[column.name] = datetime.fromisoformat(value)
+    return record
+
+def _order(record: dict) -> Tuple[datetime, int]:
+    return record['created_at'], record['id']
+
+def _add_counts(db: Session, model, key: dict, counts: dict):
+    """Add to the counters of one row of model, creating it if needed."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+
+        statement = upsert(model).values(**key, **counts)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=list(key),
+            set_={name: getattr(model, name) + getattr(statement.excluded, name) for name in counts}
+        ))
+        return
+
+    updated = db.execute(
+        update(model)
+        .where(*(getattr(model, name) == value for name, value in key.items()))
+        .values({name: getattr(model, name) + value for name, value in counts.items()})
+    ).rowcount
+    if not updated:
+        db.execute(insert(model).values(**key, **counts))
+
+class SegmentArchive:
+    """
+    Cold storage for finished activations and delivered messages.
+
+    Rows older than the retention window are moved out of the live tables
+    into compressed NDJSON segments, one directory per table and month:
+
+        <root>/<table>/<YYYY-MM>/<first id>-<last id>.ndjson.zst (or .gz)
+
+    Each batch is written and fsynced before its rows are deleted, so a
+    crash in between can only leave a row in both places; readers drop
+    the duplicate by id. Archived activations are added to the
+    archived_usage counters, and archived messages to the per-day
+    archived_message_days totals, in the transaction that deletes them.
+    """
+
+    def __init__(self, root: str, retention_days: int = 90, batch_rows: int = 5000):
+        self.root = root
+        self.retention = timedelta(days=retention_days)
+        self.batch_rows = batch_rows
+        self.archived = 0
+
+    def _partition(self, table: str, month: str) -> str:
+        return os.path.join(self.root, table, month)
+
+    def _write_segment(self, table: str, month: str, records: List[dict]) -> str:
+        directory = self._partition(table, month)
+        os.makedirs(directory, exist_ok=True)
+        suffix = ".ndjson.zst" if zstandard is not None else ".ndjson.gz"
+        path = os.path.join(directory, f"{records[0]['id']:010d}-{records[-1]['id']:010d}{suffix}")
+
+        body = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode()
+        if zstandard is not None:
+            body = zstandard.ZstdCompressor(level=9).compress(body)
+        else:
+            body = gzip.compress(body, compresslevel=9)
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as segment:
+            segment.write(body)
+            segment.flush()
+            os.fsync(segment.fileno())
+        os.replace(temp_path, path)
+        return path
+
+    @staticmethod
+    def _read_segment(path: str) -> Iterator[dict]:
+        with open(path, "rb") as segment:
+            body = segment.read()
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is needed to read {path}")
+            body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        else:
+            body = gzip.decompress(body)
+        for line in body.splitlines():
+            if line:
+                yield json.loads(line)
+
+    def _candidates(self, table: str, cutoff: datetime):
+        """Rows of a table that are old enough and no longer needed live."""
+        if table == 'messages':
+            # Undelivered messages stay live for the delivery retry loop
+            return select(Message).where(
+                Message.created_at < cutoff,
+                Message.is_delivered == True
+            )
+        # Activations go once no live message refers to them
+        return select(Activation).where(
+            Activation.created_at < cutoff,
+            Activation.is_completed == True,
+            ~exists().where(Message.activation_id == Activation.id)
+        )
+
+    def archive_table(self, db: Session, table: str, now: Optional[datetime] = None) -> int:
+        """Move the table's rows older than the retention window into segments, returning the row count."""
+        model = ARCHIVED_MODELS[table]
+        cutoff = (now or datetime.utcnow()) - self.retention
+        moved = 0
+        after = 0
+
+        while True:
+            rows = db.execute(
+                self._candidates(table, cutoff)
+                .where(model.id > after)
+                .order_by(model.id)
+                .limit(self.batch_rows)
+            ).scalars().all()
+            if not rows:
+                break
+
+            by_month: Dict[str, List[dict]] = {}
+            for row in rows:
+                by_month.setdefault(_month(row.created_at), []).append(_dump(model.__table__, row))
+            for month, records in by_month.items():
+                self._write_segment(table, month, records)
+            if table == 'activations':
+                self._record_usage(db, rows)
+            else:
+                self._record_messages(db, rows)
+
+            ids = [row.id for row in rows]
+            db.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+            db.commit()
+            db.expunge_all()
+
+            moved += len(ids)
+            after = ids[-1]
+
+        if moved:
+            logger.info(f"Archived {moved} rows from {table}")
+        self.archived += moved
+        return moved
+
+    def archive(self, db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Archive every table; messages first so their activations can follow."""
+        return {table: self.archive_table(db, table, now) for table in ARCHIVED_MODELS}
+
+    def _months_between(self, table: str, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        directory = os.path.join(self.root, table)
+        if not os.path.isdir(directory):
+            return []
+
+        months = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+        if months and (start is not None or end is not None):
+            wanted = set(_months(
+                start or datetime.strptime(months[0], "%Y-%m"),
+                end or datetime.strptime(months[-1], "%Y-%m")
+            ))
+            months = [month for month in months if month in wanted]
+        return months
+
+    def _read_month(
+        self,
+        table: str,
+        month: str,
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> Iterator[dict]:
+        """Yield the archived rows of one month partition created in [start, end), in id order."""
+        model = ARCHIVED_MODELS[table]
+        partition = self._partition(table, month)
+        seen = set()
+        for name in sorted(os.listdir(partition)):
+            if name.endswith(".tmp"):
+                continue
+            for record in self._read_segment(os.path.join(partition, name)):
+                if record['id'] in seen:
+                    continue
+                seen.add(record['id'])
+                record = _load(model.__table__, record)
+                created_at = record['created_at']
+                if start is not None and created_at < start:
+                    continue
+                if end is not None and created_at >= end:
+                    continue
+                yield record
+
+    def read(self, table: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[dict]:
+        """Yield archived rows of a table created in [start, end), month by month."""
+        for month in self._months_between(table, start, end):
+            yield from self._read_month(table, month, start, end)
+
+    def rows_between(self, db: Session, table: str, start: datetime, end: datetime) -> Iterator[dict]:
+        """
+        Yield every row of a table created in [start, end), live or archived,
+        in (created_at, id) order. Reports use this instead of querying the
+        live table when the range may reach past the retention window.
+
+        Live rows stream from the database and are merged with the archive,
+        which is sorted one month partition at a time, so memory is bounded
+        by the largest month rather than the range. A row left in both
+        places by an interrupted archival run is yielded once.
+        """
+        source = ARCHIVED_MODELS[table].__table__
+        live = (
+            row._asdict()
+            for row in db.execute(
+                select(source)
+                .where(source.c.created_at >= start, source.c.created_at < end)
+                .order_by(source.c.created_at, source.c.id)
+                .execution_options(yield_per=1000)
+            )
+        )
+        streams = [live]
+
+        # Archived rows are all older than the retention window
+        if start < datetime.utcnow() - self.retention:
+            streams.append(
+                record
+                for month in self._months_between(table, start, end)
+                for record in sorted(self._read_month(table, month, start, end), key=_order)
+            )
+
+        previous = None
+        for record in heapq.merge(*streams, key=_order):
+            if _order(record) == previous:
+                continue
+            previous = _order(record)
+            yield record
+
+    @staticmethod
+    def archived_usage(db: Session) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """Get phone -> service -> (cancelled, blocked) counts of archived activations."""
+        usage: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        for row in db.execute(select(ArchivedUsage)).scalars():
+            usage.setdefault(row.phone_number, {})[row.service] = (row.cancelled, row.blocked)
+        return usage
+
+    @staticmethod
+    def _record_usage(db: Session, activations: List[Activation]):
+        """
+        Add archived activations to the max-reuse counters, which
+        ServiceUsageTable.rebuild can no longer read from the live table.
+        Call in the transaction that deletes them, so each one is counted
+        exactly once whatever point a crash stops archival at.
+        """
+        from .usage import BLOCKING_STATUSES
+
+        counts: Dict[Tuple[str, str], List[int]] = {}
+        for activation in activations:
+            if activation.status == ActivationStatus.CANCEL:
+                counts.setdefault((activation.phone_number, activation.service), [0, 0])[0] += 1
+            elif activation.status in BLOCKING_STATUSES:
+                counts.setdefault((activation.phone_number, activation.service), [0, 0])[1] += 1
+
+        for (phone_number, service), (cancelled, blocked) in counts.items():
+            _add_counts(
+                db,
+                ArchivedUsage,
+                {'phone_number': phone_number, 'service': service},
+                {'cancelled': cancelled, 'blocked': blocked}
+            )
+
+    @staticmethod
+    def _record_messages(db: Session, messages: List[Message]):
+        """
+        Add archived messages to the per-day totals the dashboard adds to
+        the live messages table. Call in the transaction that deletes them.
+        """
+        days: Dict[object, List[float]] = {}
+        for message in messages:
+            totals = days.setdefault(message.created_at.date(), [0, 0.0])
+            totals[0] += 1
+            if message.delivered_at is not None:
+                totals[1] += (message.delivered_at - message.created_at).total_seconds()
+
+        for day, (count, delivery_seconds) in days.items():
+            _add_counts(
+                db,
+                ArchivedMessageDay,
+                {'day': day},
+                {'count': count, 'delivery_seconds': delivery_seconds}
+            )
+
+    @staticmethod
+    def archived_messages(db: Session) -> Dict[str, Tuple[int, float]]:
+        """Get day -> (count, delivery seconds) of archived messages."""
+        return {
+            str(row.day): (row.count, row.delivery_seconds)
+            for row in db.execute(select(ArchivedMessageDay)).scalars()
+        }
+
+    async def run_periodically(self, interval: int):
+        """Archive old rows every interval seconds on a reporting thread."""
+        from ..database import run_in_session, reporting_executor
+
+        while True:
+            try:
+                await run_in_session(self.archive, executor=reporting_executor)
+            except Exception as e:
+                logger.error(f"Archival run failed: {e}")
+            await asyncio.sleep(interval)
+
+segment_archive = SegmentArchive(
+    settings.ARCHIVE_DIR,
+    retention_days=settings.ARCHIVE_RETENTION_DAYS,
+    batch_rows=settings.ARCHIVE_BATCH_ROWS
+)
+
+if __name__ == "__main__":
+    from ..database import SessionLocal, engine, Base
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        for table, moved in segment_archive.archive(db).items():
+            print(f"{table}: {moved} rows archived")
+    finally:
+        db.close()
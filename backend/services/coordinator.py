@@ -0,0 +1,255 @@
+from typing import Dict, List, Optional, Tuple, Iterable
+import asyncio
+import json
+import logging
+import os
+
+from ..config import settings
+from .allocator import ModemPool, modem_pool
+from .usage import ServiceUsageTable, usage_table
+
+logger = logging.getLogger(__name__)
+
+class AllocatorError(Exception):
+    pass
+
+class AllocatorUnreachable(ConnectionError):
+    """No connection to the allocator could be opened, so nothing was sent."""
+
+class LocalAllocator:
+    """Allocation state held in this process."""
+
+    # Operations that may be called over the allocator socket
+    OPERATIONS = ("acquire", "release", "discard", "record", "service_counts", "utilisation")
+
+    def __init__(self, pool: ModemPool, usage: ServiceUsageTable):
+        self.pool = pool
+        self.usage = usage
+
+    async def acquire(
+        self,
+        country: str,
+        operator: str,
+        service: str,
+        exclude_prefixes: Optional[Iterable[str]] = None
+    ) -> Optional[Tuple[int, str]]:
+        """Reserve a SIM, returning (modem_id, phone_number) or None."""
+        entry = self.pool.acquire(country, operator, service, exclude_prefixes)
+        return (entry.modem_id, entry.phone_number) if entry else None
+
+    async def release(self, modem_id: int):
+        self.pool.release(modem_id)
+
+    async def discard(self, modem_id: int):
+        self.pool.discard(modem_id)
+
+    async def record(self, modem_id: int, phone_number: str, service: str, status: int):
+        """Record a finished activation and free its SIM."""
+        self.usage.record(phone_number, service, status)
+        self.pool.release(modem_id)
+
+    async def service_counts(self, services: List[str]) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Get available numbers per country, operator and service."""
+        return {
+            country: {
+                operator: {
+                    service: self.usage.available(phone_numbers, service)
+                    for service in services
+                }
+                for operator, phone_numbers in operators.items()
+            }
+            for country, operators in self.pool.available_phones().items()
+        }
+
+    async def utilisation(self) -> dict:
+        return {
+            "strategy": self.pool.strategy.name,
+            "modems": self.pool.utilisation()
+        }
+
+class RemoteAllocator:
+    """
+    Forwards allocation calls to the worker that owns the allocation state.
+
+    A call that fails before it is sent is retried, taking over the state
+    if the owner is gone. Once a request may have reached the owner, only
+    calls that are safe to apply twice are retried; a lost acquire reply
+    is raised to the caller, since sending it again could reserve a second
+    SIM.
+    """
+
+    # Calls that leave the same state when the owner applies them twice
+    RETRIED_OPERATIONS = ("release", "discard", "record", "service_counts", "utilisation")
+
+    def __init__(self, path: str, on_unavailable=None, local: Optional[LocalAllocator] = None, retries: int = 20):
+        self.path = path
+        self.on_unavailable = on_unavailable
+        self.local = local
+        self.retries = retries
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def _request(self, payload: bytes) -> bytes:
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except (ConnectionError, FileNotFoundError) as e:
+                raise AllocatorUnreachable(str(e)) from e
+
+        try:
+            writer.write(payload)
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("Allocator closed the connection")
+        except Exception:
+            writer.close()
+            raise
+
+        self._idle.append((reader, writer))
+        return line
+
+    async def _call(self, op: str, *args):
+        payload = json.dumps([op, args]).encode() + b"\n"
+
+        for attempt in range(self.retries):
+            try:
+                line = await self._request(payload)
+                break
+            except (ConnectionError, FileNotFoundError) as e:
+                self._close_idle()
+                if not isinstance(e, AllocatorUnreachable) and op not in self.RETRIED_OPERATIONS:
+                    raise AllocatorError(f"Allocator connection lost during {op}: {e}") from e
+                logger.warning(f"Allocator unavailable ({e}), retrying")
+                if self.on_unavailable and await self.on_unavailable():
+                    # This worker took over the allocation state
+                    return await getattr(self.local, op)(*args)
+                await asyncio.sleep(0.1)
+        else:
+            raise AllocatorError("Allocator unavailable")
+
+        reply = json.loads(line)
+        if "error" in reply:
+            raise AllocatorError(reply["error"])
+        return reply["result"]
+
+    def _close_idle(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+    async def acquire(self, country, operator, service, exclude_prefixes=None) -> Optional[Tuple[int, str]]:
+        result = await self._call("acquire", country, operator, service, exclude_prefixes)
+        return tuple(result) if result else None
+
+    async def release(self, modem_id: int):
+        await self._call("release", modem_id)
+
+    async def discard(self, modem_id: int):
+        await self._call("discard", modem_id)
+
+    async def record(self, modem_id: int, phone_number: str, service: str, status: int):
+        await self._call("record", modem_id, phone_number, service, int(status))
+
+    async def service_counts(self, services: List[str]) -> Dict[str, Dict[str, Dict[str, int]]]:
+        return await self._call("service_counts", services)
+
+    async def utilisation(self) -> dict:
+        return await self._call("utilisation")
+
+class Coordinator:
+    """
+    Decides which process owns allocation state.
+
+    In "local" mode every process allocates from its own state. In
+    "shared" mode the uvicorn workers elect one owner through a file lock;
+    it serves its LocalAllocator on a Unix socket and the other workers
+    use a RemoteAllocator, so all workers see the same reservations.
+    """
+
+    def __init__(self, mode: str, path: str):
+        self.mode = mode
+        self.path = path
+        self.local = LocalAllocator(modem_pool, usage_table)
+        self.allocator = self.local
+        self.is_owner = mode == "local"
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._load_state = None
+        self._ownership_lock = asyncio.Lock()
+
+    def _try_lock(self) -> bool:
+        import fcntl
+
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.path + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    async def start(self, load_state):
+        """Load allocation state if this process owns it; load_state is an async callable."""
+        self._load_state = load_state
+
+        if self.mode == "local":
+            await load_state()
+            return
+
+        if not await self._take_ownership():
+            self.allocator = RemoteAllocator(self.path, on_unavailable=self._take_ownership, local=self.local)
+            logger.info(f"Using shared allocator at {self.path}")
+
+    async def _take_ownership(self) -> bool:
+        async with self._ownership_lock:
+            if self.is_owner:
+                return True
+            if not self._try_lock():
+                return False
+
+            await self._load_state()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = await asyncio.start_unix_server(self._handle, self.path)
+            self.allocator = self.local
+            self.is_owner = True
+            logger.info(f"Serving shared allocator on {self.path} (pid {os.getpid()})")
+            return True
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    op, args = json.loads(line)
+                    if op not in LocalAllocator.OPERATIONS:
+                        raise AllocatorError(f"Unknown operation: {op}")
+                    reply = {"result": await getattr(self.local, op)(*args)}
+                except Exception as e:
+                    logger.error(f"Allocator request failed: {e}")
+                    reply = {"error": str(e)}
+
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # Client went away, or the owner is shutting down
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+coordinator = Coordinator(settings.ALLOCATOR_MODE, settings.ALLOCATOR_SOCKET)
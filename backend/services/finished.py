@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy.orm import Session
+import logging
+
+from ..models import Activation
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+class FinishedActivationCache:
+    """
+    Bounded LRU of recently finished activation ids and their final status,
+    so FINISH_ACTIVATION retries can be answered without a database read.
+    """
+
+    def __init__(self, capacity: int = settings.FINISHED_CACHE_SIZE):
+        self.capacity = capacity
+        self._statuses: "OrderedDict[int, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, activation_id: int) -> Optional[int]:
+        """Get the final status of a finished activation, if cached."""
+        status = self._statuses.get(activation_id)
+        if status is None:
+            self.misses += 1
+            return None
+
+        self._statuses.move_to_end(activation_id)
+        self.hits += 1
+        return status
+
+    def add(self, activation_id: int, status: int):
+        self._statuses[activation_id] = int(status)
+        self._statuses.move_to_end(activation_id)
+        if len(self._statuses) > self.capacity:
+            self._statuses.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._statuses)
+
+    def warm(self, db: Session):
+        """Load the most recently finished activations."""
+        rows = db.query(Activation.id, Activation.status).filter(
+            Activation.is_completed == True
+        ).order_by(
+            Activation.completed_at.desc()
+        ).limit(self.capacity).all()
+
+        self._statuses.clear()
+        # Oldest first, so the most recent end up at the LRU tail
+        for activation_id, status in reversed(rows):
+            self._statuses[activation_id] = status
+
+        logger.info(f"Warmed finished activation cache with {len(rows)} activations")
+
+finished_activations = FinishedActivationCache()
@@ -0,0 +1,177 @@
+from datetime import datetime
+from sqlalchemy import insert, select, delete, func
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import time
+
+from ..models import ActivationEvent
+from ..config import settings
+from .usage import ServiceUsageTable
+
+logger = logging.getLogger(__name__)
+
+CREATED = 'created'  # Activation created, its modem reserved
+FINISHED = 'finished'  # Activation finished with a final status, its modem freed
+
+events = ActivationEvent.__table__
+
+APPEND_EVENT = insert(events)
+LAST_SEQ = select(func.max(events.c.id))
+
+_SNAPSHOT_NAME = re.compile(r'^usage-(\d+)\.json\.gz$')
+
+def append_event(
+    db: Session,
+    kind: str,
+    activation_id: int,
+    modem_id: int,
+    phone_number: str,
+    service: str,
+    status: int
+):
+    """Journal an activation event inside the caller's transaction."""
+    db.connection().execute(APPEND_EVENT, {
+        'kind': kind,
+        'activation_id': activation_id,
+        'modem_id': modem_id,
+        'phone_number': phone_number,
+        'service': service,
+        'status': int(status),
+        'created_at': datetime.utcnow()
+    })
+
+class StateJournal:
+    """
+    Snapshots of the service usage counters plus the event journal after them.
+
+    Startup loads the newest snapshot and replays only the events appended
+    since, instead of aggregating the whole activations table. Each new
+    snapshot is derived from the previous one and the journal, never from
+    the live in-memory table, so events still being applied in memory
+    cannot be missed. Events older than the second newest snapshot are
+    dropped, so the older snapshot stays usable if the newest is damaged.
+    """
+
+    def __init__(self, directory: str, keep: int = 2):
+        self.directory = directory
+        self.keep = keep
+
+    def _snapshots(self) -> List[Tuple[int, str]]:
+        """Get (seq, path) of every snapshot, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        snapshots = []
+        for name in os.listdir(self.directory):
+            match = _SNAPSHOT_NAME.match(name)
+            if match:
+                snapshots.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(snapshots, reverse=True)
+
+    def _read_snapshot(self, max_uses: int) -> Optional[Tuple[int, dict]]:
+        for seq, path in self._snapshots():
+            try:
+                with gzip.open(path, "rt") as snapshot:
+                    state = json.load(snapshot)
+            except (OSError, ValueError) as e:
+                logger.error(f"Skipping unreadable state snapshot {path}: {e}")
+                continue
+            if state.get('max_uses') != max_uses:
+                # Counters are capped at max_uses, so they cannot be reused after it changed
+                logger.info(f"State snapshot {path} was taken with another MAX_SERVICE_USES")
+                return None
+            return seq, state
+        return None
+
+    def _write_snapshot(self, seq: int, usage: ServiceUsageTable):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"usage-{seq:012d}.json.gz")
+        state = dict(usage.dump(), max_uses=usage.max_uses)
+
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as snapshot:
+                snapshot.write(json.dumps(state, separators=(",", ":")).encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temp_path, path)
+
+        for _, old_path in self._snapshots()[self.keep:]:
+            os.remove(old_path)
+
+    @staticmethod
+    def _replay(db: Session, usage: ServiceUsageTable, after: int, through: int) -> int:
+        """Apply finished events with after < seq <= through, returning how many there were."""
+        rows = db.execute(
+            select(events.c.phone_number, events.c.service, events.c.status).where(
+                events.c.kind == FINISHED,
+                events.c.id > after,
+                events.c.id <= through
+            ).order_by(events.c.id)
+        )
+        replayed = 0
+        for phone_number, service, status in rows:
+            usage.record(phone_number, service, status)
+            replayed += 1
+        return replayed
+
+    def restore(self, usage: ServiceUsageTable, db: Session):
+        """Load usage counters from the newest snapshot and the journal tail."""
+        started = time.perf_counter()
+        # Read inside one transaction so the rebuild or replay matches this sequence number
+        last = db.execute(LAST_SEQ).scalar() or 0
+
+        snapshot = self._read_snapshot(usage.max_uses)
+        if snapshot is None:
+            usage.rebuild(db)
+            self._write_snapshot(last, usage)
+            logger.info(f"No usable state snapshot, rebuilt from activations up to event {last}")
+            return
+
+        seq, state = snapshot
+        usage.load(state)
+        replayed = self._replay(db, usage, seq, last)
+        logger.info(
+            f"Restored service usage from snapshot {seq} and {replayed} journal events "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    def compact(self, db: Session) -> int:
+        """Snapshot the state up to the newest event and drop events no snapshot needs, returning the snapshot seq."""
+        usage = ServiceUsageTable()
+        last = db.execute(LAST_SEQ).scalar() or 0
+
+        snapshot = self._read_snapshot(usage.max_uses)
+        if snapshot is None:
+            usage.rebuild(db)
+        else:
+            seq, state = snapshot
+            if seq == last:
+                return seq
+            usage.load(state)
+            self._replay(db, usage, seq, last)
+        self._write_snapshot(last, usage)
+
+        snapshots = self._snapshots()
+        if len(snapshots) > 1:
+            db.execute(delete(events).where(events.c.id <= snapshots[1][0]))
+            db.commit()
+        return last
+
+    async def run_periodically(self, interval: int):
+        """Take a snapshot every interval seconds on a reporting thread."""
+        from ..database import run_in_session, reporting_executor
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_session(self.compact, executor=reporting_executor)
+            except Exception as e:
+                logger.error(f"State snapshot failed: {e}")
+
+state_journal = StateJournal(settings.STATE_DIR)
@@ -0,0 +1,130 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import func, select, insert, delete, update
+from sqlalchemy.orm import Session
+import logging
+
+from ..models import Activation, Modem, ActivationRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_KEY = ('bucket', 'service', 'country', 'operator', 'currency', 'status')
+
+def hour_bucket(moment: datetime) -> datetime:
+    """Get the start of the hour a moment falls in."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def _hour_bucket_sql(column, dialect: str):
+    if dialect == "sqlite":
+        # Same text format SQLAlchemy stores DateTime values in on SQLite
+        return func.strftime('%Y-%m-%d %H:00:00.000000', column)
+    return func.date_trunc('hour', column)
+
+def _increment(db: Session, key: dict, count: int, amount: float):
+    """Add to the counters of one rollup row, creating it if needed."""
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+
+        statement = upsert(ActivationRollup).values(**key, count=count, amount=amount)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(ROLLUP_KEY),
+            set_={
+                'count': ActivationRollup.count + statement.excluded.count,
+                'amount': ActivationRollup.amount + statement.excluded.amount
+            }
+        )
+        db.execute(statement)
+        return
+
+    updated = db.execute(
+        update(ActivationRollup)
+        .where(*(getattr(ActivationRollup, name) == value for name, value in key.items()))
+        .values(count=ActivationRollup.count + count, amount=ActivationRollup.amount + amount)
+    ).rowcount
+    if not updated:
+        db.execute(insert(ActivationRollup).values(**key, count=count, amount=amount))
+
+def record_activation(
+    db: Session,
+    created_at: datetime,
+    service: str,
+    country: str,
+    operator: str,
+    currency: int,
+    amount: float,
+    old_status: Optional[int] = None,
+    new_status: int = 0
+):
+    """
+    Count an activation under its new status, and take it off its old
+    status when it had one. Call inside the transaction that changes the
+    activation so the rollups never drift from the source rows.
+    """
+    key = {
+        'bucket': hour_bucket(created_at),
+        'service': service,
+        'country': country,
+        'operator': operator,
+        'currency': int(currency)
+    }
+    if old_status is not None:
+        _increment(db, {**key, 'status': int(old_status)}, -1, -amount)
+    _increment(db, {**key, 'status': int(new_status)}, 1, amount)
+
+def backfill(db: Session) -> int:
+    """Rebuild the rollups from the activations table, returning the number of rollup rows."""
+    bucket = _hour_bucket_sql(Activation.created_at, db.get_bind().dialect.name)
+    status = func.coalesce(Activation.status, 0)
+    # Keyed like record_activation: where the modem was at creation, falling
+    # back to its modem for activations from before that was stored
+    country = func.coalesce(Activation.country, Modem.country)
+    operator = func.coalesce(Activation.operator, Modem.operator)
+
+    rows = select(
+        bucket,
+        Activation.service,
+        country,
+        operator,
+        Activation.currency,
+        status,
+        func.count(),
+        func.coalesce(func.sum(Activation.amount), 0)
+    ).outerjoin(
+        Modem, Modem.id == Activation.modem_id
+    ).where(
+        # finish_activation leaves these out of the rollups as well
+        country.is_not(None)
+    ).group_by(
+        bucket,
+        Activation.service,
+        country,
+        operator,
+        Activation.currency,
+        status
+    )
+
+    db.execute(delete(ActivationRollup))
+    db.execute(
+        insert(ActivationRollup).from_select(list(ROLLUP_KEY) + ['count', 'amount'], rows)
+    )
+    db.commit()
+
+    total = db.query(func.count(ActivationRollup.id)).scalar()
+    logger.info(f"Backfilled {total} activation rollup rows")
+    return total
+
+if __name__ == "__main__":
+    from ..database import SessionLocal, engine, Base
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        backfill(db)
+    finally:
+        db.close()
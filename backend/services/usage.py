@@ -0,0 +1,143 @@
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable
+import base64
+import logging
+
+from ..models import Activation
+from ..schemas.smshub import ActivationStatus
+from ..config import settings
+from .archive import segment_archive
+
+logger = logging.getLogger(__name__)
+
+# Counter value marking a phone/service pair that must not be offered again
+EXHAUSTED = 255
+
+# Statuses after which the number is never offered again for that service
+BLOCKING_STATUSES = (
+    ActivationStatus.CANCEL_SERVICE,
+    ActivationStatus.SUCCESS,
+    ActivationStatus.REFUND
+)
+
+class ServiceUsageTable:
+    """
+    Per-phone per-service usage counters for the max-reuse rule.
+
+    Each service owns a bytearray indexed by phone slot, so checking a
+    phone/service pair is two dict lookups and one byte read.
+    """
+
+    def __init__(self, max_uses: int = settings.MAX_SERVICE_USES):
+        self.max_uses = max_uses
+        self._slots: Dict[str, int] = {}
+        self._services: Dict[str, bytearray] = {}
+
+    def _slot(self, phone_number: str) -> int:
+        slot = self._slots.get(phone_number)
+        if slot is None:
+            slot = len(self._slots)
+            self._slots[phone_number] = slot
+            for counters in self._services.values():
+                counters.append(0)
+        return slot
+
+    def _counters(self, service: str) -> bytearray:
+        counters = self._services.get(service)
+        if counters is None:
+            counters = bytearray(len(self._slots))
+            self._services[service] = counters
+        return counters
+
+    def uses(self, phone_number: str, service: str) -> int:
+        """Get the number of recorded uses of a phone for a service."""
+        slot = self._slots.get(phone_number)
+        counters = self._services.get(service)
+        if slot is None or counters is None:
+            return 0
+        return counters[slot]
+
+    def is_exhausted(self, phone_number: str, service: str) -> bool:
+        """Check whether a phone may no longer be offered for a service."""
+        return self.uses(phone_number, service) >= self.max_uses
+
+    def record(self, phone_number: str, service: str, status: int):
+        """Record a finished activation for a phone/service pair."""
+        slot = self._slot(phone_number)
+        counters = self._counters(service)
+
+        if status in BLOCKING_STATUSES:
+            counters[slot] = EXHAUSTED
+        elif status == ActivationStatus.CANCEL and counters[slot] < self.max_uses:
+            counters[slot] += 1
+
+    def available(self, phone_numbers: Iterable[str], service: str) -> int:
+        """Count the phones that can still be offered for a service."""
+        counters = self._services.get(service)
+        if counters is None:
+            return sum(1 for _ in phone_numbers)
+
+        count = 0
+        for phone_number in phone_numbers:
+            slot = self._slots.get(phone_number)
+            if slot is None or counters[slot] < self.max_uses:
+                count += 1
+        return count
+
+    def clear(self):
+        self._slots.clear()
+        self._services.clear()
+
+    def dump(self) -> dict:
+        """Get the counters in a JSON-serialisable form, for state snapshots."""
+        return {
+            'phones': list(self._slots),  # In slot order
+            'services': {
+                service: base64.b64encode(bytes(counters)).decode()
+                for service, counters in self._services.items()
+            }
+        }
+
+    def load(self, state: dict):
+        """Replace the counters with ones from dump()."""
+        self.clear()
+        self._slots.update((phone_number, slot) for slot, phone_number in enumerate(state['phones']))
+        for service, data in state['services'].items():
+            counters = bytearray(base64.b64decode(data))
+            counters.extend(bytes(len(self._slots) - len(counters)))
+            self._services[service] = counters
+
+    def rebuild(self, db: Session):
+        """Rebuild counters from finished activations."""
+        self.clear()
+
+        rows = db.query(
+            Activation.phone_number,
+            Activation.service,
+            func.sum(case((Activation.status == ActivationStatus.CANCEL, 1), else_=0)),
+            func.sum(case((Activation.status.in_(BLOCKING_STATUSES), 1), else_=0))
+        ).filter(
+            Activation.is_completed == True
+        ).group_by(
+            Activation.phone_number,
+            Activation.service
+        ).all()
+
+        # Activations moved out of the live table still count
+        usage = segment_archive.archived_usage(db)
+        for phone_number, service, cancelled, blocked in rows:
+            archived_cancelled, archived_blocked = usage.get(phone_number, {}).pop(service, (0, 0))
+            self._set(phone_number, service, cancelled + archived_cancelled, blocked + archived_blocked)
+        for phone_number, services in usage.items():
+            for service, (cancelled, blocked) in services.items():
+                self._set(phone_number, service, cancelled, blocked)
+
+        logger.info(f"Rebuilt service usage table: {len(self._slots)} phones, {len(self._services)} services")
+
+    def _set(self, phone_number: str, service: str, cancelled: int, blocked: int):
+        slot = self._slot(phone_number)
+        counters = self._counters(service)
+        counters[slot] = EXHAUSTED if blocked else min(cancelled, self.max_uses)
+
+usage_table = ServiceUsageTable()
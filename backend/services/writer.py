@@ -0,0 +1,233 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from ..database import SessionLocal
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+class _Write:
+    __slots__ = ("kind", "model", "key", "values", "future")
+
+    def __init__(self, kind: str, model, key: Optional[int], values: dict, future: Optional[asyncio.Future]):
+        self.kind = kind
+        self.model = model
+        self.key = key
+        self.values = values
+        self.future = future
+
+class WriteBehindBuffer:
+    """
+    Group commit for inserts and updates that do not need to be read back
+    straight away.
+
+    Writes are queued and applied by a single writer thread, up to
+    batch_rows per transaction; a batch is closed batch_delay seconds
+    after its first write. The queue holds at most max_pending writes,
+    after which callers wait for room. Callers that need durability pass
+    wait=True and get control back once their write has been committed.
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_rows: int = 500,
+        batch_delay: float = 0.005,
+        max_pending: int = 10000
+    ):
+        self.session_factory = session_factory
+        self.batch_rows = batch_rows
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Commit everything still queued, then stop the writer."""
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _submit(self, kind: str, model, key: Optional[int], values: dict, wait: bool):
+        future = asyncio.get_running_loop().create_future() if wait else None
+        await self._queue.put(_Write(kind, model, key, values, future))
+        if future is not None:
+            return await future
+
+    async def insert(self, model, values: dict, wait: bool = False) -> Optional[int]:
+        """Queue a row insert; with wait=True returns the new id once committed."""
+        return await self._submit("insert", model, None, values, wait)
+
+    async def update(self, model, key: int, values: dict, wait: bool = False):
+        """Queue an update of the row with primary key `key`."""
+        await self._submit("update", model, key, values, wait)
+
+    async def flush(self):
+        """Wait until every write queued so far has been committed."""
+        await self._submit("flush", None, None, {}, True)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self.batch_rows:
+                # Let more writes join this batch
+                await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.batch_rows and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                results = await loop.run_in_executor(self._executor, self._write, batch)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Write batch of {len(batch)} failed, retrying one by one: {e}")
+                results = await loop.run_in_executor(self._executor, self._write_each, batch)
+
+            for write, result in zip(batch, results):
+                if write.future is None or write.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    write.future.set_exception(result)
+                else:
+                    write.future.set_result(result)
+
+    def _apply(self, db: Session, batch: List[_Write]) -> list:
+        results: list = [None] * len(batch)
+
+        # Inserts per table go out as one Core executemany, in submission order
+        inserts: Dict[object, List[int]] = {}
+        for index, write in enumerate(batch):
+            if write.kind == "insert":
+                inserts.setdefault(write.model, []).append(index)
+
+        for model, indexes in inserts.items():
+            table = model.__table__
+            rows = [batch[index].values for index in indexes]
+            if not any(batch[index].future for index in indexes):
+                db.execute(insert(table), rows)
+                continue
+
+            # Someone is waiting for an id
+            statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+            ids = db.execute(statement, rows).scalars().all()
+            for index, new_id in zip(indexes, ids):
+                results[index] = new_id
+
+        # Updates run after the inserts so they can target rows from the same batch
+        for write in batch:
+            if write.kind == "update":
+                db.execute(
+                    update(write.model).where(write.model.id == write.key).values(write.values)
+                )
+
+        return results
+
+    def _write(self, batch: List[_Write]) -> list:
+        db = self.session_factory()
+        try:
+            results = self._apply(db, batch)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.batches += 1
+        self.rows += sum(1 for write in batch if write.kind != "flush")
+        return results
+
+    def _write_each(self, batch: List[_Write]) -> list:
+        """Fallback after a failed batch, so one bad row only fails its own caller."""
+        results = []
+        for write in batch:
+            try:
+                results.append(self._write([write])[0])
+            except Exception as e:
+                logger.error(f"Dropped {write.kind} on {getattr(write.model, '__tablename__', None)}: {e}")
+                results.append(e)
+        return results
+
+def benchmark_inserts(path: str, rows: int = 20000) -> Tuple[float, float]:
+    """Compare messages/sec for commit-per-row against the write-behind buffer on a scratch database."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from ..models import Message
+    from ..models.base import Base
+    from ..sqlite import apply_sqlite_profile
+
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    apply_sqlite_profile(engine, settings.SQLITE_PROFILE)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def message(i: int) -> dict:
+        return {
+            'modem_id': 1,
+            'phone_from': 'VK',
+            'phone_to': '79281234567',
+            'text': f"Your code is {i:06d}"
+        }
+
+    per_row = min(rows, 2000)
+    started = time.perf_counter()
+    for i in range(per_row):
+        db = session_factory()
+        db.add(Message(**message(i)))
+        db.commit()
+        db.close()
+    row_rate = per_row / (time.perf_counter() - started)
+
+    async def buffered():
+        buffer = WriteBehindBuffer(
+            session_factory,
+            batch_rows=settings.WRITE_BATCH_ROWS,
+            batch_delay=settings.WRITE_BATCH_DELAY_MS / 1000,
+            max_pending=settings.WRITE_QUEUE_SIZE
+        )
+        buffer.start()
+        started = time.perf_counter()
+        for i in range(rows):
+            await buffer.insert(Message, message(i))
+        await buffer.stop()
+        return rows / (time.perf_counter() - started)
+
+    buffered_rate = asyncio.run(buffered())
+    engine.dispose()
+    return row_rate, buffered_rate
+
+write_buffer = WriteBehindBuffer(
+    batch_rows=settings.WRITE_BATCH_ROWS,
+    batch_delay=settings.WRITE_BATCH_DELAY_MS / 1000,
+    max_pending=settings.WRITE_QUEUE_SIZE
+)
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    row_rate, buffered_rate = benchmark_inserts(path, int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
+    print(f"commit per row: {row_rate:10.0f} rows/sec")
+    print(f"  write-behind: {buffered_rate:10.0f} rows/sec")
@@ -0,0 +1,99 @@
+from fastapi import Request, Response
+from typing import Any, AsyncContextManager, Awaitable, Callable, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Snapshot:
+    """A computed response body with its ETag."""
+    __slots__ = ("body", "etag", "taken_at")
+
+    def __init__(self, body: bytes, taken_at: float):
+        self.body = body
+        self.etag = 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.taken_at = taken_at
+
+class SnapshotCache:
+    """
+    Stale-while-revalidate cache for an expensive JSON response.
+
+    A snapshot younger than ttl is served as is. Up to max_stale seconds
+    after that it is still served, while one background task recomputes
+    it. Older or missing snapshots are recomputed before answering.
+    Concurrent requests share a single recompute.
+
+    With a session factory, such as an async read lane's session, load is
+    called as load(db) with a session opened for each recompute.
+    """
+
+    def __init__(
+        self,
+        load: Callable[..., Awaitable[Any]],
+        ttl: float,
+        max_stale: float,
+        session: Optional[Callable[[], AsyncContextManager]] = None
+    ):
+        self.load = load
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.session = session
+        self.loads = 0
+        self._snapshot: Optional[Snapshot] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _reload(self) -> Snapshot:
+        if self.session is None:
+            value = await self.load()
+        else:
+            async with self.session() as db:
+                value = await self.load(db)
+        if hasattr(value, "model_dump_json"):
+            body = value.model_dump_json().encode()
+        else:
+            body = json.dumps(value, default=str).encode()
+        self.loads += 1
+        self._snapshot = Snapshot(body, time.monotonic())
+        return self._snapshot
+
+    def _refresh(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._reload())
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Snapshot refresh failed: {task.exception()}")
+
+    async def get(self) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            age = time.monotonic() - snapshot.taken_at
+            if age < self.ttl:
+                return snapshot
+            if age < self.ttl + self.max_stale:
+                self._refresh()
+                return snapshot
+
+        # Shield so one cancelled request does not cancel the shared recompute
+        return await asyncio.shield(self._refresh())
+
+    def invalidate(self):
+        self._snapshot = None
+
+    async def respond(self, request: Request) -> Response:
+        """Answer with the current snapshot, or 304 if the client already has it."""
+        snapshot = await self.get()
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        etags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if snapshot.etag.removeprefix("W/") in etags or "*" in etags:
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=snapshot.body, media_type="application/json", headers=headers)
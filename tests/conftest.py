@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+# backend reads its settings at import, so point them at a scratch directory first
+_scratch = tempfile.mkdtemp(prefix="smshub-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'smshub.db')}")
+os.environ.setdefault("SMSHUB_API_KEY", "test-key")
+os.environ.setdefault("ARCHIVE_DIR", os.path.join(_scratch, "archive"))
+os.environ.setdefault("ARCHIVE_INTERVAL", "0")
+os.environ.setdefault("STATE_DIR", os.path.join(_scratch, "state"))
+os.environ.setdefault("LOG_FILE", os.path.join(_scratch, "smshub.log"))
@@ -0,0 +1,90 @@
+import pytest
+
+from backend.schemas.smshub import ActivationStatus
+from backend.services import allocator
+from backend.services.allocator import ModemPool, get_strategy
+from backend.services.usage import ServiceUsageTable
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(allocator.time, "monotonic", clock)
+    return clock
+
+@pytest.fixture
+def usage(monkeypatch):
+    usage = ServiceUsageTable(max_uses=1)
+    monkeypatch.setattr(allocator, "usage_table", usage)
+    return usage
+
+def _rows(count: int, status: str = "active", is_online: bool = True):
+    return [(i, f"7900000000{i}", "russia", "mts", status, is_online) for i in range(1, count + 1)]
+
+def _pool(strategy: str, count: int = 3, window: float = 60) -> ModemPool:
+    pool = ModemPool(get_strategy(strategy, window))
+    pool.apply(_rows(count))
+    return pool
+
+def _take(pool: ModemPool, clock: Clock, service: str = "vk") -> int:
+    clock.now += 1
+    entry = pool.acquire("russia", "mts", service)
+    pool.release(entry.modem_id)
+    return entry.modem_id
+
+def test_lowest_id_always_takes_the_first_free_sim(clock, usage):
+    pool = _pool("lowest_id")
+    assert [_take(pool, clock) for _ in range(3)] == [1, 1, 1]
+
+    first = pool.acquire("russia", "mts", "vk")
+    second = pool.acquire("russia", "mts", "vk")
+    assert (first.modem_id, second.modem_id) == (1, 2)
+    assert pool.available_phones() == {"russia": {"mts": ["79000000003"]}}
+
+def test_least_recently_used_rotates_through_sims(clock, usage):
+    pool = _pool("least_recently_used")
+    assert [_take(pool, clock) for _ in range(4)] == [1, 2, 3, 1]
+
+def test_fewest_activations_forgets_allocations_outside_the_window(clock, usage):
+    pool = _pool("fewest_activations", count=2, window=10)
+    assert [_take(pool, clock) for _ in range(3)] == [1, 2, 1]
+
+    # Modem 1 has two allocations in the window, modem 2 one
+    assert _take(pool, clock) == 2
+    clock.now += 20
+    stats = {entry["modem_id"]: entry["recent_allocations"] for entry in pool.utilisation()}
+    assert stats == {1: 0, 2: 0}
+    assert _take(pool, clock) == 1
+
+def test_acquire_skips_excluded_prefixes_and_exhausted_numbers(clock, usage):
+    pool = _pool("lowest_id")
+    usage.record("79000000001", "vk", ActivationStatus.SUCCESS)
+
+    assert pool.acquire("russia", "mts", "vk", exclude_prefixes=["79000000002"]).modem_id == 3
+    assert pool.acquire("russia", "mts", "ok").modem_id == 1
+    assert pool.acquire("russia", "mts", "vk", exclude_prefixes=["79000000002"]) is None
+    assert pool.acquire("russia", "beeline", "vk") is None
+
+def test_apply_keeps_local_changes_newer_than_the_rows(clock, usage):
+    pool = _pool("lowest_id")
+    taken_at = clock.now
+    clock.now += 1
+    assert pool.acquire("russia", "mts", "vk").modem_id == 1
+
+    # Rows read before the reservation still show modem 1 free
+    pool.apply(_rows(3), taken_at)
+    assert pool.acquire("russia", "mts", "vk").modem_id == 2
+
+    # Rows read now: modem 1 busy, modem 2 gone from the table, modem 3 offline
+    pool.apply([_rows(3, status="busy")[0], _rows(3, is_online=False)[2]], clock.now)
+    assert pool.available_phones() == {}
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        get_strategy("random")
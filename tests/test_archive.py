@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.api.dashboard import _build_dashboard
+from backend.models import Activation, ArchivedUsage, Message, Modem
+from backend.models.base import Base
+from backend.schemas.smshub import ActivationStatus
+from backend.services.archive import SegmentArchive
+from backend.services.usage import ServiceUsageTable
+
+NOW = datetime(2026, 6, 1)
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Modem(id=1, name="m1", phone_number="79000000001", operator="mts", country="russia", port="p1"))
+    created_at = NOW - timedelta(days=120)
+    statuses = [ActivationStatus.CANCEL, ActivationStatus.CANCEL, ActivationStatus.SUCCESS]
+    session.add_all(
+        Activation(
+            modem_id=1, service=service, status=status, phone_number="79000000001", amount=1,
+            currency=643, is_completed=True, completed_at=created_at, created_at=created_at
+        )
+        for service in ("vk", "ok")
+        for status in statuses
+    )
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+def _archive(tmp_path, db) -> SegmentArchive:
+    archive = SegmentArchive(str(tmp_path / "archive"), retention_days=90, batch_rows=4)
+    archive.archive_table(db, "activations", now=NOW)
+    return archive
+
+def test_usage_is_counted_once_when_activations_are_archived(tmp_path, db):
+    archive = _archive(tmp_path, db)
+
+    assert db.query(func.count(Activation.id)).scalar() == 0
+    assert archive.archived_usage(db) == {"79000000001": {"vk": (2, 1), "ok": (2, 1)}}
+
+    usage = ServiceUsageTable(max_uses=4)
+    usage.rebuild(db)
+    assert usage.is_exhausted("79000000001", "vk")
+    assert usage.is_exhausted("79000000001", "ok")
+
+def test_crash_before_delete_commits_does_not_count_usage(tmp_path, db):
+    def fail_delete(conn, clauseelement, multiparams, params, execution_options):
+        if clauseelement.is_delete:
+            raise RuntimeError("crash")
+
+    event.listen(db.get_bind(), "before_execute", fail_delete)
+    with pytest.raises(RuntimeError):
+        _archive(tmp_path, db)
+    db.rollback()
+    event.remove(db.get_bind(), "before_execute", fail_delete)
+
+    # Rows still live, usage still empty, so a retry counts them once
+    assert db.query(func.count(Activation.id)).scalar() == 6
+    assert db.execute(select(func.count(ArchivedUsage.id))).scalar() == 0
+    archive = _archive(tmp_path, db)
+    assert archive.archived_usage(db) == {"79000000001": {"vk": (2, 1), "ok": (2, 1)}}
+
+def _add_messages(db):
+    # Ids out of created_at order, some old enough to archive and some live
+    ages = [(130, 10), (100, 0), (125, 30), (0, 5), (95, 0), (1, 0)]
+    db.add_all(
+        Message(
+            modem_id=1, phone_from="VK", phone_to="79000000001", text=f"code {days}",
+            is_delivered=True, created_at=NOW - timedelta(days=days),
+            delivered_at=NOW - timedelta(days=days) + timedelta(seconds=delay)
+        )
+        for days, delay in ages
+    )
+    db.commit()
+
+def test_rows_between_merges_live_and_archived_rows_in_order(tmp_path, db):
+    _add_messages(db)
+    archive = SegmentArchive(str(tmp_path / "archive"), retention_days=90, batch_rows=2)
+    assert archive.archive_table(db, "messages", now=NOW) == 4
+
+    rows = archive.rows_between(db, "messages", NOW - timedelta(days=200), NOW + timedelta(days=1))
+    assert iter(rows) is rows
+    rows = list(rows)
+    keys = [(row["created_at"], row["id"]) for row in rows]
+    assert keys == sorted(keys)
+    assert len(rows) == 6
+
+    inside = archive.rows_between(db, "messages", NOW - timedelta(days=126), NOW - timedelta(days=99))
+    assert [row["text"] for row in inside] == ["code 125", "code 100"]
+
+def test_rows_between_yields_a_row_left_in_both_places_once(tmp_path, db):
+    _add_messages(db)
+
+    def fail_delete(conn, clauseelement, multiparams, params, execution_options):
+        if clauseelement.is_delete:
+            raise RuntimeError("crash")
+
+    # Segments written, rows still live
+    archive = SegmentArchive(str(tmp_path / "archive"), retention_days=90, batch_rows=10)
+    event.listen(db.get_bind(), "before_execute", fail_delete)
+    with pytest.raises(RuntimeError):
+        archive.archive_table(db, "messages", now=NOW)
+    db.rollback()
+    event.remove(db.get_bind(), "before_execute", fail_delete)
+
+    rows = list(archive.rows_between(db, "messages", NOW - timedelta(days=200), NOW + timedelta(days=1)))
+    assert sorted(row["id"] for row in rows) == list(range(1, 7))
+
+def test_dashboard_message_totals_survive_archival(tmp_path, db):
+    _add_messages(db)
+    before = _build_dashboard(db).messages
+
+    archive = SegmentArchive(str(tmp_path / "archive"), retention_days=90, batch_rows=2)
+    archive.archive_table(db, "messages", now=NOW)
+    after = _build_dashboard(db).messages
+
+    assert db.query(func.count(Message.id)).scalar() == 2
+    assert (after.total, after.delivered, after.pending) == (before.total, before.delivered, before.pending) == (6, 6, 0)
+    assert after.avg_delivery_time == pytest.approx(before.avg_delivery_time, abs=0.01)
+    assert before.avg_delivery_time == pytest.approx(7.5, abs=0.01)
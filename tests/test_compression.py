@@ -0,0 +1,136 @@
+import asyncio
+import gzip
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from backend import compression
+from backend.compression import CompressionMiddleware, negotiate_encoding
+
+BODY = "x" * 2000
+
+def _app(**options) -> CompressionMiddleware:
+    app = FastAPI()
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/image")
+    async def image():
+        return Response(BODY.encode(), media_type="image/png")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n" * 10
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return CompressionMiddleware(app, **{"minimum_size": 500, **options})
+
+def _get(app, path: str, accept_encoding: str) -> httpx.Response:
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    return asyncio.run(main())
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "gzip"),
+    ("*, gzip;q=0", None),
+    ("", None),
+])
+def test_negotiation_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate_encoding(header) == expected
+
+def test_bodies_under_the_threshold_are_sent_as_is(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response = _get(_app(), "/small", "gzip")
+    assert "content-encoding" not in response.headers
+    assert response.text == "tiny"
+
+def test_large_bodies_are_gzipped_when_accepted(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response = _get(_app(), "/large", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.text == BODY
+
+    assert "content-encoding" not in _get(_app(), "/large", "identity").headers
+
+def test_offloaded_compression_gives_the_same_body(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response = _get(_app(offload_size=1000), "/large", "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY
+
+def test_incompressible_types_pass_through(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    response = _get(_app(), "/image", "gzip")
+    assert "content-encoding" not in response.headers
+    assert response.content == BODY.encode()
+
+def test_cached_paths_reuse_the_compressed_body(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    app = _app(cached_paths=["/large"])
+    calls = []
+    compress = app.compress
+    monkeypatch.setattr(app, "compress", lambda *args: calls.append(1) or compress(*args))
+
+    for _ in range(2):
+        assert _get(app, "/large", "gzip").text == BODY
+    assert len(calls) == 1
+
+def test_streamed_chunks_are_compressed_and_flushed_one_by_one(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    messages = []
+
+    async def main():
+        scope = {
+            "type": "http", "method": "GET", "path": "/stream", "raw_path": b"/stream",
+            "root_path": "", "scheme": "http", "query_string": b"", "http_version": "1.1",
+            "headers": [(b"host", b"test"), (b"accept-encoding", b"gzip")],
+            "server": ("test", 80), "client": ("test", 1234)
+        }
+
+        requested = asyncio.Event()
+
+        async def receive():
+            # The request once, then nothing until the response is done
+            if requested.is_set():
+                await asyncio.Event().wait()
+            requested.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        await _app()(scope, receive, send)
+
+    asyncio.run(main())
+    start, *bodies = messages
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+
+    # Each chunk decompresses on arrival, without waiting for the end of the stream
+    decompressor = zlib.decompressobj(31)
+    received = [decompressor.decompress(message["body"]).decode() for message in bodies]
+    assert received[:3] == [f"chunk {i}\n" * 10 for i in range(3)]
+    assert not bodies[-1]["more_body"]
+    assert gzip.decompress(b"".join(message["body"] for message in bodies)).decode() == "".join(received)
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.schemas.smshub import ActivationStatus
+from backend.services import allocator
+from backend.services.allocator import ModemPool, get_strategy
+from backend.services.coordinator import AllocatorError, Coordinator, LocalAllocator, RemoteAllocator
+from backend.services.usage import ServiceUsageTable
+
+ROWS = [(i, f"7900000000{i}", "russia", "mts", "active", True) for i in (1, 2)]
+
+@pytest.fixture
+def usage(monkeypatch):
+    usage = ServiceUsageTable(max_uses=1)
+    monkeypatch.setattr(allocator, "usage_table", usage)
+    return usage
+
+def _coordinator(path: str, usage: ServiceUsageTable) -> Coordinator:
+    coordinator = Coordinator("shared", path)
+    coordinator.local = coordinator.allocator = LocalAllocator(ModemPool(get_strategy("lowest_id")), usage)
+    return coordinator
+
+def test_workers_share_the_owners_reservations(tmp_path, usage):
+    path = str(tmp_path / "alloc.sock")
+
+    async def main():
+        owner, worker = _coordinator(path, usage), _coordinator(path, usage)
+        loads = []
+
+        async def load_state():
+            loads.append(1)
+            owner.local.pool.apply(ROWS)
+
+        await owner.start(load_state)
+        await worker.start(load_state)
+        try:
+            assert owner.is_owner and not worker.is_owner
+            assert isinstance(worker.allocator, RemoteAllocator)
+            assert loads == [1]
+
+            assert await worker.allocator.acquire("russia", "mts", "vk") == (1, "79000000001")
+            assert await owner.allocator.acquire("russia", "mts", "vk") == (2, "79000000002")
+            assert await worker.allocator.acquire("russia", "mts", "vk") is None
+
+            await worker.allocator.record(1, "79000000001", "vk", ActivationStatus.SUCCESS)
+            counts = await worker.allocator.service_counts(["vk", "ok"])
+            assert counts == {"russia": {"mts": {"vk": 0, "ok": 1}}}
+        finally:
+            await worker.stop()
+            await owner.stop()
+
+    asyncio.run(main())
+
+def _fake_owner(path: str, requests: list):
+    """An owner that drops the connection after the first request it reads."""
+    async def handle(reader, writer):
+        line = await reader.readline()
+        requests.append(json.loads(line)[0])
+        if len(requests) > 1:
+            writer.write(json.dumps({"result": None}).encode() + b"\n")
+            await writer.drain()
+        writer.close()
+
+    return asyncio.start_unix_server(handle, path)
+
+@pytest.mark.parametrize("op, args, retried", [
+    ("acquire", ("russia", "mts", "vk"), False),
+    ("release", (1,), True),
+    ("record", (1, "79000000001", "vk", ActivationStatus.CANCEL), True),
+])
+def test_lost_reply_is_retried_only_for_repeatable_calls(tmp_path, op, args, retried):
+    path = str(tmp_path / "alloc.sock")
+    requests = []
+
+    async def main():
+        server = await _fake_owner(path, requests)
+        remote = RemoteAllocator(path, retries=3)
+        try:
+            await getattr(remote, op)(*args)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    if retried:
+        asyncio.run(main())
+        assert requests == [op, op]
+    else:
+        with pytest.raises(AllocatorError):
+            asyncio.run(main())
+        assert requests == [op]
+
+def test_unreachable_owner_is_taken_over(tmp_path, usage):
+    path = str(tmp_path / "alloc.sock")
+    local = LocalAllocator(ModemPool(get_strategy("lowest_id")), usage)
+    local.pool.apply(ROWS)
+
+    async def take_over() -> bool:
+        return True
+
+    remote = RemoteAllocator(path, on_unavailable=take_over, local=local)
+    assert asyncio.run(remote.acquire("russia", "mts", "vk")) == (1, "79000000001")
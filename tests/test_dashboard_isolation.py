@@ -0,0 +1,91 @@
+import asyncio
+import importlib
+import threading
+import time
+
+import httpx
+from sqlalchemy import func
+
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.main import app
+from backend.models import Modem
+
+# backend.api re-exports the router under the module's name
+dashboard = importlib.import_module("backend.api.dashboard")
+
+STALL = 3.0
+MAX_NUMBER_LATENCY = 0.5
+
+def _seed_modems(count: int):
+    db = SessionLocal()
+    try:
+        db.query(Modem).delete()
+        db.add_all(
+            Modem(
+                name=f"modem{i}",
+                phone_number=f"7900000{i:04d}",
+                operator="mts",
+                country="russia",
+                status="active",
+                port=f"/dev/ttyUSB{i}",
+                is_online=True
+            )
+            for i in range(count)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def test_stalled_dashboard_does_not_delay_get_number(monkeypatch):
+    released = threading.Event()
+
+    def stalled_build(db):
+        # A slow reporting query: holds a read transaction on a reporting thread
+        db.query(func.count(Modem.id)).scalar()
+        released.wait(STALL)
+        return {"stalled": True}
+
+    monkeypatch.setattr(dashboard, "_build_dashboard", stalled_build)
+    dashboard.dashboard_snapshot.invalidate()
+    _seed_modems(5)
+
+    async def get_number(client: httpx.AsyncClient, service: str) -> float:
+        started = time.perf_counter()
+        response = await client.post("/api/smshub/number", json={
+            "action": "GET_NUMBER",
+            "key": "test-key",
+            "country": "russia",
+            "operator": "mts",
+            "service": service,
+            "sum": 10.0,
+            "currency": 643
+        })
+        assert response.status_code == 200
+        assert response.json()["status"] == "SUCCESS"
+        return time.perf_counter() - started
+
+    async def main():
+        await app.router.startup()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                # Enough stalled loads to occupy every protocol thread if they shared them
+                dashboards = [asyncio.create_task(client.get("/api/dashboard"))]
+                dashboards += [
+                    asyncio.create_task(dashboard._load_dashboard())
+                    for _ in range(settings.DB_PROTOCOL_THREADS)
+                ]
+                await asyncio.sleep(0.1)
+                latencies = await asyncio.gather(*(get_number(client, service) for service in ("vk", "ok", "wa")))
+                stalled = not any(task.done() for task in dashboards)
+                released.set()
+                await asyncio.gather(*dashboards)
+        finally:
+            released.set()
+            await app.router.shutdown()
+        return latencies, stalled
+
+    latencies, stalled = asyncio.run(main())
+    assert stalled
+    assert max(latencies) < MAX_NUMBER_LATENCY
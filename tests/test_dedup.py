@@ -0,0 +1,79 @@
+import pytest
+
+from app.services import dedup
+from app.services.dedup import DuplicateFilter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dedup.time, "monotonic", clock)
+    return clock
+
+
+def _key(text="Your code is 1234", modem_id=1, sender="Service", sent_at="24/01/01,12:00:00+00"):
+    return DuplicateFilter.key(modem_id, sender, sent_at, text)
+
+
+def test_repeat_within_window_is_a_duplicate(clock):
+    filter = DuplicateFilter(window=60, max_entries=100)
+
+    assert not filter.seen(_key())
+    clock.now += 59
+    assert filter.seen(_key())
+
+
+def test_key_expires_after_the_window(clock):
+    filter = DuplicateFilter(window=60, max_entries=100)
+
+    assert not filter.seen(_key())
+    clock.now += 60
+    assert not filter.seen(_key())
+    # Accepting it again starts a new window
+    clock.now += 30
+    assert filter.seen(_key())
+
+
+def test_oldest_keys_are_evicted_at_max_entries(clock):
+    filter = DuplicateFilter(window=60, max_entries=3)
+
+    for n in range(4):
+        assert not filter.seen(_key(f"code {n}"))
+        clock.now += 1
+
+    assert len(filter._seen) == 3
+    assert not filter.seen(_key("code 0"))
+    assert filter.seen(_key("code 3"))
+
+
+def test_forget_accepts_the_message_again(clock):
+    filter = DuplicateFilter(window=60, max_entries=100)
+
+    assert not filter.seen(_key())
+    filter.forget(_key())
+    assert not filter.seen(_key())
+    filter.forget(_key("never seen"))
+
+
+@pytest.mark.parametrize("changed", [
+    {"modem_id": 2},
+    {"modem_id": None},
+    {"sender": "Other"},
+    {"sent_at": None},
+    {"sent_at": "24/01/01,12:00:01+00"},
+    {"text": "Your code is 1235"},
+])
+def test_key_covers_modem_sender_time_and_text(changed):
+    assert _key(**changed) != _key()
+
+
+def test_key_fields_cannot_run_together():
+    assert DuplicateFilter.key(1, "ab", "", "c") != DuplicateFilter.key(1, "a", "", "bc")
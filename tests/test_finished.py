@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Activation, Modem
+from backend.models.base import Base
+from backend.schemas.smshub import ActivationStatus
+from backend.services.finished import FinishedActivationCache
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'finished.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FinishedActivationCache(capacity=2)
+    cache.add(1, ActivationStatus.SUCCESS)
+    cache.add(2, ActivationStatus.CANCEL)
+    assert cache.get(1) == ActivationStatus.SUCCESS
+
+    # 2 is now the least recently used
+    cache.add(3, ActivationStatus.SUCCESS)
+    assert len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.get(1) == ActivationStatus.SUCCESS
+    assert cache.get(3) == ActivationStatus.SUCCESS
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_adding_again_updates_the_status():
+    cache = FinishedActivationCache(capacity=2)
+    cache.add(1, ActivationStatus.CANCEL)
+    cache.add(1, ActivationStatus.SUCCESS)
+    assert len(cache) == 1
+    assert cache.get(1) == ActivationStatus.SUCCESS
+
+def test_warm_keeps_the_most_recently_finished(db):
+    now = datetime(2026, 6, 1)
+    db.add(Modem(id=1, name="m1", phone_number="79000000001", operator="mts", country="russia", port="p1"))
+    db.add_all(
+        Activation(
+            id=i, modem_id=1, service="vk", phone_number="79000000001", amount=1, currency=643,
+            status=ActivationStatus.SUCCESS, is_completed=i != 4,
+            completed_at=now + timedelta(minutes=i) if i != 4 else None
+        )
+        for i in range(1, 5)
+    )
+    db.commit()
+
+    cache = FinishedActivationCache(capacity=2)
+    cache.add(99, ActivationStatus.CANCEL)
+    cache.warm(db)
+    assert len(cache) == 2
+
+    # The latest finished is the last to be evicted
+    cache.add(5, ActivationStatus.CANCEL)
+    assert cache.get(3) == ActivationStatus.SUCCESS
+    assert cache.get(5) == ActivationStatus.CANCEL
+    for activation_id in (1, 2, 4, 99):
+        assert cache.get(activation_id) is None
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.hashing import PasswordHasher
+
+
+class Blocker:
+    """A hash function that holds its thread until released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, value):
+        self.started.set()
+        self.release.wait(5)
+        return f"hashed {value}"
+
+
+async def _until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_runs_on_a_hashing_thread():
+    async def scenario():
+        hasher = PasswordHasher(workers=2, max_queue=2)
+        try:
+            thread = await hasher.run("hash", lambda: threading.current_thread().name)
+        finally:
+            hasher.executor.shutdown()
+        return thread
+
+    assert asyncio.run(scenario()).startswith("password-hash")
+
+
+def test_full_queue_is_refused_with_503():
+    rejected, queued, waits = [], [], []
+
+    async def scenario():
+        hasher = PasswordHasher(
+            workers=1,
+            max_queue=1,
+            on_reject=rejected.append,
+            on_queue=queued.append,
+            on_wait=lambda operation, wait: waits.append(operation)
+        )
+        blocker = Blocker()
+        try:
+            running = asyncio.create_task(hasher.run("hash", blocker, "first"))
+            await _until(blocker.started.is_set)
+            waiting = asyncio.create_task(hasher.run("verify", blocker, "second"))
+            await _until(lambda: hasher.queued == 1)
+
+            with pytest.raises(HTTPException) as refused:
+                await hasher.run("verify", blocker, "third")
+
+            blocker.release.set()
+            return refused.value, await running, await waiting
+        finally:
+            blocker.release.set()
+            hasher.executor.shutdown()
+
+    refused, first, second = asyncio.run(scenario())
+
+    assert refused.status_code == 503
+    assert refused.headers == {"Retry-After": "1"}
+    assert rejected == ["verify"]
+    # The queued call ran once the first one finished
+    assert (first, second) == ("hashed first", "hashed second")
+    assert queued == [1, 0, 1, 0]
+    assert waits == ["hash", "verify"]
+
+
+def test_free_slot_is_used_even_when_the_queue_is_full():
+    async def scenario():
+        hasher = PasswordHasher(workers=1, max_queue=0)
+        try:
+            return await hasher.run("hash", str.upper, "ok")
+        finally:
+            hasher.executor.shutdown()
+
+    assert asyncio.run(scenario()) == "OK"
+
+
+def test_cancelled_waiter_frees_its_place():
+    async def scenario():
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        blocker = Blocker()
+        try:
+            running = asyncio.create_task(hasher.run("hash", blocker, "first"))
+            await _until(blocker.started.is_set)
+            waiting = asyncio.create_task(hasher.run("verify", blocker, "gone"))
+            await _until(lambda: hasher.queued == 1)
+
+            # A client that disconnects while queued gives up its place
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+            assert hasher.queued == 0
+
+            replacement = asyncio.create_task(hasher.run("verify", blocker, "second"))
+            await _until(lambda: hasher.queued == 1)
+            blocker.release.set()
+            return await running, await replacement, hasher.queued
+        finally:
+            blocker.release.set()
+            hasher.executor.shutdown()
+
+    assert asyncio.run(scenario()) == ("hashed first", "hashed second", 0)
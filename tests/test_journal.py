@@ -0,0 +1,82 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from backend import protocol_queries
+from backend.config import settings
+from backend.models import ActivationEvent, Modem
+from backend.models.base import Base
+from backend.schemas.smshub import ActivationStatus
+from backend.services.journal import StateJournal
+from backend.services.usage import ServiceUsageTable
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'journal.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(Modem(id=1, name="m1", phone_number="79000000001", operator="mts", country="russia",
+                      port="p1", status="active", is_online=True))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+def _finish(db, service: str, status: ActivationStatus):
+    activation_id = protocol_queries.create_activation(db, 1, "79000000001", service, "russia", "mts", 1.0, 643)
+    protocol_queries.finish_activation(db, activation_id, status)
+
+def _restored(journal: StateJournal, db) -> ServiceUsageTable:
+    usage = ServiceUsageTable()
+    journal.restore(usage, db)
+    return usage
+
+def _rebuilt(db) -> ServiceUsageTable:
+    usage = ServiceUsageTable()
+    usage.rebuild(db)
+    return usage
+
+def test_restore_replays_events_after_the_snapshot(tmp_path, db):
+    journal = StateJournal(str(tmp_path / "state"))
+    _finish(db, "vk", ActivationStatus.CANCEL)
+    # No snapshot yet: rebuilt from activations, then snapshotted
+    assert _restored(journal, db).dump() == _rebuilt(db).dump()
+    assert len(journal._snapshots()) == 1
+
+    _finish(db, "vk", ActivationStatus.CANCEL)
+    _finish(db, "ok", ActivationStatus.SUCCESS)
+    usage = _restored(journal, db)
+    assert usage.uses("79000000001", "vk") == 2
+    assert usage.is_exhausted("79000000001", "ok")
+    assert usage.dump() == _rebuilt(db).dump()
+
+def test_compact_keeps_the_events_the_older_snapshot_needs(tmp_path, db):
+    journal = StateJournal(str(tmp_path / "state"), keep=2)
+    for _ in range(3):
+        _finish(db, "vk", ActivationStatus.CANCEL)
+        journal.compact(db)
+
+    snapshots = journal._snapshots()
+    assert len(snapshots) == 2
+    older = snapshots[1][0]
+    assert db.query(func.min(ActivationEvent.id)).scalar() > older
+
+    # The newest snapshot is damaged: the older one plus the journal still give the same state
+    with open(snapshots[0][1], "wb") as snapshot:
+        snapshot.write(b"not gzip")
+    assert _restored(journal, db).dump() == _rebuilt(db).dump()
+
+def test_snapshot_from_another_max_uses_is_not_reused(tmp_path, db):
+    journal = StateJournal(str(tmp_path / "state"))
+    cancels = settings.MAX_SERVICE_USES + 2
+    for _ in range(cancels):
+        _finish(db, "vk", ActivationStatus.CANCEL)
+    # Counters in this snapshot stop at MAX_SERVICE_USES
+    journal.compact(db)
+
+    usage = ServiceUsageTable(max_uses=cancels + 5)
+    journal.restore(usage, db)
+    assert usage.uses("79000000001", "vk") == cancels
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path / "state"))
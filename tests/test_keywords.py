@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("yaml")
+
+from app.services.keywords import ServiceMatcher
+
+@pytest.fixture
+def matcher():
+    return ServiceMatcher({
+        "vk": {"senders": ["VK"], "keywords": ["vk", "vk.com"]},
+        "go": {"senders": ["Google"], "keywords": ["google", "g-"]},
+        "ma": {"senders": ["Mail.ru"], "keywords": ["mail.ru", ".mail"]},
+    })
+
+def test_keyword_ending_in_punctuation_matches(matcher):
+    assert matcher.classify("+79280000000", "G-123456 is your verification code") == {"go"}
+
+def test_keyword_is_matched_as_a_whole_word(matcher):
+    assert matcher.classify(None, "Vkusvill: your order is ready") == set()
+    assert matcher.classify(None, "hog-wash 123456") == set()
+    assert matcher.classify(None, "Your VK code: 1234") == {"vk"}
+
+def test_longest_keyword_wins(matcher):
+    assert matcher.classify(None, "Code from vk.com: 1234") == {"vk"}
+    assert matcher.classify(None, "Code from mail.ru: 1234") == {"ma"}
+    assert matcher.classify(None, "Code from mail.rux: 1234") == set()
+
+def test_keyword_starting_with_punctuation_matches_after_a_word(matcher):
+    assert matcher.classify(None, "login via my.mail 1234") == {"ma"}
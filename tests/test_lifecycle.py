@@ -0,0 +1,20 @@
+import asyncio
+
+import backend.main as main
+from backend.main import app
+
+def test_shutdown_cancels_periodic_jobs():
+    async def run():
+        await app.router.startup()
+        try:
+            tasks = set(main.background_tasks)
+            # The modem pool refresh and state snapshots run in the owning process
+            assert len(tasks) >= 2
+            assert not any(task.done() for task in tasks)
+        finally:
+            await app.router.shutdown()
+        return tasks
+
+    tasks = asyncio.run(run())
+    assert all(task.cancelled() for task in tasks)
+    assert not main.background_tasks
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+
+from backend.lanes import create_lane
+
+POOL_TIMEOUT = 1
+
+@pytest.fixture
+def write_lane(tmp_path):
+    return create_lane(
+        "write",
+        f"sqlite+aiosqlite:///{tmp_path / 'lanes.db'}",
+        read_only=False,
+        pool_size=5,
+        max_overflow=5,
+        pool_timeout=POOL_TIMEOUT
+    )
+
+def test_slow_handler_does_not_block_concurrent_write(write_lane):
+    async def slow_handler():
+        # Holds its session across a slow await (an SMS Hub call) before writing
+        async with write_lane.session() as db:
+            await asyncio.sleep(POOL_TIMEOUT * 1.5)
+            await db.execute(text("INSERT INTO items (name) VALUES ('slow')"))
+            await db.commit()
+
+    async def fast_handler() -> float:
+        await asyncio.sleep(0.1)
+        started = time.perf_counter()
+        async with write_lane.session() as db:
+            await db.execute(text("INSERT INTO items (name) VALUES ('fast')"))
+            await db.commit()
+        return time.perf_counter() - started
+
+    async def main():
+        async with write_lane.engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+        try:
+            # Let both finish, so a timed out write cannot leave a connection checked out
+            _, elapsed = await asyncio.gather(slow_handler(), fast_handler(), return_exceptions=True)
+            async with write_lane.session() as db:
+                names = (await db.execute(text("SELECT name FROM items ORDER BY id"))).scalars().all()
+        finally:
+            await write_lane.engine.dispose()
+        return elapsed, names
+
+    elapsed, names = asyncio.run(main())
+    assert not isinstance(elapsed, Exception), elapsed
+    assert elapsed < POOL_TIMEOUT
+    assert names == ["fast", "slow"]
+    assert write_lane.max_wait < POOL_TIMEOUT
+
+def test_sqlite_writer_lane_has_one_connection(write_lane):
+    assert write_lane.engine.pool.size() == 1
+
+def test_read_lane_rejects_writes(tmp_path):
+    waits = []
+    read_lane = create_lane(
+        "read",
+        f"sqlite+aiosqlite:///{tmp_path / 'lanes.db'}",
+        read_only=True,
+        pool_size=2,
+        max_overflow=0,
+        pool_timeout=POOL_TIMEOUT,
+        on_wait=waits.append
+    )
+
+    async def main():
+        try:
+            async with read_lane.session() as db:
+                assert (await db.execute(text("SELECT 1"))).scalar() == 1
+                with pytest.raises(Exception, match="readonly"):
+                    await db.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        finally:
+            await read_lane.engine.dispose()
+
+    asyncio.run(main())
+    assert read_lane.acquisitions == len(waits) == 1
@@ -0,0 +1,99 @@
+import pytest
+from sqlalchemy import inspect
+
+from app.models.models import User
+from app.services import principals
+from app.services.principals import PrincipalCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(principals.time, "monotonic", clock)
+    return clock
+
+
+def _user(id=1, email="alice@example.com", **fields):
+    fields.setdefault("hashed_password", "hash")
+    fields.setdefault("is_active", True)
+    return User(id=id, email=email, **fields)
+
+
+def test_cached_user_is_a_fresh_detached_copy(clock):
+    cache = PrincipalCache(ttl=60, max_size=10)
+    cache.put("alice@example.com", "v1", _user(full_name="Alice"))
+
+    first = cache.get("alice@example.com", "v1")
+    second = cache.get("alice@example.com", "v1")
+
+    assert first is not second
+    assert (first.id, first.email, first.full_name, first.is_active) == (1, "alice@example.com", "Alice", True)
+    assert inspect(first).detached
+    first.full_name = "Changed"
+    assert cache.get("alice@example.com", "v1").full_name == "Alice"
+
+
+def test_miss_on_another_token_version(clock):
+    cache = PrincipalCache(ttl=60, max_size=10)
+    cache.put("alice@example.com", "v1", _user())
+
+    assert cache.get("alice@example.com", "v2") is None
+    assert cache.get("alice@example.com", None) is None
+    assert cache.get("bob@example.com", "v1") is None
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PrincipalCache(ttl=60, max_size=10)
+    cache.put("alice@example.com", "v1", _user())
+
+    clock.now += 59
+    assert cache.get("alice@example.com", "v1") is not None
+    clock.now += 1
+    assert cache.get("alice@example.com", "v1") is None
+    assert not cache._entries
+
+
+def test_least_recently_used_entry_is_dropped(clock):
+    cache = PrincipalCache(ttl=60, max_size=2)
+    cache.put("alice@example.com", "v1", _user(1, "alice@example.com"))
+    cache.put("bob@example.com", "v1", _user(2, "bob@example.com"))
+
+    # Reading alice makes bob the least recently used
+    cache.get("alice@example.com", "v1")
+    cache.put("carol@example.com", "v1", _user(3, "carol@example.com"))
+
+    assert cache.get("bob@example.com", "v1") is None
+    assert cache.get("alice@example.com", "v1").id == 1
+    assert cache.get("carol@example.com", "v1").id == 3
+
+
+def test_invalidate_drops_every_version_of_the_subjects(clock):
+    cache = PrincipalCache(ttl=60, max_size=10)
+    cache.put("alice@example.com", "v1", _user(1, "alice@example.com"))
+    cache.put("alice@example.com", "v2", _user(1, "alice@example.com"))
+    cache.put("bob@example.com", "v1", _user(2, "bob@example.com"))
+    cache.put("carol@example.com", None, _user(3, "carol@example.com"))
+
+    cache.invalidate("alice@example.com", "carol@example.com", "nobody@example.com")
+
+    assert cache.get("alice@example.com", "v1") is None
+    assert cache.get("alice@example.com", "v2") is None
+    assert cache.get("carol@example.com", None) is None
+    assert cache.get("bob@example.com", "v1").id == 2
+
+
+def test_put_after_a_change_replaces_the_entry(clock):
+    cache = PrincipalCache(ttl=60, max_size=10)
+    cache.put("alice@example.com", "v1", _user(is_active=True))
+    cache.put("alice@example.com", "v1", _user(is_active=False))
+
+    assert cache.get("alice@example.com", "v1").is_active is False
+    assert len(cache._entries) == 1
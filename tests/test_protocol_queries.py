@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.orm import sessionmaker
+
+from backend import protocol_queries
+from backend.models import ActivationRollup, Modem
+from backend.models.base import Base
+from backend.schemas.smshub import ActivationStatus
+from backend.services import rollups
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'protocol.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(Modem(id=1, name="m1", phone_number="79000000001", operator="mts", country="russia",
+                 port="p1", status="active", is_online=True))
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+def _rollups(db):
+    return {
+        (row.country, row.operator, row.status): row.count
+        for row in db.execute(select(ActivationRollup)).scalars()
+        if row.count
+    }
+
+def _create(session_factory) -> int:
+    db = session_factory()
+    try:
+        return protocol_queries.create_activation(db, 1, "79000000001", "vk", "russia", "mts", 10.0, 643)
+    finally:
+        db.close()
+
+@pytest.mark.parametrize("change", [
+    update(Modem).where(Modem.id == 1).values(country="kazakhstan", operator="beeline"),
+    delete(Modem).where(Modem.id == 1),
+])
+def test_finish_uses_the_country_the_activation_was_created_in(session_factory, change):
+    activation_id = _create(session_factory)
+
+    db = session_factory()
+    db.execute(change)
+    db.commit()
+    result = protocol_queries.finish_activation(db, activation_id, ActivationStatus.SUCCESS)
+    assert result[-1] is True
+    assert _rollups(db) == {("russia", "mts", ActivationStatus.SUCCESS): 1}
+    db.close()
+
+@pytest.mark.parametrize("change", [
+    update(Modem).where(Modem.id == 1).values(country="kazakhstan", operator="beeline"),
+    delete(Modem).where(Modem.id == 1),
+])
+def test_backfill_matches_the_live_rollups(session_factory, change):
+    activation_id = _create(session_factory)
+
+    db = session_factory()
+    db.execute(change)
+    db.commit()
+    protocol_queries.finish_activation(db, activation_id, ActivationStatus.SUCCESS)
+    live = _rollups(db)
+    rollups.backfill(db)
+    assert _rollups(db) == live
+    db.close()
+
+def test_finish_frees_the_modem(session_factory):
+    activation_id = _create(session_factory)
+
+    db = session_factory()
+    assert db.get(Modem, 1).status == "busy"
+    protocol_queries.finish_activation(db, activation_id, ActivationStatus.CANCEL)
+    db.expire_all()
+    assert db.get(Modem, 1).status == "active"
+    db.close()
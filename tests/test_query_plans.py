@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+
+from backend.config import settings
+from backend.models.base import Base
+from backend.query_plans import HOT_QUERIES, explain, full_scans
+
+ROOT = Path(__file__).resolve().parents[1]
+
+@pytest.fixture
+def create_all_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'create_all.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def migrated_engine(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "backend" / "migrations"))
+    command.upgrade(config, "head")
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_does_not_scan(create_all_engine, name):
+    with create_all_engine.connect() as conn:
+        plan = explain(conn, HOT_QUERIES[name])
+        assert not full_scans(conn, {name: HOT_QUERIES[name]}), plan
+
+def test_migrated_database_does_not_scan(migrated_engine):
+    with migrated_engine.connect() as conn:
+        assert full_scans(conn) == []
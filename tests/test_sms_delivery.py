@@ -0,0 +1,112 @@
+import asyncio
+import importlib
+import logging
+
+import httpx
+
+from backend.config import settings
+from backend.database import SessionLocal
+from backend.main import app
+from backend.models import Message, Modem
+
+# backend.api re-exports the router under the module's name
+smshub_api = importlib.import_module("backend.api.smshub")
+
+class FakeSmsHub:
+    """Stands in for httpx.AsyncClient, answering every push with replies in turn."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.pushed = []
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def post(self, url, json=None, headers=None):
+        self.pushed.append(json)
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        return httpx.Response(200, json=reply)
+
+def _seed_modem() -> int:
+    db = SessionLocal()
+    try:
+        modem = db.query(Modem).filter(Modem.phone_number == "79001112233").first()
+        if modem is not None:
+            return modem.id
+        modem = Modem(
+            name="intake",
+            phone_number="79001112233",
+            operator="mts",
+            country="russia",
+            status="active",
+            port="/dev/ttyUSB99",
+            is_online=True
+        )
+        db.add(modem)
+        db.commit()
+        return modem.id
+    finally:
+        db.close()
+
+def _store_message(modem_id: int) -> int:
+    db = SessionLocal()
+    try:
+        message = Message(modem_id=modem_id, phone_from="VK", phone_to="79001112233", text="Your code is 123456")
+        db.add(message)
+        db.commit()
+        return message.id
+    finally:
+        db.close()
+
+def _load_message(sms_id: int) -> Message:
+    db = SessionLocal()
+    try:
+        return db.get(Message, sms_id)
+    finally:
+        db.close()
+
+def _run_app():
+    async def main():
+        # Startup resumes delivery of messages still undelivered
+        await app.router.startup()
+        try:
+            await asyncio.gather(*smshub_api._push_tasks)
+        finally:
+            await app.router.shutdown()
+
+    asyncio.run(main())
+
+def test_undelivered_sms_is_pushed_on_startup(monkeypatch):
+    hub = FakeSmsHub([{"status": "SUCCESS"}])
+    monkeypatch.setattr(smshub_api.httpx, "AsyncClient", hub)
+    sms_id = _store_message(_seed_modem())
+
+    _run_app()
+
+    assert [push["smsId"] for push in hub.pushed] == [sms_id]
+    message = _load_message(sms_id)
+    assert message.is_delivered
+    assert message.delivery_attempts == 1
+
+def test_failed_push_is_logged_and_retried(monkeypatch, caplog):
+    hub = FakeSmsHub([httpx.ConnectError("refused"), {"status": "ERROR", "error": "busy"}, {"status": "SUCCESS"}])
+    monkeypatch.setattr(smshub_api.httpx, "AsyncClient", hub)
+    monkeypatch.setattr(settings, "SMS_RETRY_INTERVAL", 0)
+    sms_id = _store_message(_seed_modem())
+
+    with caplog.at_level(logging.WARNING, logger=smshub_api.logger.name):
+        _run_app()
+
+    message = _load_message(sms_id)
+    assert message.is_delivered
+    assert message.delivery_attempts == 3
+    assert "refused" in caplog.text
+    assert "busy" in caplog.text
@@ -0,0 +1,28 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from backend.snapshot import SnapshotCache
+
+def test_load_gets_a_session_from_the_factory():
+    opened = []
+
+    @asynccontextmanager
+    async def session():
+        db = object()
+        opened.append(db)
+        yield db
+
+    async def load(db):
+        await asyncio.sleep(0.01)
+        return {"same_session": db is opened[-1]}
+
+    async def main():
+        cache = SnapshotCache(load, ttl=60, max_stale=60, session=session)
+        # Concurrent misses share one recompute and so one session
+        snapshots = await asyncio.gather(*(cache.get() for _ in range(5)))
+        return cache, snapshots
+
+    cache, snapshots = asyncio.run(main())
+    assert len(opened) == 1
+    assert cache.loads == 1
+    assert {snapshot.body for snapshot in snapshots} == {b'{"same_session": true}'}
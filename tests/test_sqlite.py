@@ -0,0 +1,55 @@
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.sqlite import BACKSTOP_AUTOCHECKPOINT_PAGES, WALCheckpointer, apply_sqlite_profile
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    apply_sqlite_profile(engine, "balanced", manual_checkpoints=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, body TEXT)"))
+    yield engine
+    engine.dispose()
+
+def _fill(engine, rows: int):
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO items (body) VALUES (:body)"),
+            [{"body": "x" * 1000} for _ in range(rows)]
+        )
+
+def test_manual_checkpoints_keep_a_backstop(engine):
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA wal_autocheckpoint").scalar() == BACKSTOP_AUTOCHECKPOINT_PAGES
+
+def test_read_only_profile(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ro.db'}")
+    apply_sqlite_profile(engine, "balanced", read_only=True)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 1
+    engine.dispose()
+
+def test_oversized_wal_is_truncated_while_readers_block_passive(engine):
+    checkpointer = WALCheckpointer(engine, truncate_size=1024, max_size=65536)
+    reader = engine.connect()
+    # An open read transaction pins the WAL, so PASSIVE cannot copy the new frames
+    reader.exec_driver_sql("BEGIN")
+    reader.exec_driver_sql("SELECT count(*) FROM items").scalar()
+    _fill(engine, 500)
+    assert os.path.getsize(checkpointer.wal_path) > checkpointer.max_size
+
+    # The forced TRUNCATE waits for the reader, which finishes meanwhile
+    finish = threading.Timer(0.2, reader.rollback)
+    finish.start()
+    try:
+        checkpointer.run_once()
+    finally:
+        finish.join()
+        reader.close()
+
+    assert checkpointer.forced_truncations == 1
+    assert os.path.getsize(checkpointer.wal_path) == 0
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Activation, Modem
+from backend.models.base import Base
+from backend.schemas.smshub import ActivationStatus
+from backend.services.usage import EXHAUSTED, ServiceUsageTable
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'usage.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def test_cancels_count_up_to_max_uses():
+    usage = ServiceUsageTable(max_uses=2)
+    usage.record("79000000001", "vk", ActivationStatus.CANCEL)
+    assert usage.uses("79000000001", "vk") == 1
+    assert not usage.is_exhausted("79000000001", "vk")
+
+    for _ in range(3):
+        usage.record("79000000001", "vk", ActivationStatus.CANCEL)
+    assert usage.uses("79000000001", "vk") == 2
+    assert usage.is_exhausted("79000000001", "vk")
+    assert not usage.is_exhausted("79000000001", "ok")
+
+@pytest.mark.parametrize("status", [
+    ActivationStatus.SUCCESS, ActivationStatus.CANCEL_SERVICE, ActivationStatus.REFUND
+])
+def test_blocking_status_exhausts_the_pair(status):
+    usage = ServiceUsageTable(max_uses=4)
+    usage.record("79000000001", "vk", status)
+    assert usage.uses("79000000001", "vk") == EXHAUSTED
+    assert usage.is_exhausted("79000000001", "vk")
+
+def test_new_phones_and_services_grow_every_counter():
+    usage = ServiceUsageTable(max_uses=1)
+    usage.record("79000000001", "vk", ActivationStatus.CANCEL)
+    usage.record("79000000002", "ok", ActivationStatus.CANCEL)
+    usage.record("79000000003", "vk", ActivationStatus.SUCCESS)
+
+    phones = ["79000000001", "79000000002", "79000000003", "79000000004"]
+    assert usage.available(phones, "vk") == 2
+    assert usage.available(phones, "ok") == 3
+    assert usage.available(phones, "wa") == 4
+
+def test_dump_and_load_round_trip():
+    usage = ServiceUsageTable(max_uses=3)
+    usage.record("79000000001", "vk", ActivationStatus.CANCEL)
+    usage.record("79000000002", "ok", ActivationStatus.SUCCESS)
+
+    restored = ServiceUsageTable(max_uses=3)
+    restored.load(usage.dump())
+    assert restored.uses("79000000001", "vk") == 1
+    assert restored.uses("79000000002", "ok") == EXHAUSTED
+    assert restored.uses("79000000002", "vk") == 0
+    assert restored.dump() == usage.dump()
+
+def test_rebuild_counts_finished_activations_only(db):
+    finished = [("vk", ActivationStatus.CANCEL, True), ("vk", ActivationStatus.CANCEL, True),
+                ("ok", ActivationStatus.SUCCESS, True), ("wa", ActivationStatus.CANCEL, False)]
+    db.add(Modem(id=1, name="m1", phone_number="79000000001", operator="mts", country="russia", port="p1"))
+    db.add_all(
+        Activation(modem_id=1, service=service, phone_number="79000000001", status=status,
+                   is_completed=is_completed, amount=1, currency=643)
+        for service, status, is_completed in finished
+    )
+    db.commit()
+
+    usage = ServiceUsageTable(max_uses=3)
+    usage.record("79000000009", "vk", ActivationStatus.SUCCESS)
+    usage.rebuild(db)
+
+    assert usage.uses("79000000001", "vk") == 2
+    assert usage.uses("79000000001", "ok") == EXHAUSTED
+    assert usage.uses("79000000001", "wa") == 0
+    assert usage.uses("79000000009", "vk") == 0